@@ -6,6 +6,14 @@ class ModelConfig:
     # Base Model
     model_name = "Qwen/Qwen2.5-Coder-1.5B-Instruct"
     
+    # Hızlı yükleme: pinlenmiş local safetensors snapshot + meta device init + mmap
+    fast_load = True
+    model_revision = None  # Pinlenecek commit hash (None = mevcut snapshot / main)
+    model_snapshot_dir = "./cache/models"
+    
+    # Multi-adapter registry: bellekte tutulacak maksimum LoRA adapter sayısı (LRU)
+    max_resident_adapters = 2
+    
     # LoRA Configuration
     lora_r = 32  # Rank: {16, 32, 64} arasından seçilebilir
     lora_alpha = 64  # alpha = r * 2
@@ -22,6 +30,18 @@ class ModelConfig:
         "down_proj"
     ]
     
+    # Modül bazlı rank dağıtımı: setup_lora öncesi gradient norm profiling ile rank_pattern
+    rank_allocation = False
+    rank_budget_ratio = 0.5  # Toplam LoRA parametresi / uniform lora_r'nin parametresi
+    rank_candidates = [4, 8, 16, 32, 64]
+    rank_profile_batches = 200
+    
+    # Merge & export: merged / PEFT logit farkı sınırı (max |fark| / max |logit|)
+    merge_tolerance = 5e-2
+    
+    # CPU inference: thread sayısı (None = process'e atanmış CPU sayısı)
+    cpu_num_threads = None
+    
     # Task Type
     task_type = "CAUSAL_LM"
     
@@ -10,10 +10,59 @@ class TrainingConfig:
     per_device_batch_size = 1
     gradient_accumulation_steps = 16  # effective_batch_size / per_device_batch_size
     
+    # Otomatik micro-batch: max_length'te artan batch'ler denenir, bellek bütçesinde / throughput
+    # platosunda durulur; accumulation effective_batch_size'ı korur (seçim run log'una yazılır)
+    auto_batch_size = False
+    auto_batch_max_size = 64  # Denenecek en büyük micro-batch
+    auto_batch_memory_budget_gb = None  # None = GPU belleğinin %90'ı / CPU'da kullanılabilir RAM'in %90'ı
+    auto_batch_plateau = 0.05  # Bir sonraki boyut token/s'i bu orandan az artırıyorsa dur
+    
     # Context Length
     max_length_solution = 1024  # Sadece solution field için
     max_length_reasoning = 8192  # Reasoning ile birlikte için
     
+    # Batching
+    group_by_length = True  # Benzer uzunluktaki örnekleri aynı batch'e koy
+    pad_to_multiple_of = 8  # Dinamik padding yuvarlaması (None = tam batch max)
+    max_tokens_per_batch = None  # Token bütçeli batch (örn. 8192); None = per_device_batch_size
+    tokens_per_optimizer_step = None  # None = effective_batch_size * ortalama örnek uzunluğu
+    
+    # DataLoader
+    dataloader_num_workers = 2  # Collation'ı ana process'ten ayır (0 = ana process)
+    dataloader_prefetch_factor = 2  # Worker başına hazırda tutulan batch (num_workers > 0 ise)
+    dataloader_pin_memory = True  # GPU'ya asenkron kopya için pinned memory
+    dataloader_persistent_workers = True  # Worker'lar epoch'lar arası yaşasın
+    
+    # Preprocessing
+    preprocessing_num_proc = None  # Tokenization worker sayısı (None = tek process)
+    preprocessing_batch_size = 1000  # Tokenizer'a tek seferde verilen örnek sayısı
+    
+    # Tokenize edilmiş dataset cache'i
+    use_dataset_cache = True
+    dataset_cache_dir = "./cache/tokenized"
+    dataset_revision = None  # Hub revision'ı sabitlemek için commit hash / tag
+    
+    # Streaming - RAM'den büyük corpus'lar için (max_steps zorunlu)
+    streaming = False
+    streaming_shuffle_buffer = 10000  # Shuffle buffer'daki örnek sayısı
+    streaming_test_fraction = 0.1  # Hash tabanlı test oranı
+    streaming_eval_samples = 1000  # Eval'de kullanılan test örneği (None = hepsi)
+    max_steps = None  # Streaming'de toplam optimizer adımı (None = epoch bazlı)
+    
+    # Near-duplicate temizliği (MinHash + LSH, tokenization öncesi)
+    dedup = False
+    dedup_threshold = 0.8  # Jaccard benzerlik eşiği
+    dedup_num_perm = 128  # MinHash permütasyon sayısı
+    dedup_shingle_size = 5  # Kelime n-gram boyutu
+    dedup_within = True  # Split içi duplicate'lerden birini tut
+    dedup_remove_leakage = True  # Test ile çakışan train örneklerini çıkar
+    dedup_against = []  # Cross-dataset: örn. ["diverse"] - bunlarla çakışan train örnekleri çıkar
+    dedup_cache_dir = "./cache/minhash"  # İmza cache'i (tekrar çalıştırmada sadece yeni örnekler)
+    
+    # Packing - örnekleri max_length'lik pencerelere birleştir
+    packing = False
+    packing_batch_size = 1000  # Birlikte paketlenen örnek sayısı
+    
     # Optimizer
     optimizer_type = "adamw_torch"
     weight_decay = 0.01
@@ -28,14 +77,42 @@ class TrainingConfig:
     
     # Logging
     logging_steps = 20
+    telemetry = True  # token/s, padding, dataloader / compute / optimizer süreleri, tepe bellek
     eval_steps = 100
     save_steps = 100
     
+    # Checkpoint: sadece LoRA ağırlıkları + optimizer state'i host'a kopyala, arka planda safetensors'a yaz
+    async_checkpoint = True  # False = Trainer'ın senkron checkpoint'i
+    checkpoint_optimizer_dtype = None  # Optimizer state'i compact sakla (örn. "bfloat16"); None = olduğu gibi (fp32)
+    
+    # Hızlı eval: ara eval'ler sabit stratified subset'te, tam eval epoch sonunda
+    fast_eval = True
+    fast_eval_samples = 256  # None = ara eval'ler de tam split'te
+    eval_max_tokens = 4096  # Eval batch token bütçesi (uzunluğa göre sıralı, dinamik padding)
+    
+    # Çoklu process data-parallel: torchrun ile başlatılınca (WORLD_SIZE > 1) her rank donuk base'in
+    # kopyasını tutar, sadece LoRA gradient'leri all-reduce edilir; effective_batch_size korunur
+    ddp_backend = None  # None = CPU'da "gloo", GPU'da "nccl"
+    ddp_threads_per_process = None  # CPU intra-op thread'i (None = node çekirdekleri / node'daki process sayısı)
+    
     # Memory Optimization
-    use_flash_attention_2 = False  # Windows'ta çalışmıyor
+    use_flash_attention_2 = False  # "auto"da flash_attention_2 denensin mi (Windows'ta çalışmıyor)
+    attn_implementation = "auto"  # "auto" / "eager" / "sdpa" / "flash_attention_2" (desteklenmezse fallback)
     gradient_checkpointing = True
+    # "full": tüm katmanlar, "every_k": her k'ıncı katman, "mlp": sadece MLP blokları,
+    # "budget": bellek bütçesine sığacak kadar katman
+    gradient_checkpointing_policy = "full"
+    gradient_checkpointing_every_k = 2
+    gradient_checkpointing_memory_budget_gb = None  # "budget" için (None = GPU belleğinin %90'ı)
     use_8bit = False  # Son çare - kaliteyi düşürür
     
+    # torch.compile (opsiyonel): training forward/backward ve static KV cache'li generation
+    torch_compile = False
+    compile_generation = False
+    compile_mode = None  # None = CUDA'da "reduce-overhead", CPU'da "default"
+    compile_max_cache_len = 2048  # Static KV cache uzunluğu (prompt + yeni token üst sınırı)
+    compile_cache_dir = "./cache/compile"  # Inductor artifact'ları (yeniden başlatmada ısınma kısalır)
+    
     # System Prompts
     SYSTEM_PROMPT_SOLUTION = "You are an expert Python programmer. Please read the problem carefully before writing any Python code."
     SYSTEM_PROMPT_REASONING = "You are an expert programmer. Use <think> tags for reasoning before writing code."
@@ -79,6 +79,80 @@ def create_training_graphs(log_dir, model_name, color_train='blue', color_eval='
     
     return stats
 
+def create_telemetry_graphs(log_dir, model_name, color='#2E86DE'):
+    """Throughput telemetrisi grafiği (TelemetryCallback alanları)"""
+    
+    log_files = glob.glob(f"{log_dir}/training_log_*.jsonl")
+    if not log_files:
+        return None
+    
+    with open(log_files[0], 'r') as f:
+        logs = [json.loads(line) for line in f]
+    
+    telemetry_logs = [log for log in logs if log.get('tokens_per_second') is not None]
+    if not telemetry_logs:
+        print(f"⚠️ {model_name}: Telemetri alanı yok (eski log)")
+        return None
+    
+    steps = [log['step'] for log in telemetry_logs]
+    
+    fig, axes = plt.subplots(2, 2, figsize=(14, 9))
+    (ax1, ax2), (ax3, ax4) = axes
+    
+    # Token/s (pad hariç)
+    ax1.plot(steps, [log['tokens_per_second'] for log in telemetry_logs], color=color, linewidth=2.5)
+    ax1.set_ylabel('Token/s (pad hariç)', fontsize=13, fontweight='bold')
+    ax1.set_title(f'{model_name} - Throughput', fontsize=15, fontweight='bold')
+    
+    # Padding oranı
+    ax2.plot(steps, [log['padding_fraction'] * 100 for log in telemetry_logs], color='#EE5A6F', linewidth=2.5)
+    ax2.set_ylabel('Padding (%)', fontsize=13, fontweight='bold')
+    ax2.set_title(f'{model_name} - Padding Oranı', fontsize=15, fontweight='bold')
+    
+    # Adım aşamaları (stacked)
+    wait = [log['dataloader_wait_seconds'] for log in telemetry_logs]
+    compute = [log['compute_seconds'] for log in telemetry_logs]
+    optimizer = [log['optimizer_seconds'] for log in telemetry_logs]
+    ax3.stackplot(steps, wait, compute, optimizer, labels=['Dataloader bekleme', 'Compute', 'Optimizer'],
+                  colors=['#F79F1F', '#10AC84', '#8E44AD'], alpha=0.8)
+    ax3.set_ylabel('Süre / adım (s)', fontsize=13, fontweight='bold')
+    ax3.set_title(f'{model_name} - Adım Aşamaları', fontsize=15, fontweight='bold')
+    ax3.legend(fontsize=11, loc='upper right')
+    
+    # Tepe bellek
+    ax4.plot(steps, [log['peak_rss_mb'] for log in telemetry_logs], color='#2C3E50', linewidth=2.5, label='Peak RSS')
+    if 'peak_accelerator_mb' in telemetry_logs[0]:
+        ax4.plot(steps, [log['peak_accelerator_mb'] for log in telemetry_logs], color='#EE5A6F',
+                 linewidth=2.5, label='Peak GPU (aralık)')
+    ax4.set_ylabel('Bellek (MB)', fontsize=13, fontweight='bold')
+    ax4.set_title(f'{model_name} - Tepe Bellek', fontsize=15, fontweight='bold')
+    ax4.legend(fontsize=11)
+    
+    for ax in axes.flat:
+        ax.set_xlabel('Step', fontsize=13, fontweight='bold')
+        ax.grid(True, alpha=0.3, linestyle='--')
+    
+    plt.tight_layout()
+    
+    filename = f'{model_name.lower()}_telemetry.png'
+    plt.savefig(filename, dpi=300, bbox_inches='tight', facecolor='white')
+    print(f"✓ {model_name} telemetri grafiği kaydedildi: {filename}")
+    
+    step_seconds = [w + c + o for w, c, o in zip(wait, compute, optimizer)]
+    return {
+        'mean_tokens_per_second': sum(log['tokens_per_second'] for log in telemetry_logs) / len(telemetry_logs),
+        'mean_padding_fraction': sum(log['padding_fraction'] for log in telemetry_logs) / len(telemetry_logs),
+        'dataloader_wait_share': sum(wait) / sum(step_seconds),
+        'peak_rss_mb': max(log['peak_rss_mb'] for log in telemetry_logs)
+    }
+
+def print_telemetry_stats(model_name, stats):
+    print(f"\n⚡ {model_name} Telemetri:")
+    print(f"  Ortalama token/s: {stats['mean_tokens_per_second']:.0f}")
+    print(f"  Ortalama padding: {stats['mean_padding_fraction']:.1%}")
+    print(f"  Dataloader bekleme payı: {stats['dataloader_wait_share']:.1%}")
+    print(f"  Peak RSS: {stats['peak_rss_mb']:.0f} MB")
+
 def create_comparison_graph(deep_log_dir, diverse_log_dir):
     """İki modeli karşılaştırmalı grafik"""
     
@@ -167,6 +241,17 @@ if __name__ == "__main__":
             print(f"  En iyi eval loss: {diverse_stats['best_eval_loss']:.4f}")
             print(f"  En iyi checkpoint: step-{diverse_stats['best_checkpoint']}")
     
+    # Telemetri grafikleri (TelemetryCallback ile üretilmiş log'larda)
+    telemetry_files = []
+    for model_name, log_dir, color in [
+        ('DEEP', '/content/drive/MyDrive/lora_checkpoints/deep/logs', '#2E86DE'),
+        ('DIVERSE', '/content/drive/MyDrive/lora_checkpoints/diverse/logs', '#10AC84')
+    ]:
+        telemetry_stats = create_telemetry_graphs(log_dir, model_name, color=color)
+        if telemetry_stats:
+            print_telemetry_stats(model_name, telemetry_stats)
+            telemetry_files.append(f'{model_name.lower()}_telemetry.png')
+    
     # Karşılaştırma grafiği
     if deep_stats and diverse_stats:
         print("\n3. Karşılaştırma Grafiği Oluşturuluyor...")
@@ -184,5 +269,7 @@ if __name__ == "__main__":
     files.download('deep_training_curves.png')
     files.download('diverse_training_curves.png')
     files.download('model_comparison.png')
+    for filename in telemetry_files:
+        files.download(filename)
     
     print("\n✓ Grafikleri sunumda kullanabilirsin!")
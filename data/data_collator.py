@@ -1,35 +1,112 @@
 """Data Collator for Batching"""
 
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import torch
 
 @dataclass
 class DataCollatorForCausalLM:
-    """Batch hazırlama için collator"""
-    
+    """Batch hazırlama için collator (dinamik padding)"""
+
     tokenizer: Any
-    
+    pad_to_multiple_of: Optional[int] = None  # Tensor core'lar için 8 önerilir
+    label_pad_token_id: int = -100  # Pad token'lar loss'a katılmasın
+
     def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
         """
-        Batch oluştur
-        
+        Batch oluştur - her batch sadece en uzun örneğe kadar pad edilir
+
+        Dataset sadece input_ids (ve packing'de position_ids) taşır; labels ve
+        attention_mask burada türetilir. Torch formatlı satırlar tek kopyayla
+        batch tensörüne yazılır.
+
         Args:
-            features: Tokenize edilmiş örnekler listesi
-        
+            features: Tokenize edilmiş örnekler listesi (padding'siz)
+
         Returns:
             Batch dictionary
         """
-        # Input IDs
-        input_ids = [f["input_ids"] for f in features]
-        labels = [f["labels"] for f in features]
-        attention_mask = [f["attention_mask"] for f in features]
-        
-        # Tensor'a çevir
+        lengths = torch.tensor([len(f["input_ids"]) for f in features], dtype=torch.long)
+
+        # Batch genişliği = en uzun örnek (opsiyonel olarak katına yuvarla)
+        batch_length = padded_length(int(lengths.max()), self.pad_to_multiple_of)
+
+        # Sağdan padding (tokenizer padding_side="right")
+        input_ids = torch.full((len(features), batch_length), self.tokenizer.pad_token_id, dtype=torch.long)
+        for i, f in enumerate(features):
+            input_ids[i, :lengths[i]] = torch.as_tensor(f["input_ids"])
+
+        # Labels = input_ids (causal LM), pad pozisyonları loss'a katılmaz
+        padding = torch.arange(batch_length)[None, :] >= lengths[:, None]
+        labels = input_ids.masked_fill(padding, self.label_pad_token_id)
+
         batch = {
-            "input_ids": torch.tensor(input_ids, dtype=torch.long),
-            "labels": torch.tensor(labels, dtype=torch.long),
-            "attention_mask": torch.tensor(attention_mask, dtype=torch.long)
+            "input_ids": input_ids,
+            "labels": labels
         }
-        
+
+        if "position_ids" in features[0]:
+            # Packed pencereler: doküman sınırları position_ids ile belirlenir,
+            # attention_mask verilmez (model block-diagonal mask'i kendisi kurar)
+            position_ids = self._packed_position_ids(features, lengths, batch_length)
+            # Dokümanın ilk token'ı önceki dokümandan tahmin edilmesin
+            labels.masked_fill_(position_ids == 0, self.label_pad_token_id)
+            batch["position_ids"] = position_ids
+        else:
+            batch["attention_mask"] = (~padding).long()
+
         return batch
+
+    def _packed_position_ids(self, features, lengths, batch_length):
+        """Doküman bazlı position_ids; padding kendi ayrı dokümanı gibi 0'dan başlar"""
+        position_ids = torch.zeros((len(features), batch_length), dtype=torch.long)
+
+        for i, f in enumerate(features):
+            length = int(lengths[i])
+            position_ids[i, :length] = torch.as_tensor(f["position_ids"])
+            position_ids[i, length:] = torch.arange(batch_length - length)
+
+        return position_ids
+
+
+def padded_length(length: int, pad_to_multiple_of: Optional[int] = None) -> int:
+    """Uzunluğu pad_to_multiple_of'un katına yuvarla"""
+    if pad_to_multiple_of:
+        return ((length + pad_to_multiple_of - 1) // pad_to_multiple_of) * pad_to_multiple_of
+    return length
+
+
+def padding_ratio(
+    lengths: List[int],
+    batches: List[List[int]],
+    pad_to_multiple_of: Optional[int] = None,
+    fixed_length: Optional[int] = None
+) -> float:
+    """
+    Batch'lerdeki pad token oranını hesapla
+
+    Args:
+        lengths: Her örneğin token sayısı
+        batches: Index listeleri (her biri bir batch)
+        pad_to_multiple_of: Dinamik padding'deki yuvarlama
+        fixed_length: Verilirse her batch bu uzunluğa pad edilmiş sayılır (padding="max_length")
+
+    Returns:
+        Pad token'ların toplam token'lara oranı (0-1)
+    """
+    real_tokens = 0
+    total_tokens = 0
+
+    for batch in batches:
+        batch_lengths = [lengths[i] for i in batch]
+        if fixed_length is not None:
+            width = fixed_length
+        else:
+            width = padded_length(max(batch_lengths), pad_to_multiple_of)
+        real_tokens += sum(batch_lengths)
+        total_tokens += width * len(batch_lengths)
+
+    if total_tokens == 0:
+        return 0.0
+
+    return 1.0 - real_tokens / total_tokens
@@ -0,0 +1,152 @@
+"""Tokenized Dataset Cache"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from datasets import DatasetDict, load_from_disk
+
+# Preprocessing formatı değişirse artır - eski cache'ler otomatik geçersiz olur
+CACHE_VERSION = 2
+
+COMMIT_HASH = re.compile(r"^[0-9a-f]{40}$")
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Tokenizer vocab + özel token'lardan kararlı hash"""
+    vocab = sorted(tokenizer.get_vocab().items())
+    payload = json.dumps({
+        "class": type(tokenizer).__name__,
+        "vocab": vocab,
+        "special_tokens": tokenizer.special_tokens_map,
+        "padding_side": tokenizer.padding_side
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resolve_dataset_revision(dataset_path, revision=None):
+    """
+    Hub dataset'inin commit hash'i - hub'a istek atmadan
+
+    revision tam commit hash ise (TrainingConfig.dataset_revision ile
+    pinlenmiş) olduğu gibi döner; değilse local HF cache'teki ref'ten okunur
+    (load_dataset indirirken refs/<revision> dosyasını yazar). İnternetin olup
+    olmaması sonucu değiştirmez.
+
+    Returns:
+        Commit hash (dataset local HF cache'te yoksa None)
+    """
+    revision = revision or "main"
+    if COMMIT_HASH.match(revision):
+        return revision
+
+    from huggingface_hub.constants import HF_HUB_CACHE
+    ref_file = os.path.join(HF_HUB_CACHE, "datasets--" + dataset_path.replace("/", "--"), "refs", revision)
+    try:
+        with open(ref_file) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class TokenizedDatasetCache:
+    """Tokenize edilmiş train/test split'lerini Arrow olarak diskte sakla"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def make_key(self, **components):
+        """
+        Cache anahtarı - key bileşenlerinden (dataset revision, tokenizer hash,
+        system prompt, use_reasoning, max_length, seed, ...) SHA-256
+        """
+        components = dict(components, cache_version=CACHE_VERSION)
+        payload = json.dumps(components, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16], components
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Cache'te varsa (train, test) döndür, yoksa None - Arrow dosyaları mmap ile açılır"""
+        path = self._path(key)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+
+        dataset = load_from_disk(os.path.join(path, "data"))
+
+        # Son erişim zamanı (evict --older_than için)
+        os.utime(os.path.join(path, "meta.json"))
+
+        return dataset["train"], dataset["test"]
+
+    def save(self, key, components, train_dataset, test_dataset):
+        """Split'leri kaydet (önce geçici dizine, sonra atomik rename)"""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        DatasetDict({"train": train_dataset, "test": test_dataset}).save_to_disk(os.path.join(tmp_path, "data"))
+
+        meta = {
+            "key": key,
+            "components": components,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "num_train": len(train_dataset),
+            "num_test": len(test_dataset)
+        }
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        """Cache'teki kayıtlar (meta + boyut + son erişim)"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for key in sorted(os.listdir(self.cache_dir)):
+            meta_file = os.path.join(self._path(key), "meta.json")
+            if not os.path.exists(meta_file):
+                continue
+            with open(meta_file) as f:
+                meta = json.load(f)
+            meta["size_bytes"] = _dir_size(self._path(key))
+            meta["last_access"] = os.path.getmtime(meta_file)
+            entries.append(meta)
+
+        return entries
+
+    def evict(self, key):
+        """Tek bir kaydı sil"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return False
+        shutil.rmtree(path)
+        return True
+
+    def evict_older_than(self, days):
+        """Son `days` gündür kullanılmayan kayıtları sil"""
+        cutoff = time.time() - days * 86400
+        evicted = [entry["key"] for entry in self.entries() if entry["last_access"] < cutoff]
+        for key in evicted:
+            self.evict(key)
+        return evicted
+
+    def clear(self):
+        """Tüm cache'i sil"""
+        evicted = [entry["key"] for entry in self.entries()]
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return evicted
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
@@ -1,7 +1,13 @@
 """Dataset Loading and Preprocessing"""
 
+import hashlib
+import json
+import time
 from datasets import load_dataset
 from config.training_config import TrainingConfig
+from data.dataset_cache import TokenizedDatasetCache, tokenizer_fingerprint, resolve_dataset_revision
+from data.local_corpus import is_local_corpus, load_local_corpus, load_local_corpus_streaming, corpus_fingerprint
+from data.dedup import MinHasher, deduplicate_splits
 
 class DatasetLoader:
     """Dataset yükleme ve preprocessing"""
@@ -9,18 +15,30 @@ class DatasetLoader:
     DEEP_DATASET = "Naholav/CodeGen-Deep-5K"
     DIVERSE_DATASET = "Naholav/CodeGen-Diverse-5K"
     
-    def __init__(self, dataset_name, tokenizer, use_reasoning=False):
+    def __init__(self, dataset_name, tokenizer, use_reasoning=False, num_proc=None, batch_size=None,
+                 revision=None, use_cache=None):
         """
         Args:
-            dataset_name: "deep" veya "diverse"
+            dataset_name: "deep", "diverse" veya local JSONL/Parquet dosya / dizin yolu
             tokenizer: Model tokenizer
             use_reasoning: output field kullan (reasoning ile) veya solution field (sadece kod)
+            num_proc: Tokenization worker sayısı (None = TrainingConfig.preprocessing_num_proc)
+            batch_size: Tokenizer'a tek seferde verilen örnek sayısı (None = TrainingConfig.preprocessing_batch_size)
+            revision: Hub dataset revision'ı (None = TrainingConfig.dataset_revision)
+            use_cache: Tokenize edilmiş split'leri diskte cache'le (None = TrainingConfig.use_dataset_cache)
         """
         self.tokenizer = tokenizer
         self.use_reasoning = use_reasoning
+        self.num_proc = num_proc if num_proc is not None else TrainingConfig.preprocessing_num_proc
+        self.batch_size = batch_size or TrainingConfig.preprocessing_batch_size
+        self.revision = revision or TrainingConfig.dataset_revision
+        self.use_cache = use_cache if use_cache is not None else TrainingConfig.use_dataset_cache
         
         # Dataset seç
-        if dataset_name.lower() == "deep":
+        self.is_local = is_local_corpus(dataset_name)
+        if self.is_local:
+            self.dataset_path = dataset_name
+        elif dataset_name.lower() == "deep":
             self.dataset_path = self.DEEP_DATASET
         elif dataset_name.lower() == "diverse":
             self.dataset_path = self.DIVERSE_DATASET
@@ -35,34 +53,308 @@ class DatasetLoader:
             self.system_prompt = TrainingConfig.SYSTEM_PROMPT_SOLUTION
             self.max_length = TrainingConfig.max_length_solution
     
-    def load_and_prepare(self):
-        """Dataset'i yükle ve preprocessing yap"""
-        # Dataset yükle
-        dataset = load_dataset(self.dataset_path)
+    RAW_COLUMNS = ["input", "output", "solution", "difficulty"]
+    
+    def load_and_prepare(self, packing=False, streaming=False, skip_examples=0):
+        """
+        Dataset'i yükle ve preprocessing yap
+        
+        Args:
+            packing: Örnekleri max_length'lik pencerelere paketle (position_ids ile)
+            streaming: Dataset'i belleğe almadan IterableDataset olarak işle
+            skip_examples: Streaming resume - train akışının başından atlanacak ham örnek
+                (tokenization'dan önce; bkz. training.trainer.stream_skip_examples)
+        """
+        if streaming:
+            if TrainingConfig.dedup:
+                raise ValueError("Dedup global index gerektirir, streaming modda desteklenmiyor")
+            return self._load_streaming(packing, skip_examples)
+        
+        # Cache kontrolü (hub dataset'i hiç indirilmediyse commit bilinmez - önce indirilir)
+        cache = None
+        dataset = None
+        revision = None
+        if self.use_cache:
+            revision = self.dataset_revision()
+            if revision is None:
+                dataset = self.load_raw()
+                revision = self.dataset_revision()
+            cache = TokenizedDatasetCache(TrainingConfig.dataset_cache_dir)
+            cache_key, cache_components = cache.make_key(**self._cache_components(packing, revision))
+            cached = cache.load(cache_key)
+            if cached is not None:
+                print(f"✓ Tokenize edilmiş dataset cache'ten yüklendi: {cache_key}")
+                train_dataset, test_dataset = cached
+                return train_dataset.with_format("torch"), test_dataset.with_format("torch")
+        
+        # Dataset yükle (anahtardaki commit'te)
+        if dataset is None:
+            dataset = self.load_raw(revision)
         
         # Train/test split
-        if "train" not in dataset:
+        if "test" not in dataset:
             # Eğer split yoksa, manuel split yap
             dataset = dataset["train"].train_test_split(test_size=0.1, seed=TrainingConfig.seed)
+        train_raw, test_raw = dataset["train"], dataset["test"]
+        
+        # Near-duplicate temizliği (tokenization'dan önce)
+        if TrainingConfig.dedup:
+            train_raw, test_raw = self._deduplicate(train_raw, test_raw)
         
         # Preprocessing
-        train_dataset = dataset["train"].map(
+        train_dataset = self.tokenize_dataset(train_raw, desc="Preprocessing train data")
+        test_dataset = self.tokenize_dataset(test_raw, desc="Preprocessing test data")
+        
+        # Packing - birden fazla örneği tek pencerede birleştir
+        if packing:
+            train_dataset = self._pack(train_dataset, desc="Packing train data")
+            test_dataset = self._pack(test_dataset, desc="Packing test data")
+        
+        # Cache'e yaz
+        if cache is not None:
+            cache.save(cache_key, cache_components, train_dataset, test_dataset)
+            print(f"✓ Tokenize edilmiş dataset cache'lendi: {cache_key}")
+        
+        return train_dataset.with_format("torch"), test_dataset.with_format("torch")
+    
+    def load_raw(self, revision=None):
+        """Ham (tokenize edilmemiş) DatasetDict - hub (revision = commit hash) veya local corpus"""
+        if self.is_local:
+            return load_local_corpus(self.dataset_path, self._required_columns())
+        return load_dataset(self.dataset_path, revision=revision or self.revision)
+    
+    def dataset_revision(self):
+        """
+        Cache anahtarındaki revision: local corpus'ta içerik hash'i, hub'da
+        pinlenmiş / local HF cache'teki commit (dataset hiç indirilmediyse None)
+        """
+        if self.is_local:
+            return corpus_fingerprint(self.dataset_path)
+        return resolve_dataset_revision(self.dataset_path, self.revision)
+    
+    def _deduplicate(self, train_raw, test_raw):
+        """MinHash/LSH ile within / train-test leakage / cross-dataset dedup"""
+        hasher = MinHasher(
+            num_perm=TrainingConfig.dedup_num_perm,
+            shingle_size=TrainingConfig.dedup_shingle_size,
+            seed=TrainingConfig.seed
+        )
+        
+        # Cross-dataset: referans dataset'lerin tüm split'leri
+        reference_datasets = {}
+        for name in TrainingConfig.dedup_against:
+            reference = DatasetLoader(name, self.tokenizer, use_reasoning=self.use_reasoning, use_cache=False).load_raw()
+            for split, split_dataset in reference.items():
+                reference_datasets[f"{name}/{split}"] = split_dataset
+        
+        train_raw, test_raw, _ = deduplicate_splits(
+            train_raw,
+            test_raw,
+            fields=self._required_columns(),
+            hasher=hasher,
+            threshold=TrainingConfig.dedup_threshold,
+            within=TrainingConfig.dedup_within,
+            leakage=TrainingConfig.dedup_remove_leakage,
+            reference_datasets=reference_datasets,
+            cache_dir=TrainingConfig.dedup_cache_dir,
+            num_proc=self.num_proc
+        )
+        
+        return train_raw, test_raw
+    
+    def _load_streaming(self, packing=False, skip_examples=0):
+        """
+        Streaming mod - RAM'den büyük corpus'lar için
+        
+        Örnekler iterasyon sırasında tokenize edilir. Train/test ayrımı
+        `input` hash'ine göre deterministiktir; karıştırma sınırlı bir
+        buffer ile yapılır, bellek kullanımı corpus boyutundan bağımsızdır.
+        """
+        if self.is_local:
+            dataset = load_local_corpus_streaming(self.dataset_path, self._required_columns())
+        else:
+            dataset = load_dataset(self.dataset_path, revision=self.revision, streaming=True)
+        
+        if "test" in dataset:
+            train_raw, test_raw = dataset["train"], dataset["test"]
+        else:
+            train_raw = dataset["train"].filter(lambda example: not self._is_test_example(example))
+            test_raw = dataset["train"].filter(self._is_test_example)
+        
+        # Sınırlı shuffle buffer (epoch başına seed + epoch ile yeniden karışır)
+        train_raw = train_raw.shuffle(seed=TrainingConfig.seed, buffer_size=TrainingConfig.streaming_shuffle_buffer)
+        
+        # Resume: shuffle'dan sonra (aynı sıra), tokenization'dan önce atla
+        if skip_examples:
+            train_raw = train_raw.skip(skip_examples)
+            print(f"✓ Streaming resume: ilk {skip_examples} train örneği tokenize edilmeden atlanıyor")
+        
+        # Eval için sabit boyutlu alt küme
+        if TrainingConfig.streaming_eval_samples:
+            test_raw = test_raw.take(TrainingConfig.streaming_eval_samples)
+        
+        train_dataset = self._tokenize_streaming(train_raw, packing)
+        test_dataset = self._tokenize_streaming(test_raw, packing)
+        
+        return train_dataset, test_dataset
+    
+    def _tokenize_streaming(self, dataset, packing=False):
+        """IterableDataset üzerinde lazy batched tokenization (ve packing)"""
+        columns = dataset.column_names or self.RAW_COLUMNS
+        tokenized = dataset.map(
             self._preprocess_function,
-            remove_columns=dataset["train"].column_names,
-            desc="Preprocessing train data"
+            batched=True,
+            batch_size=self.batch_size,
+            remove_columns=columns
         )
         
-        test_dataset = dataset["test"].map(
+        if packing:
+            tokenized = tokenized.map(
+                self._pack_function,
+                batched=True,
+                batch_size=TrainingConfig.packing_batch_size,
+                remove_columns=["input_ids", "length"]
+            )
+        
+        return tokenized.with_format("torch")
+    
+    def _is_test_example(self, example):
+        """Problem metninin hash'ine göre deterministik test ataması (streaming_test_fraction oranında)"""
+        digest = hashlib.md5(example["input"].encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % 1000 < TrainingConfig.streaming_test_fraction * 1000
+    
+    def _required_columns(self):
+        """Preprocessing'in kullandığı kolonlar - local okumada sadece bunlar yüklenir"""
+        return ["input", "output" if self.use_reasoning else "solution"]
+    
+    def _cache_components(self, packing, revision):
+        """Tokenize edilmiş çıktıyı belirleyen her şey - cache anahtarının girdisi"""
+        components = {
+            "dataset_path": self.dataset_path,
+            "dataset_revision": revision or self.revision or "main",
+            "tokenizer": tokenizer_fingerprint(self.tokenizer),
+            "system_prompt": self.system_prompt,
+            "use_reasoning": self.use_reasoning,
+            "max_length": self.max_length,
+            "seed": TrainingConfig.seed,
+            "packing": packing
+        }
+        if packing:
+            components["packing_batch_size"] = TrainingConfig.packing_batch_size
+        if TrainingConfig.dedup:
+            components["dedup"] = {
+                "threshold": TrainingConfig.dedup_threshold,
+                "num_perm": TrainingConfig.dedup_num_perm,
+                "shingle_size": TrainingConfig.dedup_shingle_size,
+                "within": TrainingConfig.dedup_within,
+                "leakage": TrainingConfig.dedup_remove_leakage,
+                "against": list(TrainingConfig.dedup_against),
+                "minhash_version": MinHasher.VERSION
+            }
+        return components
+    
+    def memory_cache_key(self, packing=False, streaming=False):
+        """
+        Process içi cache anahtarı (train_matrix) - disk cache'in bileşenleri
+        + streaming'de akışı belirleyen ayarlar (batch, test oranı, buffer)
+        """
+        # Streaming hub dataset'i pinlenmiş revision'dan okunur (local commit çözülmez)
+        revision = self.dataset_revision() if self.is_local or not streaming else None
+        components = dict(self._cache_components(packing, revision), streaming=streaming)
+        if streaming:
+            components.update({
+                "preprocessing_batch_size": self.batch_size,
+                "streaming_test_fraction": TrainingConfig.streaming_test_fraction,
+                "streaming_shuffle_buffer": TrainingConfig.streaming_shuffle_buffer,
+                "streaming_eval_samples": TrainingConfig.streaming_eval_samples
+            })
+        return json.dumps(components, sort_keys=True, ensure_ascii=False)
+    
+    def tokenize_dataset(self, dataset, desc=None):
+        """Batched (ve opsiyonel multi-process) tokenization, süre raporu ile"""
+        start = time.perf_counter()
+        
+        tokenized = dataset.map(
             self._preprocess_function,
-            remove_columns=dataset["test"].column_names,
-            desc="Preprocessing test data"
+            batched=True,
+            batch_size=self.batch_size,
+            num_proc=self.num_proc,
+            remove_columns=dataset.column_names,
+            desc=desc
         )
         
-        return train_dataset, test_dataset
+        elapsed = time.perf_counter() - start
+        rate = len(dataset) / elapsed if elapsed > 0 else float("inf")
+        print(f"{desc or 'Preprocessing'}: {len(dataset)} örnek, {elapsed:.2f}s ({rate:.0f} örnek/s, num_proc={self.num_proc or 1})")
+        
+        return tokenized
+    
+    def _pack(self, dataset, desc=None):
+        """Tokenize edilmiş dataset'i paketle ve özet yazdır"""
+        num_examples = len(dataset)
+        
+        packed = dataset.map(
+            self._pack_function,
+            batched=True,
+            batch_size=TrainingConfig.packing_batch_size,
+            num_proc=self.num_proc,
+            remove_columns=dataset.column_names,
+            desc=desc
+        )
+        
+        fill = sum(packed["length"]) / (len(packed) * self.max_length) if len(packed) else 0.0
+        print(f"Packing: {num_examples} örnek -> {len(packed)} pencere (doluluk: {fill:.1%})")
+        
+        return packed
+    
+    def _pack_function(self, examples):
+        """
+        Örnekleri max_length'lik pencerelere yerleştir (first-fit decreasing)
+        
+        Her doküman kendi position_ids'ini 0'dan başlatır; model bu sınırlardan
+        dokümanlar arası attention'ı engeller. Dokümanlar pencereler arasında
+        bölünmez, her birinin sonuna EOS eklenir.
+        """
+        eos_token_id = self.tokenizer.eos_token_id
+        
+        # EOS ekle (sığmıyorsa son token'ın yerine)
+        documents = [
+            input_ids[:self.max_length - 1] + [eos_token_id]
+            for input_ids in examples["input_ids"]
+        ]
+        
+        # First-fit decreasing
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]), reverse=True)
+        windows = []
+        remaining = []
+        for i in order:
+            doc_length = len(documents[i])
+            for w, space in enumerate(remaining):
+                if doc_length <= space:
+                    windows[w].append(i)
+                    remaining[w] -= doc_length
+                    break
+            else:
+                windows.append([i])
+                remaining.append(self.max_length - doc_length)
+        
+        # Labels kolonu yok - collator input_ids'ten türetir ve
+        # position_ids == 0 olan doküman başlarını loss'tan çıkarır
+        packed = {"input_ids": [], "position_ids": [], "length": []}
+        for window in windows:
+            input_ids, position_ids = [], []
+            for i in window:
+                input_ids.extend(documents[i])
+                position_ids.extend(range(len(documents[i])))
+            packed["input_ids"].append(input_ids)
+            packed["position_ids"].append(position_ids)
+            packed["length"].append(len(input_ids))
+        
+        return packed
     
     def _preprocess_function(self, examples):
         """
-        Her örneği model formatına çevir
+        Bir batch örneği model formatına çevir (batched map)
         
         Dataset fields:
         - input: Problem açıklaması
@@ -72,23 +364,28 @@ class DatasetLoader:
         """
         # Field seç
         if self.use_reasoning:
-            code_field = examples["output"]
+            code_fields = examples["output"]
         else:
-            code_field = examples["solution"]
+            code_fields = examples["solution"]
         
-        # Prompt oluştur
-        prompt = f"{self.system_prompt}\n\nProblem:\n{examples['input']}\n\nSolution:\n{code_field}"
+        # Prompt'ları oluştur
+        prompts = [
+            f"{self.system_prompt}\n\nProblem:\n{problem}\n\nSolution:\n{code}"
+            for problem, code in zip(examples["input"], code_fields)
+        ]
         
-        # Tokenize
+        # Batch tokenize (padding yok - collator her batch'i dinamik olarak pad eder)
         tokenized = self.tokenizer(
-            prompt,
+            prompts,
             truncation=True,
             max_length=self.max_length,
-            padding="max_length",
+            return_attention_mask=False,
             return_tensors=None
         )
         
-        # Labels = input_ids (causal LM için)
-        tokenized["labels"] = tokenized["input_ids"].copy()
-        
-        return tokenized
+        # Sadece input_ids saklanır: labels ve attention_mask collator'da türetilir
+        return {
+            "input_ids": tokenized["input_ids"],
+            # Uzunluk - length-grouped sampler ve padding raporu için
+            "length": [len(input_ids) for input_ids in tokenized["input_ids"]]
+        }
@@ -0,0 +1,322 @@
+"""Near-Duplicate Detection (MinHash + LSH)"""
+
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+class MinHasher:
+    """Kelime n-gram shingle'larından MinHash imzası"""
+
+    # Permütasyonlar değişince artır - eski imza / dataset cache'leri geçersiz olur
+    VERSION = 2
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=42):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        # (a * h + b) mod p permütasyonları - h < 2^32, a/b < 2^31:
+        # a * h + b < 2^63 + 2^31, uint64'te taşma yok
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def params(self):
+        return {"num_perm": self.num_perm, "shingle_size": self.shingle_size, "seed": self.seed,
+                "version": self.VERSION}
+
+    def _shingles(self, tag, text):
+        tokens = _WORD_RE.findall((text or "").lower())
+        if len(tokens) <= self.shingle_size:
+            return {f"{tag}:{' '.join(tokens)}"}
+        return {
+            f"{tag}:{' '.join(tokens[i:i + self.shingle_size])}"
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+
+    def signature(self, texts):
+        """
+        Args:
+            texts: {alan adı: metin} - her alanın shingle'ları etiketlenip birleştirilir
+        """
+        shingles = set()
+        for tag, text in texts.items():
+            shingles |= self._shingles(tag, text)
+
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = ((hashes[:, None] * self.a + self.b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def batch_signatures(self, examples, fields):
+        """datasets.map(batched=True) için"""
+        return {
+            "minhash": [
+                self.signature({field: examples[field][i] for field in fields}).tolist()
+                for i in range(len(examples[fields[0]]))
+            ]
+        }
+
+
+def content_key(example, fields):
+    """Örnek içeriğinin hash'i - imza cache'inin anahtarı"""
+    payload = json.dumps([example[field] for field in fields], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).digest()
+
+
+class SignatureCache:
+    """
+    MinHash imzalarını içerik hash'ine göre diskte sakla
+
+    Aynı parametrelerle tekrar çalıştırmada sadece yeni örneklerin imzası hesaplanır.
+    """
+
+    def __init__(self, cache_dir, params):
+        params_key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, params_key)
+        self.index = {}
+        self.signatures = np.zeros((0, params["num_perm"]), dtype=np.uint64)
+
+        keys_file = os.path.join(self.path, "keys.npy")
+        if os.path.exists(keys_file):
+            keys = np.load(keys_file)
+            self.signatures = np.load(os.path.join(self.path, "signatures.npy"))
+            self.index = {k.tobytes(): i for i, k in enumerate(keys)}
+
+    def get(self, keys):
+        """Cache'te olanların imzaları ve eksik index'ler"""
+        found = {}
+        missing = []
+        for i, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                found[i] = self.signatures[row]
+        return found, missing
+
+    def put(self, keys, signatures):
+        # Aynı içerik batch'te birden fazla kez geçebilir (birebir duplicate) - tek satır
+        new = {}
+        for key, sig in zip(keys, signatures):
+            if key not in self.index and key not in new:
+                new[key] = sig
+        if not new:
+            return
+
+        start = len(self.signatures)
+        self.signatures = np.concatenate([self.signatures, np.array(list(new.values()), dtype=np.uint64)])
+        for offset, key in enumerate(new):
+            self.index[key] = start + offset
+
+        os.makedirs(self.path, exist_ok=True)
+        # Digest'ler uint8 matris olarak (S dtype sondaki \x00 byte'larını kırpar)
+        ordered = sorted(self.index, key=self.index.get)
+        keys_array = np.frombuffer(b"".join(ordered), dtype=np.uint8).reshape(len(ordered), -1)
+        np.save(os.path.join(self.path, "keys.tmp.npy"), keys_array)
+        np.save(os.path.join(self.path, "signatures.tmp.npy"), self.signatures)
+        os.replace(os.path.join(self.path, "keys.tmp.npy"), os.path.join(self.path, "keys.npy"))
+        os.replace(os.path.join(self.path, "signatures.tmp.npy"), os.path.join(self.path, "signatures.npy"))
+
+
+def compute_signatures(dataset, fields, hasher, cache_dir=None, num_proc=None):
+    """
+    Dataset'teki tüm örneklerin MinHash imzaları (N x num_perm)
+
+    Cache'te olmayanlar datasets.map ile num_proc worker'da hesaplanır.
+    """
+    keys = [content_key(example, fields) for example in dataset.select_columns(fields)]
+
+    cache = SignatureCache(cache_dir, dict(hasher.params(), fields=fields)) if cache_dir else None
+    found, missing = cache.get(keys) if cache else ({}, list(range(len(keys))))
+
+    signatures = np.zeros((len(keys), hasher.num_perm), dtype=np.uint64)
+    for i, sig in found.items():
+        signatures[i] = sig
+
+    if missing:
+        computed = dataset.select(missing).select_columns(fields).map(
+            hasher.batch_signatures,
+            fn_kwargs={"fields": fields},
+            batched=True,
+            num_proc=num_proc,
+            remove_columns=fields,
+            desc="MinHash"
+        )
+        computed = np.array(computed["minhash"], dtype=np.uint64)
+        signatures[missing] = computed
+        if cache:
+            cache.put([keys[i] for i in missing], computed)
+
+    print(f"MinHash: {len(keys)} örnek ({len(keys) - len(missing)} cache'ten, {len(missing)} yeni)")
+
+    return signatures
+
+
+def lsh_params(num_perm, threshold):
+    """
+    Band / satır sayısı - LSH eşiği (1/b)^(1/r) hedef eşiğin hemen altında
+    kalacak şekilde (adaylar sonradan imza benzerliğiyle doğrulanır)
+    """
+    best = (1, num_perm)
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        if (1 / bands) ** (1 / rows) <= threshold:
+            return bands, rows
+        best = (bands, rows)
+    return best
+
+
+class LSHIndex:
+    """MinHash imzaları için band tabanlı LSH index"""
+
+    def __init__(self, num_perm, threshold):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+        self.signatures = []
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, signature):
+        idx = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self.buckets[band][key].append(idx)
+        return idx
+
+    def query(self, signature):
+        """Eşiği geçen (imza benzerliği ile doğrulanmış) index'ler"""
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        return [
+            idx for idx in candidates
+            if np.mean(self.signatures[idx] == signature) >= self.threshold
+        ]
+
+
+def find_clusters(signatures, threshold):
+    """Near-duplicate kümeleri (union-find) - her küme index listesi"""
+    parent = list(range(len(signatures)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    index = LSHIndex(signatures.shape[1], threshold)
+    for i, signature in enumerate(signatures):
+        for j in index.query(signature):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        index.add(signature)
+
+    clusters = defaultdict(list)
+    for i in range(len(signatures)):
+        clusters[find(i)].append(i)
+    return list(clusters.values())
+
+
+def matches_reference(signatures, reference_signatures, threshold):
+    """Referans imzalardan biriyle near-duplicate olan örneklerin index'leri"""
+    index = LSHIndex(signatures.shape[1], threshold)
+    for signature in reference_signatures:
+        index.add(signature)
+    return [i for i, signature in enumerate(signatures) if index.query(signature)]
+
+
+def cluster_stats(clusters):
+    """Küme istatistikleri"""
+    sizes = [len(c) for c in clusters]
+    duplicate_sizes = [s for s in sizes if s > 1]
+    return {
+        "examples": sum(sizes),
+        "clusters": len(clusters),
+        "duplicate_clusters": len(duplicate_sizes),
+        "duplicates": sum(duplicate_sizes) - len(duplicate_sizes),
+        "largest_cluster": max(sizes) if sizes else 0,
+        "size_histogram": dict(sorted(Counter(duplicate_sizes).items()))
+    }
+
+
+def print_cluster_stats(name, stats):
+    print(
+        f"Dedup [{name}]: {stats['examples']} örnek, {stats['duplicate_clusters']} duplicate küme, "
+        f"{stats['duplicates']} fazlalık örnek, en büyük küme: {stats['largest_cluster']}"
+    )
+    if stats["size_histogram"]:
+        print(f"  Küme boyutu dağılımı: {stats['size_histogram']}")
+
+
+def deduplicate_splits(train, test, fields, hasher, threshold, within=True, leakage=True,
+                       reference_datasets=(), cache_dir=None, num_proc=None):
+    """
+    Train/test split'lerine dedup uygula
+
+    Args:
+        train, test: Ham (tokenize edilmemiş) Dataset'ler
+        fields: İmzaya giren alanlar (örn. ["input", "solution"])
+        hasher: MinHasher
+        threshold: Jaccard eşiği
+        within: Her split içinde kümeden sadece ilk örneği tut
+        leakage: Test'teki bir örneğin near-duplicate'i olan train örneklerini çıkar
+        reference_datasets: {isim: Dataset} - bunlarla çakışan train örneklerini çıkar (cross-dataset)
+        cache_dir: İmza cache dizini
+        num_proc: İmza hesaplama worker sayısı
+
+    Returns:
+        (train, test, rapor)
+    """
+    report = {}
+    train_signatures = compute_signatures(train, fields, hasher, cache_dir, num_proc)
+    test_signatures = compute_signatures(test, fields, hasher, cache_dir, num_proc)
+
+    keep_train = np.ones(len(train), dtype=bool)
+    keep_test = np.ones(len(test), dtype=bool)
+
+    if within:
+        for name, signatures, keep in (("train", train_signatures, keep_train), ("test", test_signatures, keep_test)):
+            clusters = find_clusters(signatures, threshold)
+            stats = cluster_stats(clusters)
+            print_cluster_stats(name, stats)
+            report[f"within_{name}"] = stats
+            for cluster in clusters:
+                keep[sorted(cluster)[1:]] = False
+
+    if leakage:
+        leaked = matches_reference(train_signatures, test_signatures[keep_test], threshold)
+        keep_train[leaked] = False
+        report["leakage"] = len(leaked)
+        print(f"Dedup [train/test leakage]: {len(leaked)} train örneği test ile çakışıyor")
+
+    for name, reference in dict(reference_datasets).items():
+        reference_signatures = compute_signatures(reference, fields, hasher, cache_dir, num_proc)
+        overlapping = matches_reference(train_signatures, reference_signatures, threshold)
+        keep_train[overlapping] = False
+        report[f"cross_{name}"] = len(overlapping)
+        print(f"Dedup [cross: {name}]: {len(overlapping)} train örneği {name} ile çakışıyor")
+
+    report["train_before"], report["train_after"] = len(train), int(keep_train.sum())
+    report["test_before"], report["test_after"] = len(test), int(keep_test.sum())
+    print(f"Dedup sonucu - train: {len(train)} -> {keep_train.sum()}, test: {len(test)} -> {keep_test.sum()}")
+
+    return (
+        train.select(np.flatnonzero(keep_train)),
+        test.select(np.flatnonzero(keep_test)),
+        report
+    )
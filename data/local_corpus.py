@@ -0,0 +1,149 @@
+"""Local Corpus Reader (JSONL / Parquet)"""
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import pyarrow as pa
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+from datasets import Dataset, DatasetDict, IterableDataset, IterableDatasetDict
+
+JSONL_EXTENSIONS = (".jsonl", ".json")
+PARQUET_EXTENSIONS = (".parquet",)
+
+# Opsiyonel alanlar dosyada yoksa okuma hata vermez - kolon -> Arrow tipi
+# (metin kolonları string okunur; difficulty sayısal, 1-9)
+OPTIONAL_COLUMNS = {"difficulty": pa.int64()}
+
+
+def is_local_corpus(path):
+    """dataset_name bir dosya / dizin mi (hub ID yerine)"""
+    return os.path.exists(path)
+
+
+def find_split_files(path):
+    """
+    Split -> dosya listesi
+
+    Tek dosya: hepsi "train". Dizin: train*.{jsonl,parquet} / test*.{...}
+    dosyaları varsa split'ler onlardan, yoksa tüm dosyalar "train".
+    """
+    if os.path.isfile(path):
+        return {"train": [path]}
+
+    files = sorted(
+        f for f in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+        if f.endswith(JSONL_EXTENSIONS + PARQUET_EXTENSIONS)
+    )
+    if not files:
+        raise ValueError(f"Local corpus'ta JSONL/Parquet dosyası bulunamadı: {path}")
+
+    splits = {}
+    for split in ("train", "test"):
+        split_files = [f for f in files if os.path.basename(f).startswith(split)]
+        if split_files:
+            splits[split] = split_files
+
+    if "train" not in splits:
+        return {"train": files}
+    return splits
+
+
+def corpus_fingerprint(path):
+    """Dosya yolu + boyut + mtime - cache anahtarında dataset revision yerine"""
+    entries = []
+    for split, files in sorted(find_split_files(path).items()):
+        for f in files:
+            stat = os.stat(f)
+            entries.append([split, os.path.abspath(f), stat.st_size, int(stat.st_mtime)])
+    return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()[:16]
+
+
+def _json_schema(columns):
+    """JSONL explicit schema: metin kolonları string, opsiyonel kolonlar kendi tipiyle"""
+    return pa.schema([(c, OPTIONAL_COLUMNS.get(c, pa.string())) for c in columns])
+
+
+def _cast_optional(table):
+    """Parquet'ten gelen opsiyonel kolonları ortak tipe çevir (concat için şema aynı olmalı)"""
+    for name, dtype in OPTIONAL_COLUMNS.items():
+        index = table.schema.get_field_index(name)
+        if index >= 0 and table.schema.field(index).type != dtype:
+            table = table.set_column(index, name, table.column(index).cast(dtype))
+    return table
+
+
+def _read_table(filename, columns):
+    """Tek dosyayı sadece istenen kolonlarla, memory-mapped olarak oku"""
+    if filename.endswith(PARQUET_EXTENSIONS):
+        available = set(pq.read_schema(filename, memory_map=True).names)
+        return _cast_optional(pq.read_table(
+            filename,
+            columns=[c for c in columns if c in available],
+            memory_map=True
+        ))
+
+    # JSONL: explicit schema + ignore -> projeksiyon dışı alanlar parse edilmez
+    parse_options = pa_json.ParseOptions(explicit_schema=_json_schema(columns), unexpected_field_behavior="ignore")
+    with pa.memory_map(filename) as source:
+        return pa_json.read_json(source, parse_options=parse_options)
+
+
+def load_local_corpus(path, columns):
+    """
+    Local JSONL/Parquet corpus'u DatasetDict olarak yükle
+
+    Args:
+        path: Dosya veya dizin
+        columns: Okunacak kolonlar (diğerleri hiç yüklenmez)
+    """
+    columns = list(columns) + [c for c in OPTIONAL_COLUMNS if c not in columns]
+
+    splits = {}
+    for split, files in find_split_files(path).items():
+        tables = [_read_table(f, columns) for f in files]
+        splits[split] = Dataset(pa.concat_tables(tables))
+
+    return DatasetDict(splits)
+
+
+def _iter_files(columns, files):
+    """Dosyaları batch batch oku ve satır satır döndür (streaming)"""
+    for filename in files:
+        if filename.endswith(PARQUET_EXTENSIONS):
+            parquet_file = pq.ParquetFile(filename, memory_map=True)
+            available = set(parquet_file.schema_arrow.names)
+            batches = parquet_file.iter_batches(columns=[c for c in columns if c in available])
+        elif hasattr(pa_json, "open_json"):
+            parse_options = pa_json.ParseOptions(explicit_schema=_json_schema(columns), unexpected_field_behavior="ignore")
+            batches = pa_json.open_json(filename, parse_options=parse_options)
+        else:
+            # Eski pyarrow: satır satır oku
+            yield from _iter_jsonl_lines(filename, columns)
+            continue
+
+        for batch in batches:
+            yield from batch.to_pylist()
+
+
+def _iter_jsonl_lines(filename, columns):
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield {c: row.get(c) for c in columns}
+
+
+def load_local_corpus_streaming(path, columns):
+    """Local corpus'u IterableDataset olarak aç (dosya başına shard)"""
+    columns = list(columns) + [c for c in OPTIONAL_COLUMNS if c not in columns]
+
+    # gen_kwargs'taki listeler shard'lara bölünür - sadece dosya listesi verilir
+    generator = functools.partial(_iter_files, columns)
+
+    return IterableDatasetDict({
+        split: IterableDataset.from_generator(generator, gen_kwargs={"files": files})
+        for split, files in find_split_files(path).items()
+    })
@@ -3,42 +3,75 @@ LoRA Fine-Tuned Models Demo
 Qwen2.5-Coder-1.5B with DEEP and DIVERSE datasets
 """
 
+import os
 import gradio as gr
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+from models.model_loader import load_model_and_tokenizer, load_merged_model
+from models.adapter_manager import AdapterManager
+from models.batched_inference import MixedAdapterEngine
+from models.cpu_inference import prepare_cpu_model
 
 # Global variables for models
-models = {}
+adapter_manager = None
+engine = None
 tokenizer = None
-base_model = None
+merged_models = {}
+
+# Optional: directory with merged exports (scripts/merge_lora.py) in DEEP/ and DIVERSE/
+MERGED_MODELS_DIR = os.environ.get("MERGED_MODELS_DIR")
+
+# Optional: CPU serving mode ("fp32", "bf16" or "int8" dynamic quantization)
+CPU_INFERENCE_MODE = os.environ.get("CPU_INFERENCE_MODE")
+
+# Adapter name -> HuggingFace repo (or local checkpoint directory)
+ADAPTERS = {
+    "DEEP": "bodhai/qwen-coder-lora-deep",
+    "DIVERSE": "bodhai/qwen-coder-lora-diverse"
+}
 
 def load_models():
-    """Load base model and both LoRA adapters"""
-    global models, tokenizer, base_model
+    """Load base model once and both LoRA adapters into a shared registry"""
+    global adapter_manager, engine, tokenizer
+    
+    if MERGED_MODELS_DIR:
+        load_merged_models()
+        return
     
     print("Loading base model...")
-    base_model = AutoModelForCausalLM.from_pretrained(
-        "Qwen/Qwen2.5-Coder-1.5B-Instruct",
-        torch_dtype=torch.bfloat16,
-        device_map="auto"
-    )
-    tokenizer = AutoTokenizer.from_pretrained("Qwen/Qwen2.5-Coder-1.5B-Instruct")
+    # Pinned local snapshot + meta-device init (no gradient checkpointing for inference)
+    base_model, tokenizer = load_model_and_tokenizer(gradient_checkpointing=False)
     
-    print("Loading DEEP model...")
-    models["DEEP"] = PeftModel.from_pretrained(
-        base_model,
-        "bodhai/qwen-coder-lora-deep"
-    )
+    # Adapters share the base weights; switching is a set_adapter call
+    manager = AdapterManager(base_model, max_resident=len(ADAPTERS))
+    for name, path in ADAPTERS.items():
+        print(f"Loading {name} model...")
+        manager.register(name, path)
+        manager.activate(name)
     
-    print("Loading DIVERSE model...")
-    models["DIVERSE"] = PeftModel.from_pretrained(
-        base_model,
-        "bodhai/qwen-coder-lora-diverse"
-    )
+    if CPU_INFERENCE_MODE:
+        # All adapters are resident, so the model can be quantized once
+        manager.finalize(lambda model: prepare_cpu_model(model, CPU_INFERENCE_MODE))
+    adapter_manager = manager
+    engine = MixedAdapterEngine(manager, tokenizer)
     
     print("✓ All models loaded!")
 
+def load_merged_models():
+    """Load merged exports directly (no PEFT layers, lowest per-token latency)"""
+    global merged_models, tokenizer
+    
+    for name in ADAPTERS:
+        print(f"Loading merged {name} model...")
+        model, tokenizer = load_merged_model(
+            os.path.join(MERGED_MODELS_DIR, name),
+            device="cpu" if CPU_INFERENCE_MODE else None
+        )
+        if CPU_INFERENCE_MODE:
+            model = prepare_cpu_model(model, CPU_INFERENCE_MODE)
+        merged_models[name] = model
+    
+    print("✓ All merged models loaded!")
+
 def generate_code(
     problem,
     model_choice,
@@ -49,7 +82,7 @@ def generate_code(
 ):
     """Generate code solution using selected model"""
     
-    if not models:
+    if adapter_manager is None and not merged_models:
         return "❌ Models not loaded yet. Please wait..."
     
     # System prompt
@@ -58,20 +91,27 @@ def generate_code(
     # Full prompt
     prompt = f"{system_prompt}\n\nProblem:\n{problem}\n\nSolution:\n"
     
-    # Tokenize
-    inputs = tokenizer(prompt, return_tensors="pt").to(models[model_choice].device)
+    generation_kwargs = dict(
+        max_new_tokens=max_tokens,
+        temperature=temperature,
+        top_p=top_p,
+        do_sample=do_sample,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
     
-    # Generate
-    with torch.no_grad():
-        outputs = models[model_choice].generate(
-            **inputs,
-            max_new_tokens=max_tokens,
-            temperature=temperature,
-            top_p=top_p,
-            do_sample=do_sample,
-            pad_token_id=tokenizer.pad_token_id,
-            eos_token_id=tokenizer.eos_token_id
-        )
+    if merged_models:
+        model = merged_models[model_choice]
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        with torch.no_grad():
+            outputs = model.generate(**inputs, **generation_kwargs)
+    else:
+        # Generate (adapter stays active for the whole call)
+        with adapter_manager.use(model_choice) as model, torch.no_grad():
+            # Tokenize
+            inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+            
+            outputs = model.generate(**inputs, **generation_kwargs)
     
     # Decode
     generated = tokenizer.decode(outputs[0], skip_special_tokens=True)
@@ -88,12 +128,28 @@ def compare_models(
     max_tokens,
     do_sample
 ):
-    """Compare both models side by side"""
+    """Compare both models side by side (one mixed-adapter batch)"""
+    
+    if merged_models:
+        # Merged models are separate networks - no shared batch
+        deep_solution = generate_code(problem, "DEEP", temperature, top_p, max_tokens, do_sample)
+        diverse_solution = generate_code(problem, "DIVERSE", temperature, top_p, max_tokens, do_sample)
+        return deep_solution, diverse_solution
     
-    deep_solution = generate_code(problem, "DEEP", temperature, top_p, max_tokens, do_sample)
-    diverse_solution = generate_code(problem, "DIVERSE", temperature, top_p, max_tokens, do_sample)
+    if engine is None:
+        message = "❌ Models not loaded yet. Please wait..."
+        return message, message
+    
+    solutions = engine.compare(
+        problem,
+        ["DEEP", "DIVERSE"],
+        max_new_tokens=max_tokens,
+        temperature=temperature,
+        top_p=top_p,
+        do_sample=do_sample
+    )
     
-    return deep_solution, diverse_solution
+    return solutions["DEEP"], solutions["DIVERSE"]
 
 # Example problems
 examples = [
@@ -4,15 +4,36 @@ import torch
 from tqdm import tqdm
 from typing import List, Dict
 from evaluation.metrics import calculate_metrics
+from models.batched_inference import build_prompt
+from models.compilation import compile_generation, enable_compile_cache
+from config.training_config import TrainingConfig
 
 class ModelEvaluator:
     """Checkpoint değerlendirme"""
     
-    def __init__(self, model, tokenizer, device="cuda"):
+    def __init__(self, model, tokenizer, device="cuda", use_compile=None):
         self.model = model
         self.tokenizer = tokenizer
         self.device = device
         self.model.eval()
+        
+        # Static KV cache + compile edilmiş decode (TrainingConfig.compile_generation)
+        use_compile = TrainingConfig.compile_generation if use_compile is None else use_compile
+        if use_compile:
+            self.enable_compile()
+    
+    @classmethod
+    def from_merged(cls, model_path: str, device: str = None, use_compile: bool = None):
+        """Merge edilmiş export'tan (PEFT'siz) evaluator oluştur"""
+        from models.model_loader import load_merged_model
+        
+        model, tokenizer = load_merged_model(model_path, device=device)
+        return cls(model, tokenizer, device=model.device, use_compile=use_compile)
+    
+    def enable_compile(self):
+        """Modeli son haliyle compile et (quantization vb. dönüşümlerden sonra çağrılmalı)"""
+        enable_compile_cache()
+        compile_generation(self.model)
     
     def generate_solution(self, problem: str, max_new_tokens: int = 512) -> str:
         """
@@ -29,7 +50,7 @@ class ModelEvaluator:
         prompt = f"You are an expert Python programmer. Please read the problem carefully before writing any Python code.\n\nProblem:\n{problem}\n\nSolution:\n"
         
         # Tokenize
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+        inputs = self.tokenizer(prompt, return_tensors="pt", return_token_type_ids=False).to(self.device)
         
         # Generate
         with torch.no_grad():
@@ -92,3 +113,59 @@ class ModelEvaluator:
             "predictions": predictions,
             "references": references
         }
+
+
+def evaluate_adapters(engine, adapter_names: List[str], test_dataset, num_samples: int = None,
+                      max_new_tokens: int = 512) -> Dict[str, Dict]:
+    """
+    Birden fazla adapter'ı aynı örnekler üzerinde tek batch'li decode ile değerlendir
+    
+    Her örnek için prompt tüm adapter'lara aynı batch'te verilir
+    (MixedAdapterEngine) - N checkpoint için N seri decode yerine bir decode.
+    
+    Args:
+        engine: MixedAdapterEngine
+        adapter_names: Değerlendirilecek adapter'lar (hepsi aynı anda bellekte tutulabilmeli)
+        test_dataset: Test dataset
+        num_samples: Değerlendirilecek örnek sayısı (None = hepsi)
+        max_new_tokens: Maksimum token sayısı
+    
+    Returns:
+        {adapter adı: {"metrics", "predictions", "references"}}
+    """
+    if num_samples:
+        test_dataset = test_dataset.select(range(min(num_samples, len(test_dataset))))
+    
+    predictions = {name: [] for name in adapter_names}
+    references = []
+    
+    print(f"Evaluating {len(test_dataset)} samples x {len(adapter_names)} adapters (mixed batch)...")
+    
+    for example in tqdm(test_dataset):
+        prompt = build_prompt(example.get("input", ""))
+        references.append(example.get("solution", ""))
+        
+        try:
+            solutions = engine.generate(
+                [prompt] * len(adapter_names),
+                adapter_names,
+                max_new_tokens=max_new_tokens,
+                temperature=0.7,
+                top_p=0.95,
+                do_sample=True
+            )
+        except Exception as e:
+            print(f"Error generating solution: {e}")
+            solutions = [""] * len(adapter_names)
+        
+        for name, solution in zip(adapter_names, solutions):
+            predictions[name].append(solution.strip())
+    
+    return {
+        name: {
+            "metrics": calculate_metrics(predictions[name], references),
+            "predictions": predictions[name],
+            "references": references
+        }
+        for name in adapter_names
+    }
@@ -0,0 +1,155 @@
+"""Multi-Adapter Registry (tek base model, hot-swap LoRA adapter'lar)"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from peft import PeftModel
+from config.model_config import ModelConfig
+
+class AdapterManager:
+    """
+    Base model bir kez yüklenir, LoRA adapter'lar isimle eklenip değiştirilir
+
+    Adapter'lar ilk kullanımda load_adapter ile yüklenir; aktif olan
+    set_adapter ile seçilir. Bellekte en fazla `max_resident` adapter tutulur,
+    fazlası en uzun süredir kullanılmayandan başlayarak silinir (LRU).
+    """
+
+    def __init__(self, base_model, max_resident=None):
+        """
+        Args:
+            base_model: Yüklenmiş base model (load_model_and_tokenizer)
+            max_resident: Bellekte tutulacak maksimum adapter sayısı (None = ModelConfig)
+        """
+        self.base_model = base_model
+        self.max_resident = max_resident or ModelConfig.max_resident_adapters
+        self.model = None  # İlk adapter yüklenince PeftModel
+        self.paths = {}  # isim -> checkpoint dizini / hub ID
+        self.resident = OrderedDict()  # isim -> None (LRU sırası: baştaki en eski)
+        self.active = None
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0, "load_seconds": 0.0}
+        self.frozen = False  # finalize sonrası yeni adapter yüklenemez
+        self._lock = threading.RLock()
+
+    def register(self, name, path):
+        """Adapter'ı kaydet (yükleme ilk kullanımda yapılır)"""
+        # PEFT adapter isimleri modül anahtarı olur - "." içeremez
+        name = name.replace(".", "_")
+        self.paths[name] = path
+        return name
+
+    def activate(self, name):
+        """
+        Adapter'ı aktif yap (bellekte yoksa yükle)
+
+        Returns:
+            Aktif adapter'lı PeftModel
+        """
+        with self._lock:
+            if name not in self.paths:
+                raise KeyError(f"Kayıtlı olmayan adapter: {name} (kayıtlı: {list(self.paths)})")
+
+            if name in self.resident:
+                self.stats["hits"] += 1
+                self.resident.move_to_end(name)
+            else:
+                self._load(name)
+
+            if self.active != name:
+                self.model.set_adapter(name)
+                self.active = name
+
+            self._evict()
+            return self.model
+
+    @contextmanager
+    def use(self, name):
+        """Adapter'ı blok boyunca aktif tut (eşzamanlı isteklerde değişmez)"""
+        with self._lock:
+            yield self.activate(name)
+
+    @contextmanager
+    def use_many(self, names):
+        """
+        Birden fazla adapter'ı aynı anda bellekte tut (mixed-adapter batch için)
+
+        "__base__" adapter'sız base model satırı anlamına gelir.
+        """
+        unique = [n for n in dict.fromkeys(names) if n != "__base__"]
+        if len(unique) > self.max_resident:
+            raise ValueError(
+                f"Batch'te {len(unique)} farklı adapter var, max_resident={self.max_resident}"
+            )
+
+        with self._lock:
+            for name in unique:
+                self.activate(name)
+            yield self.model
+
+    def finalize(self, transform):
+        """
+        Yüklü adapter'larla modeli dönüştür (örn. CPU int8 quantization)
+
+        Dönüşümden sonra yeni adapter yüklenemez/silinemez; sadece yüklü
+        adapter'lar arasında geçiş yapılabilir.
+        """
+        with self._lock:
+            if self.model is None:
+                raise RuntimeError("finalize için önce en az bir adapter yüklenmeli")
+            self.model = transform(self.model)
+            self.frozen = True
+            return self.model
+
+    def _load(self, name):
+        if self.frozen:
+            raise RuntimeError(f"Model finalize edildi, yeni adapter yüklenemez: {name}")
+        start = time.perf_counter()
+        path = self.paths[name]
+
+        # low_cpu_mem_usage: LoRA katmanları meta device'ta kurulur, random init yapılmaz
+        if self.model is None:
+            self.model = PeftModel.from_pretrained(
+                self.base_model,
+                path,
+                adapter_name=name,
+                low_cpu_mem_usage=True
+            )
+            self.model.eval()
+        else:
+            self.model.load_adapter(path, adapter_name=name, low_cpu_mem_usage=True)
+
+        seconds = time.perf_counter() - start
+        self.resident[name] = None
+        self.stats["loads"] += 1
+        self.stats["load_seconds"] += seconds
+        print(f"✓ Adapter yüklendi: {name} ({seconds * 1000:.0f} ms)")
+
+    def _evict(self):
+        """Limit aşıldıysa en eski adapter'ları sil (aktif adapter en sonda, silinmez)"""
+        while len(self.resident) > self.max_resident and not self.frozen:
+            oldest = next(iter(self.resident))
+            self.model.delete_adapter(oldest)
+            del self.resident[oldest]
+            self.stats["evictions"] += 1
+            print(f"  Adapter bellekten çıkarıldı (LRU): {oldest}")
+
+    def unload(self, name):
+        """Adapter'ı bellekten çıkar (kayıt kalır)"""
+        with self._lock:
+            if name not in self.resident:
+                return False
+            if self.frozen:
+                raise RuntimeError(f"Model finalize edildi, adapter çıkarılamaz: {name}")
+            if len(self.resident) == 1:
+                # PEFT son adapter'ın silinmesine izin vermez - base model'e dönülür
+                self.base_model = self.model.unload()
+                self.model = None
+                self.active = None
+            else:
+                if self.active == name:
+                    self.active = next(n for n in reversed(self.resident) if n != name)
+                    self.model.set_adapter(self.active)
+                self.model.delete_adapter(name)
+            del self.resident[name]
+            return True
@@ -0,0 +1,108 @@
+"""Attention Backend Seçimi (eager / sdpa / flash_attention_2)"""
+
+import platform
+import torch
+from config.training_config import TrainingConfig
+
+# Tercih sırası: en hızlı / en az bellek kullanan önce
+ATTENTION_BACKENDS = ["flash_attention_2", "sdpa", "eager"]
+
+
+def probe_attention_backend(backend, torch_dtype=torch.bfloat16, device=None):
+    """
+    Backend bu host'ta çalışabilir mi?
+
+    Returns:
+        (destekleniyor mu, neden)
+    """
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+    if backend == "eager":
+        return True, ""
+
+    if backend == "sdpa":
+        from transformers.utils import is_torch_sdpa_available
+        if not is_torch_sdpa_available():
+            return False, "torch sürümü SDPA desteklemiyor"
+        return True, ""
+
+    if backend == "flash_attention_2":
+        if platform.system() == "Windows":
+            return False, "Windows'ta desteklenmiyor"
+        if device == "cpu" or not torch.cuda.is_available():
+            return False, "CUDA gerekir"
+        from transformers.utils import is_flash_attn_2_available
+        if not is_flash_attn_2_available():
+            return False, "flash_attn paketi kurulu değil"
+        major, minor = torch.cuda.get_device_capability()
+        if major < 8:
+            return False, f"GPU compute capability {major}.{minor} < 8.0 (Ampere+)"
+        if torch_dtype not in (torch.float16, torch.bfloat16):
+            return False, f"fp16/bf16 gerekir ({torch_dtype})"
+        return True, ""
+
+    raise ValueError(f"Bilinmeyen attention backend: {backend} (seçenekler: {ATTENTION_BACKENDS})")
+
+
+def attention_candidates(requested=None, use_flash_attention=True, torch_dtype=torch.bfloat16, device=None):
+    """
+    Denenecek backend'ler (tercih sırasıyla, sadece host'ta desteklenenler)
+
+    Args:
+        requested: "auto" / "eager" / "sdpa" / "flash_attention_2" (None = TrainingConfig.attn_implementation)
+        use_flash_attention: "auto"da flash_attention_2 denensin mi
+        torch_dtype: Model dtype'ı
+        device: Hedef device
+
+    Returns:
+        Backend listesi - ilki tercih edilen, sonrakiler yükleme hatasında fallback
+    """
+    requested = requested or TrainingConfig.attn_implementation
+
+    if requested == "auto":
+        order = [b for b in ATTENTION_BACKENDS if use_flash_attention or b != "flash_attention_2"]
+    else:
+        # Açıkça istenen backend önce, desteklenmezse daha basit olanlara düş
+        order = ATTENTION_BACKENDS[ATTENTION_BACKENDS.index(requested):]
+
+    candidates = []
+    for backend in order:
+        supported, reason = probe_attention_backend(backend, torch_dtype, device)
+        if supported:
+            candidates.append(backend)
+        elif backend == requested or (requested == "auto" and backend == "flash_attention_2"):
+            print(f"⚠️ Attention backend {backend} kullanılamıyor: {reason}")
+
+    return candidates
+
+
+def load_with_attention_fallback(load_fn, candidates):
+    """
+    load_fn(attn_implementation)'ı adaylarla sırayla dene
+
+    Probe geçse de yükleme / ilk forward hata verirse (sürüm uyumsuzluğu,
+    driver vb.) bir sonraki backend'e düşülür.
+
+    Returns:
+        model
+    """
+    for i, backend in enumerate(candidates):
+        try:
+            model = load_fn(backend)
+            if backend == "flash_attention_2":
+                _verify_forward(model)
+            print(f"✓ Attention backend: {backend}")
+            return model
+        except (ImportError, ValueError, RuntimeError) as e:
+            if i == len(candidates) - 1:
+                raise
+            print(f"⚠️ {backend} ile yükleme başarısız ({e}), {candidates[i + 1]} deneniyor")
+
+    raise RuntimeError("Kullanılabilir attention backend yok")
+
+
+def _verify_forward(model):
+    """Kısa bir forward ile kernel'in gerçekten çalıştığını doğrula"""
+    input_ids = torch.ones((1, 8), dtype=torch.long, device=model.device)
+    with torch.no_grad():
+        model(input_ids=input_ids)
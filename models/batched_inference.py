@@ -0,0 +1,94 @@
+"""Mixed-Adapter Batched Inference"""
+
+import torch
+from config.training_config import TrainingConfig
+
+BASE_ADAPTER = "__base__"  # Adapter'sız base model satırı
+
+
+def build_prompt(problem):
+    """Training ile aynı prompt formatı (çözüm kısmı boş)"""
+    return f"{TrainingConfig.SYSTEM_PROMPT_SOLUTION}\n\nProblem:\n{problem}\n\nSolution:\n"
+
+
+class MixedAdapterEngine:
+    """
+    Farklı LoRA adapter'lara giden istekleri tek batch'te üret
+
+    Base model matmul'u tüm batch için bir kez çalışır; her satırın adapter
+    delta'sı (B @ A @ x) o adapter'ın satırları toplanarak (gather) eklenir.
+    Bu yol PEFT'in `adapter_names` desteğiyle sağlanır - N adapter'lı
+    karşılaştırma N seri decode yerine tek batch'li decode olur.
+    """
+
+    def __init__(self, adapter_manager, tokenizer):
+        """
+        Args:
+            adapter_manager: AdapterManager (adapter'lar aynı base model üzerinde)
+            tokenizer: Tokenizer
+        """
+        self.adapter_manager = adapter_manager
+        self.tokenizer = tokenizer
+
+    def generate_ids(self, input_ids, attention_mask, adapter_names, **generation_kwargs):
+        """
+        Token seviyesinde mixed-adapter generate
+
+        Args:
+            input_ids, attention_mask: Sol padding'li batch
+            adapter_names: Her satırın adapter'ı (BASE_ADAPTER = adapter'sız)
+
+        Returns:
+            Sadece üretilen token'lar (batch x yeni token)
+        """
+        if len(adapter_names) != input_ids.shape[0]:
+            raise ValueError(f"{input_ids.shape[0]} satır için {len(adapter_names)} adapter adı verildi")
+
+        with self.adapter_manager.use_many(adapter_names) as model, torch.no_grad():
+            outputs = model.generate(
+                input_ids=input_ids.to(model.device),
+                attention_mask=attention_mask.to(model.device),
+                adapter_names=list(adapter_names),
+                **generation_kwargs
+            )
+
+        return outputs[:, input_ids.shape[1]:]
+
+    def generate(self, prompts, adapter_names, max_new_tokens=512, **generation_kwargs):
+        """
+        Her prompt'u kendi adapter'ıyla üret (tek batch)
+
+        Args:
+            prompts: Prompt listesi
+            adapter_names: Her prompt'un adapter adı
+            max_new_tokens: Maksimum token sayısı
+
+        Returns:
+            Üretilen metinler (prompt hariç)
+        """
+        # Batch generate için sol padding (yeni token'lar hizalı başlar)
+        padding_side = self.tokenizer.padding_side
+        self.tokenizer.padding_side = "left"
+        try:
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, return_token_type_ids=False)
+        finally:
+            self.tokenizer.padding_side = padding_side
+
+        generation_kwargs.setdefault("pad_token_id", self.tokenizer.pad_token_id)
+        generation_kwargs.setdefault("eos_token_id", self.tokenizer.eos_token_id)
+
+        new_tokens = self.generate_ids(
+            inputs["input_ids"],
+            inputs["attention_mask"],
+            adapter_names,
+            max_new_tokens=max_new_tokens,
+            **generation_kwargs
+        )
+
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def compare(self, problem, adapter_names, **generation_kwargs):
+        """Aynı problemi tüm adapter'larla tek batch'te çöz"""
+        prompt = build_prompt(problem)
+        solutions = self.generate([prompt] * len(adapter_names), adapter_names, **generation_kwargs)
+        return {name: solution.strip() for name, solution in zip(adapter_names, solutions)}
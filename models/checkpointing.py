@@ -0,0 +1,191 @@
+"""Seçici Gradient Checkpointing Politikaları"""
+
+import functools
+import torch
+from torch.utils.checkpoint import checkpoint
+from config.training_config import TrainingConfig
+
+# full: tüm decoder katmanları (eski davranış), every_k: her k'ıncı katman,
+# mlp: sadece MLP blokları, budget: bellek bütçesine sığacak kadar katman, none: kapalı
+GC_POLICIES = ["full", "every_k", "mlp", "budget", "none"]
+
+
+def _base_model(model):
+    """PeftModel ise altındaki transformers modeli"""
+    return model.get_base_model() if hasattr(model, "get_base_model") else model
+
+
+def decoder_layers(model):
+    """Decoder katman listesi (Qwen2 / Llama tarzı model.model.layers)"""
+    base = _base_model(model)
+    inner = getattr(base, "model", base)
+    if not hasattr(inner, "layers"):
+        raise ValueError(f"{type(base).__name__} içinde decoder katmanları bulunamadı")
+    return inner.layers
+
+
+def estimate_layer_activation_bytes(config, tokens, dtype_bytes=2, lora=True):
+    """
+    Bir decoder katmanının backward için sakladığı aktivasyonlar (yaklaşık)
+
+    Token başına: norm giriş/çıkışları, q/k/v + rotary, attention çıkışı,
+    residual (~9h + 3kv) ve MLP gate/up/act (~4I). LoRA dropout'u hedef
+    modüllerin girişlerini ayrıca saklar (~6h + I). SDPA / flash attention
+    varsayılır (L^2 attention matrisi saklanmaz).
+    """
+    hidden = config.hidden_size
+    intermediate = config.intermediate_size
+    kv = config.num_key_value_heads * (hidden // config.num_attention_heads)
+
+    elements = 9 * hidden + 3 * kv + 4 * intermediate
+    if lora:
+        elements += 6 * hidden + intermediate
+
+    return elements * tokens * dtype_bytes
+
+
+def layers_for_memory_budget(model, tokens, budget_bytes, dtype_bytes=2):
+    """
+    Bütçeye sığmak için checkpoint edilmesi gereken en az katman sayısı
+
+    Sabit kısım: parametreler + trainable parametrelerin grad/Adam state'leri
+    + fp32 logits (loss). Checkpoint edilen katman sadece girişini saklar,
+    backward sırasında tek bir katman tekrar tam aktivasyon üretir.
+
+    Returns:
+        (checkpoint edilecek katman sayısı, tahmini tepe bellek byte)
+    """
+    base = _base_model(model)
+    config = base.config
+    num_layers = len(decoder_layers(model))
+
+    parameter_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    # Grad (aynı dtype) + Adam exp_avg / exp_avg_sq (fp32)
+    trainable_bytes = sum(p.numel() * (p.element_size() + 8) for p in model.parameters() if p.requires_grad)
+    logits_bytes = tokens * config.vocab_size * 4 * 2
+    fixed = parameter_bytes + trainable_bytes + logits_bytes
+
+    full_layer = estimate_layer_activation_bytes(config, tokens, dtype_bytes)
+    checkpointed_layer = config.hidden_size * tokens * dtype_bytes
+
+    for num_checkpointed in range(num_layers + 1):
+        peak = fixed + (num_layers - num_checkpointed) * full_layer + num_checkpointed * checkpointed_layer
+        if num_checkpointed:
+            peak += full_layer  # Backward'da tekrar hesaplanan katman
+        if peak <= budget_bytes:
+            return num_checkpointed, peak
+
+    return num_layers, peak
+
+
+def _checkpoint_mlp(mlp):
+    """MLP forward'ını non-reentrant checkpoint ile sar (modül isimleri değişmez)"""
+    if hasattr(mlp, "_original_forward"):
+        return
+
+    mlp._original_forward = mlp.forward
+
+    @functools.wraps(mlp._original_forward)
+    def forward(*args, **kwargs):
+        if mlp.training and torch.is_grad_enabled():
+            return checkpoint(mlp._original_forward, *args, use_reentrant=False, **kwargs)
+        return mlp._original_forward(*args, **kwargs)
+
+    mlp.forward = forward
+
+
+def _restore_mlp(mlp):
+    if hasattr(mlp, "_original_forward"):
+        mlp.forward = mlp._original_forward
+        del mlp._original_forward
+
+
+def _default_budget_bytes():
+    if torch.cuda.is_available():
+        return int(torch.cuda.get_device_properties(0).total_memory * 0.9)
+    return None
+
+
+def apply_gradient_checkpointing(model, policy=None, every_k=None, memory_budget_gb=None, tokens_per_batch=None,
+                                 verbose=True):
+    """
+    Gradient checkpointing politikasını uygula
+
+    Tekrar çağrılabilir: önceki politika geri alınıp yenisi kurulur.
+
+    Args:
+        model: Base model veya PeftModel
+        policy: GC_POLICIES'ten biri (None = TrainingConfig.gradient_checkpointing_policy)
+        every_k: "every_k" için k (None = TrainingConfig)
+        memory_budget_gb: "budget" için bütçe (None = TrainingConfig, o da None ise GPU belleğinin %90'ı)
+        tokens_per_batch: "budget" için micro-batch token sayısı (None = max_length_solution x batch)
+        verbose: Seçilen katmanları yazdır
+
+    Returns:
+        Checkpoint edilen katman index'leri ("mlp": MLP'si checkpoint edilen katmanlar)
+    """
+    config = TrainingConfig()
+    policy = policy or config.gradient_checkpointing_policy
+    every_k = every_k or config.gradient_checkpointing_every_k
+    if policy not in GC_POLICIES:
+        raise ValueError(f"Geçersiz gradient checkpointing politikası: {policy} (seçenekler: {GC_POLICIES})")
+
+    base = _base_model(model)
+    layers = decoder_layers(model)
+    for layer in layers:
+        _restore_mlp(layer.mlp)
+
+    if policy == "none":
+        if base.is_gradient_checkpointing:
+            base.gradient_checkpointing_disable()
+        return []
+
+    if policy == "full":
+        # Eski davranış: tüm katmanlar (transformers varsayılanı, compile açıkken non-reentrant)
+        if config.torch_compile:
+            base.gradient_checkpointing_enable(gradient_checkpointing_kwargs={"use_reentrant": False})
+        else:
+            base.gradient_checkpointing_enable()
+            # Reentrant checkpoint'te LoRA'ya gradient akması için katman girdisi requires_grad olmalı
+            # (embedding donuk; LoRA yüklendikten sonra açılınca PEFT bunu yapmaz)
+            if not hasattr(base, "_require_grads_hook"):
+                base.enable_input_require_grads()
+        selected = list(range(len(layers)))
+    else:
+        # Seçici politikalar non-reentrant checkpoint kullanır (input'ların requires_grad'ı gerekmez)
+        base.gradient_checkpointing_enable(gradient_checkpointing_kwargs={"use_reentrant": False})
+
+        if policy == "every_k":
+            selected = list(range(0, len(layers), every_k))
+        elif policy == "mlp":
+            selected = []
+        else:
+            budget_gb = memory_budget_gb or config.gradient_checkpointing_memory_budget_gb
+            budget_bytes = budget_gb * 2**30 if budget_gb else _default_budget_bytes()
+            if budget_bytes is None:
+                raise ValueError("budget politikası için gradient_checkpointing_memory_budget_gb ayarlanmalı (GPU yok)")
+
+            tokens = tokens_per_batch or config.max_length_solution * config.per_device_batch_size
+            dtype_bytes = next(base.parameters()).element_size()
+            count, peak = layers_for_memory_budget(model, tokens, budget_bytes, dtype_bytes)
+            # Checkpoint edilen katmanlar derinliğe eşit dağıtılır
+            selected = sorted({round(i * len(layers) / count) for i in range(count)}) if count else []
+            if verbose:
+                print(f"Bellek bütçesi {budget_bytes / 2**30:.1f} GB, {tokens} token/micro-batch: "
+                      f"{count}/{len(layers)} katman checkpoint (tahmini tepe {peak / 2**30:.2f} GB)")
+
+        for i, layer in enumerate(layers):
+            layer.gradient_checkpointing = i in selected
+
+        if policy == "mlp":
+            for layer in layers:
+                _checkpoint_mlp(layer.mlp)
+            selected = list(range(len(layers)))
+
+    # Checkpoint edilmeyen katmanlar train modunda KV cache oluşturmasın
+    base.config.use_cache = False
+
+    if verbose:
+        print(f"Gradient checkpointing: {policy} ({len(selected)}/{len(layers)} katman"
+              f"{', sadece MLP' if policy == 'mlp' else ''})")
+    return selected
@@ -0,0 +1,113 @@
+"""torch.compile Modu (training + static KV cache ile generation)"""
+
+import os
+import time
+import torch
+from transformers import CompileConfig
+from config.training_config import TrainingConfig
+
+
+def _base_model(model):
+    """PeftModel ise altındaki transformers modeli (generate / _cache orada)"""
+    return model.get_base_model() if hasattr(model, "get_base_model") else model
+
+
+def default_compile_mode(device=None):
+    """CUDA'da CUDA graph'lı "reduce-overhead", CPU'da "default" (CUDA graph yok)"""
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    return "reduce-overhead" if str(device).startswith("cuda") else "default"
+
+
+def enable_compile_cache(cache_dir=None):
+    """
+    Inductor / AOTAutograd artifact'larını diskte sakla
+
+    Yeniden başlatmada aynı graph'lar için C++/Triton kodu tekrar üretilmez;
+    sadece Dynamo tracing tekrar yapılır. İlk torch.compile çağrısından önce
+    çağrılmalı.
+
+    Returns:
+        Mutlak cache dizini
+    """
+    cache_dir = os.path.abspath(cache_dir or TrainingConfig.compile_cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("TRITON_CACHE_DIR", os.path.join(cache_dir, "triton"))
+
+    import torch._functorch.config as functorch_config
+    import torch._inductor.config as inductor_config
+    inductor_config.fx_graph_cache = True
+    functorch_config.enable_autograd_cache = True
+
+    return cache_dir
+
+
+def compile_generation(model, max_cache_len=None, mode=None, batch_size=1):
+    """
+    generate()'i static KV cache + compile edilmiş decode adımıyla çalıştır
+
+    Prefill eager kalır, token başına decode forward'ı compile edilir
+    (transformers auto-compile). Isınma generate'i KV cache'i max_cache_len
+    boyutunda ayırır ve decode graph'ını compile eder; sonraki daha kısa
+    istekler aynı cache'i reset edip kullanır, farklı prompt uzunlukları
+    yeniden compile ettirmez.
+
+    Args:
+        model: Base model veya PeftModel
+        max_cache_len: Prompt + yeni token üst sınırı (None = TrainingConfig.compile_max_cache_len)
+        mode: torch.compile modu (None = default_compile_mode)
+        batch_size: generate batch boyutu (farklı batch boyutu yeni cache + compile demek)
+
+    Returns:
+        Isınma süresi (s)
+    """
+    base = _base_model(model)
+    max_cache_len = max_cache_len or TrainingConfig.compile_max_cache_len
+
+    mode = mode or default_compile_mode(base.device)
+    if mode == "default" and base.device.type == "cpu":
+        # CPU inference: freezing ağırlıkları sabit olarak katlar (adapter merge / değişiminden sonra tekrar compile gerekir)
+        compile_config = CompileConfig(fullgraph=False, dynamic=False, mode=None, options={"freezing": True})
+    else:
+        compile_config = CompileConfig(fullgraph=False, dynamic=False, mode=mode)
+    # transformers varsayılanda sadece CUDA'da compile eder
+    compile_config._compile_all_devices = True
+
+    base.generation_config.cache_implementation = "static"
+    base.generation_config.compile_config = compile_config
+
+    # max_cache_len - 2 token prompt + 2 yeni token: ikinci token compile edilmiş decode adımından gelir
+    input_ids = torch.zeros((batch_size, max_cache_len - 2), dtype=torch.long, device=base.device)
+    start = time.perf_counter()
+    with torch.no_grad():
+        model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            max_new_tokens=2,
+            min_new_tokens=2,
+            do_sample=False,
+            pad_token_id=0
+        )
+    seconds = time.perf_counter() - start
+    print(f"✓ Generation compile edildi: static cache {max_cache_len} token, ısınma {seconds:.1f}s")
+
+    return seconds
+
+
+def training_compile_kwargs(device=None):
+    """
+    TrainingArguments için compile ayarları (TrainingConfig.torch_compile)
+
+    Reentrant gradient checkpointing Dynamo'da graph break üretir; compile
+    açıkken non-reentrant kullanılır.
+    """
+    if not TrainingConfig.torch_compile:
+        return {}
+
+    enable_compile_cache()
+    return {
+        "torch_compile": True,
+        "torch_compile_mode": TrainingConfig.compile_mode or default_compile_mode(device),
+        "gradient_checkpointing_kwargs": {"use_reentrant": False}
+    }
@@ -0,0 +1,100 @@
+"""CPU Inference (thread ayarı + dinamik int8 quantization)"""
+
+import warnings
+import torch
+from config.model_config import ModelConfig
+from utils.distributed import configure_cpu_threads
+
+CPU_MODES = ["fp32", "bf16", "int8"]
+
+
+def _quantizable_linears(model, quantize_lm_head=False):
+    """
+    Dinamik quantization'a girecek Linear modüllerin isimleri
+
+    LoRA katmanları (lora_A / lora_B) hariç: PEFT bunların .weight'ine erişir
+    ve zaten parametrelerin çok küçük bir kısmı. lm_head varsayılan olarak
+    hariç: embedding ile tied olduğundan quantize etmek ayrı bir kopya açar.
+    """
+    names = set()
+    for name, module in model.named_modules():
+        if not isinstance(module, torch.nn.Linear):
+            continue
+        if "lora_" in name:
+            continue
+        if name.split(".")[-1] == "lm_head" and not quantize_lm_head:
+            continue
+        names.add(name)
+    return names
+
+
+def quantize_dynamic_int8(model, quantize_lm_head=False):
+    """
+    Linear katmanları dinamik int8'e çevir (ağırlık int8, aktivasyon runtime'da)
+
+    Model önce fp32'ye alınır (dinamik quantization fp32 Linear bekler).
+    Merged model ya da adapter'ı takılmış PeftModel ile çalışır; adapter
+    quantization'dan sonra yüklenemez.
+    """
+    from torch.ao.quantization import quantize_dynamic
+
+    model = model.float().eval()
+    names = _quantizable_linears(model, quantize_lm_head)
+
+    with warnings.catch_warnings():
+        # torch.ao.quantization deprecation uyarısı (torchao'ya taşınıyor)
+        warnings.simplefilter("ignore", DeprecationWarning)
+        quantize_dynamic(model, qconfig_spec=names, dtype=torch.qint8, inplace=True)
+
+    print(f"✓ Dinamik int8 quantization: {len(names)} Linear katman")
+    return model
+
+
+def prepare_cpu_model(model, mode="int8", num_threads=None):
+    """
+    Modeli CPU inference'a hazırla
+
+    Args:
+        model: Merged model veya PeftModel (CPU'da)
+        mode: "fp32", "bf16" veya "int8"
+        num_threads: Thread sayısı (None = ModelConfig.cpu_num_threads / atanmış CPU sayısı)
+
+    Returns:
+        Hazır model
+    """
+    if mode not in CPU_MODES:
+        raise ValueError(f"Geçersiz CPU modu: {mode} (seçenekler: {CPU_MODES})")
+
+    threads = configure_cpu_threads(num_threads or ModelConfig.cpu_num_threads)
+    model = model.to("cpu")
+
+    if mode == "int8":
+        model = quantize_dynamic_int8(model)
+    elif mode == "fp32":
+        model = model.float()
+    else:
+        model = model.to(torch.bfloat16)
+
+    print(f"✓ CPU inference: {mode}, {threads} thread")
+    return model.eval()
+
+
+def model_size_bytes(model):
+    """Parametre + buffer + paketlenmiş int8 ağırlıkların bellekteki boyutu"""
+    total = 0
+    seen = set()
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        if tensor.data_ptr() in seen:
+            continue
+        seen.add(tensor.data_ptr())
+        total += tensor.numel() * tensor.element_size()
+
+    for module in model.modules():
+        packed = getattr(module, "_packed_params", None)
+        if packed is not None and hasattr(packed, "_weight_bias"):
+            weight, bias = packed._weight_bias()
+            total += weight.numel() * weight.element_size()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+
+    return total
@@ -1,15 +1,22 @@
 """LoRA Configuration Setup"""
 
-from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training
+import json
+import os
+import time
+import torch
+from peft import LoraConfig, PeftModel, get_peft_model, prepare_model_for_kbit_training
 from config.model_config import ModelConfig
 
-def setup_lora(model, use_8bit=False):
+MERGE_INFO_FILE = "merge_info.json"
+
+def setup_lora(model, use_8bit=False, rank_allocation=None):
     """
     LoRA konfigürasyonunu modele uygula
     
     Args:
         model: Base model
         use_8bit: 8-bit training kullanılıyor mu
+        rank_allocation: Modül bazlı rank'ler (models.rank_allocation, None = tüm modüllerde lora_r)
     
     Returns:
         LoRA ile yapılandırılmış model
@@ -27,7 +34,9 @@ def setup_lora(model, use_8bit=False):
         lora_dropout=config.lora_dropout,
         target_modules=config.lora_target_modules,
         bias="none",
-        task_type=config.task_type
+        task_type=config.task_type,
+        rank_pattern=rank_allocation["rank_pattern"] if rank_allocation else {},
+        alpha_pattern=rank_allocation["alpha_pattern"] if rank_allocation else {}
     )
     
     # LoRA'yı modele uygula
@@ -37,3 +46,114 @@ def setup_lora(model, use_8bit=False):
     model.print_trainable_parameters()
     
     return model
+
+
+def is_merged_export(path):
+    """Dizin merge_lora_checkpoint çıktısı mı (adapter değil, tam model)"""
+    return os.path.exists(os.path.join(path, MERGE_INFO_FILE))
+
+
+def _logits(model, inputs):
+    with torch.no_grad():
+        logits = model(**inputs).logits.float()
+    # Pad pozisyonları karşılaştırmaya katılmaz
+    return logits[inputs["attention_mask"].bool()]
+
+
+def measure_token_latency(model, tokenizer, prompt, new_tokens=64, repeats=3):
+    """
+    Greedy decode'da token başına ortalama gecikme (ms)
+    
+    Args:
+        model: PeftModel veya merged model
+        prompt: Ölçüm prompt'u
+        new_tokens: Üretilecek token sayısı (EOS'ta erken durmaz)
+        repeats: Tekrar sayısı (ilk çalıştırma ısınma)
+    """
+    inputs = tokenizer(prompt, return_tensors="pt", return_token_type_ids=False).to(model.device)
+    generation_kwargs = dict(
+        max_new_tokens=new_tokens,
+        min_new_tokens=new_tokens,
+        do_sample=False,
+        pad_token_id=tokenizer.pad_token_id
+    )
+    
+    with torch.no_grad():
+        model.generate(**inputs, **generation_kwargs)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.generate(**inputs, **generation_kwargs)
+    
+    return (time.perf_counter() - start) / (repeats * new_tokens) * 1000
+
+
+def merge_lora_checkpoint(base_model, tokenizer, checkpoint_path, output_dir, sample_prompts, tolerance=None,
+                          latency_tokens=0):
+    """
+    LoRA checkpoint'ini base ağırlıklara merge et ve tek başına model olarak kaydet
+    
+    Merge öncesi (PEFT) ve sonrası logit'ler örnek prompt'larda karşılaştırılır;
+    fark tolerance'ı aşarsa export yazılmaz.
+    
+    Args:
+        base_model: Base model (merge yerinde yapılır - tekrar kullanılmamalı)
+        tokenizer: Tokenizer (export'a birlikte kaydedilir)
+        checkpoint_path: LoRA checkpoint dizini
+        output_dir: Export dizini (safetensors)
+        sample_prompts: Doğrulama prompt'ları
+        tolerance: max |fark| / max |logit| sınırı (None = ModelConfig.merge_tolerance)
+        latency_tokens: > 0 ise PEFT ve merged model için token başına gecikme ölçülür
+    
+    Returns:
+        merged model, merge bilgisi (dict)
+    """
+    tolerance = ModelConfig.merge_tolerance if tolerance is None else tolerance
+    
+    model = PeftModel.from_pretrained(base_model, checkpoint_path)
+    model.eval()
+    
+    padding_side = tokenizer.padding_side
+    tokenizer.padding_side = "left"
+    try:
+        inputs = tokenizer(sample_prompts, return_tensors="pt", padding=True, return_token_type_ids=False).to(model.device)
+    finally:
+        tokenizer.padding_side = padding_side
+    
+    peft_logits = _logits(model, inputs)
+    peft_latency = measure_token_latency(model, tokenizer, sample_prompts[0], latency_tokens) if latency_tokens else None
+    
+    # safe_merge: NaN üreten adapter'lar merge edilmeden yakalanır
+    merged = model.merge_and_unload(safe_merge=True)
+    merged.eval()
+    
+    merged_logits = _logits(merged, inputs)
+    max_diff = (merged_logits - peft_logits).abs().max().item()
+    relative_diff = max_diff / max(peft_logits.abs().max().item(), 1e-6)
+    top1_agreement = (merged_logits.argmax(-1) == peft_logits.argmax(-1)).float().mean().item()
+    
+    print(f"Logit karşılaştırması: max |fark| = {max_diff:.2e} (göreli {relative_diff:.2e}), "
+          f"top-1 uyum = {top1_agreement:.2%}")
+    if relative_diff > tolerance:
+        raise ValueError(f"Merged logit'ler PEFT modelden sapıyor: göreli fark {relative_diff:.2e} > {tolerance:.2e}")
+    
+    merged_latency = measure_token_latency(merged, tokenizer, sample_prompts[0], latency_tokens) if latency_tokens else None
+    
+    # Tek başına yüklenebilir model (safetensors) + tokenizer
+    merged.save_pretrained(output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(output_dir)
+    
+    info = {
+        "checkpoint": os.path.abspath(checkpoint_path),
+        "base_model": ModelConfig.model_name,
+        "dtype": str(next(merged.parameters()).dtype).replace("torch.", ""),
+        "num_prompts": len(sample_prompts),
+        "max_abs_logit_diff": max_diff,
+        "relative_logit_diff": relative_diff,
+        "top1_agreement": top1_agreement,
+        "peft_ms_per_token": peft_latency,
+        "merged_ms_per_token": merged_latency
+    }
+    with open(os.path.join(output_dir, MERGE_INFO_FILE), "w") as f:
+        json.dump(info, f, indent=2)
+    
+    return merged, info
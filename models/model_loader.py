@@ -1,26 +1,151 @@
 """Base Model Loading"""
 
+import json
+import os
+import struct
+import time
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 from config.model_config import ModelConfig
 from config.training_config import TrainingConfig
+from models.attention import attention_candidates, load_with_attention_fallback
+from models.checkpointing import apply_gradient_checkpointing
+from utils.distributed import configure_cpu_threads, is_distributed, main_process_first, rank_device
 
-def load_model_and_tokenizer(use_flash_attention=True, load_in_8bit=False):
+# safetensors header dtype -> torch dtype
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+
+# Snapshot'a indirilecek dosyalar (safetensors dışındaki ağırlık formatları hariç)
+SNAPSHOT_PATTERNS = ["*.json", "*.safetensors", "*.txt", "*.model", "*.tiktoken", "*.py"]
+
+
+class StartupTimer:
+    """Yükleme aşamalarının süresini ölç ve raporla"""
+    
+    def __init__(self):
+        self.phases = []
+    
+    def phase(self, name):
+        return _Phase(self, name)
+    
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+    
+    def report(self):
+        print("\nStartup süreleri:")
+        for name, seconds in self.phases:
+            print(f"  {name:<28} {seconds:7.2f}s")
+        print(f"  {'TOPLAM':<28} {self.total():7.2f}s")
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.timer.phases.append((self.name, time.perf_counter() - self.start))
+        return False
+
+
+def ensure_local_snapshot(model_name=None, revision=None, snapshot_dir=None):
     """
-    Base model ve tokenizer'ı yükle
+    Modelin pinlenmiş local snapshot'ını döndür (yoksa bir kez indir)
     
-    Args:
-        use_flash_attention: Flash Attention 2 kullan (memory optimization)
-        load_in_8bit: 8-bit quantization (OOM durumunda)
+    Snapshot hazırsa hub'a hiç istek atılmaz. model_name zaten local dizinse
+    olduğu gibi döner.
     
     Returns:
-        model, tokenizer
+        Snapshot dizini
     """
-    config = ModelConfig()
+    model_name = model_name or ModelConfig.model_name
+    revision = revision or ModelConfig.model_revision
+    snapshot_dir = snapshot_dir or ModelConfig.model_snapshot_dir
     
-    # Tokenizer
+    if os.path.isdir(model_name):
+        return model_name
+    
+    local_dir = os.path.join(snapshot_dir, model_name.replace("/", "--"))
+    pin_file = os.path.join(local_dir, "snapshot.json")
+    
+    if os.path.exists(pin_file):
+        with open(pin_file) as f:
+            pinned = json.load(f)
+        # revision verilmediyse mevcut snapshot kullanılır
+        if revision is None or pinned.get("revision") == revision:
+            return local_dir
+    
+    from huggingface_hub import HfApi, snapshot_download
+    
+    resolved = HfApi().model_info(model_name, revision=revision).sha
+    print(f"Model snapshot indiriliyor: {model_name}@{resolved[:10]} -> {local_dir}")
+    snapshot_download(
+        repo_id=model_name,
+        revision=resolved,
+        local_dir=local_dir,
+        allow_patterns=SNAPSHOT_PATTERNS
+    )
+    
+    with open(pin_file, "w") as f:
+        json.dump({"model_name": model_name, "revision": resolved}, f, indent=2)
+    
+    return local_dir
+
+
+def mmap_safetensors(filename):
+    """
+    safetensors dosyasındaki tensörleri memory-mapped olarak aç
+    
+    Tensörler dosyanın page cache'ini doğrudan kullanır (MAP_PRIVATE) -
+    kopya ya da dtype dönüşümü yapılmaz.
+    
+    Returns:
+        {isim: tensor}
+    """
+    with open(filename, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+    
+    data_start = 8 + header_size
+    storage = torch.UntypedStorage.from_file(filename, shared=False, nbytes=os.path.getsize(filename))
+    
+    tensors = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        offset = data_start + begin
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        
+        if offset % itemsize:
+            # Hizalanmamış tensör (karışık dtype'lı dosyalar): sadece bu tensör kopyalanır
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, offset, (end - begin,))
+            tensors[name] = raw.clone().view(dtype).reshape(info["shape"])
+        else:
+            tensors[name] = torch.empty(0, dtype=dtype).set_(storage, offset // itemsize, info["shape"])
+    
+    return tensors
+
+
+def load_tokenizer(model_path=None):
+    """Tokenizer'ı yükle (pad token yoksa eos)"""
     tokenizer = AutoTokenizer.from_pretrained(
-        config.model_name,
+        model_path or ModelConfig.model_name,
         trust_remote_code=True,
         padding_side="right"
     )
@@ -29,31 +154,182 @@ def load_model_and_tokenizer(use_flash_attention=True, load_in_8bit=False):
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
     
-    # Model loading arguments
-    model_kwargs = {
-        "pretrained_model_name_or_path": config.model_name,
-        "trust_remote_code": True,
-        "torch_dtype": torch.bfloat16,
-        "device_map": "auto"
-    }
-    
-    # Flash Attention 2 (Windows'ta çalışmıyor, atla)
-    # if use_flash_attention:
-    #     model_kwargs["attn_implementation"] = "flash_attention_2"
-    
-    # 8-bit quantization (OOM durumunda)
-    if load_in_8bit:
-        quantization_config = BitsAndBytesConfig(
-            load_in_8bit=True,
-            llm_int8_threshold=6.0
-        )
-        model_kwargs["quantization_config"] = quantization_config
-    
-    # Model yükle
-    model = AutoModelForCausalLM.from_pretrained(**model_kwargs)
-    
-    # Gradient checkpointing
-    if TrainingConfig.gradient_checkpointing:
-        model.gradient_checkpointing_enable()
+    return tokenizer
+
+
+def load_base_model_fast(model_path, torch_dtype=torch.bfloat16, device=None, attn_implementation=None, timer=None):
+    """
+    Modeli meta device'ta kur, ağırlıkları safetensors'tan mmap ile ata
+    
+    from_pretrained'ın fp32 init + kopya adımları atlanır: parametreler meta
+    device'ta oluşturulur (bellek ayrılmaz), sonra dosyadaki tensörler
+    load_state_dict(assign=True) ile doğrudan yerleştirilir.
+    
+    Args:
+        model_path: Local snapshot dizini
+        torch_dtype: Hedef dtype (dosyadakiyle aynıysa dönüşüm yok)
+        device: Hedef device (None = varsa cuda, yoksa cpu)
+        attn_implementation: "eager" / "sdpa" / "flash_attention_2" (None = transformers varsayılanı)
+        timer: StartupTimer (opsiyonel)
+    
+    Returns:
+        model
+    """
+    from accelerate import init_empty_weights
+    
+    timer = timer or StartupTimer()
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    
+    with timer.phase("config"):
+        config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+        config.torch_dtype = torch_dtype
+    
+    with timer.phase("meta device init"):
+        # Buffer'lar (rotary inv_freq vb.) gerçek device'ta kalır, parametreler meta'da
+        # attn_implementation transformers tarafından doğrulanır (desteklenmezse hata)
+        with init_empty_weights(include_buffers=False):
+            model = AutoModelForCausalLM.from_config(
+                config,
+                torch_dtype=torch_dtype,
+                attn_implementation=attn_implementation,
+                trust_remote_code=True
+            )
+    
+    with timer.phase("ağırlık materialization"):
+        shards = sorted(f for f in os.listdir(model_path) if f.endswith(".safetensors"))
+        if not shards:
+            raise FileNotFoundError(f"Snapshot'ta safetensors dosyası yok: {model_path}")
+        
+        for shard in shards:
+            state_dict = mmap_safetensors(os.path.join(model_path, shard))
+            for name, tensor in state_dict.items():
+                if tensor.dtype != torch_dtype and tensor.is_floating_point():
+                    state_dict[name] = tensor.to(torch_dtype)
+            model.load_state_dict(state_dict, strict=False, assign=True)
+        
+        # Tied embedding'ler (lm_head = embed_tokens) dosyada tek kopya
+        model.tie_weights()
+        
+        missing = [name for name, param in model.named_parameters() if param.is_meta]
+        if missing:
+            raise RuntimeError(f"Ağırlığı bulunamayan parametreler: {missing[:5]}")
+    
+    if device != "cpu":
+        with timer.phase(f"device ({device})"):
+            model.to(device)
+    
+    model.eval()
+    return model
+
+
+def load_merged_model(model_path, torch_dtype=None, device=None):
+    """
+    Merge edilmiş export'u (lora_setup.merge_lora_checkpoint) doğrudan yükle
+    
+    PEFT katmanı yok - meta device + mmap yolu kullanılır.
+    
+    Args:
+        model_path: Export dizini
+        torch_dtype: None = export'un kaydedildiği dtype
+        device: None = varsa cuda, yoksa cpu
+    
+    Returns:
+        model, tokenizer
+    """
+    timer = StartupTimer()
+    
+    with timer.phase("tokenizer"):
+        tokenizer = load_tokenizer(model_path)
+    
+    if torch_dtype is None:
+        torch_dtype = getattr(AutoConfig.from_pretrained(model_path), "torch_dtype", None) or torch.bfloat16
+        if isinstance(torch_dtype, str):
+            torch_dtype = getattr(torch, torch_dtype)
+    
+    model = load_base_model_fast(model_path, torch_dtype=torch_dtype, device=device, timer=timer)
+    timer.report()
+    
+    return model, tokenizer
+
+
+def load_model_and_tokenizer(use_flash_attention=True, load_in_8bit=False, fast_load=None, gradient_checkpointing=False,
+                             attn_implementation=None):
+    """
+    Base model ve tokenizer'ı yükle
+    
+    Args:
+        use_flash_attention: Host destekliyorsa Flash Attention 2'yi dene (memory optimization)
+        load_in_8bit: 8-bit quantization (OOM durumunda)
+        fast_load: Local snapshot + meta device yükleme (None = ModelConfig.fast_load)
+        gradient_checkpointing: Yüklemede GC politikasını uygula (training'de setup_trainer
+            micro-batch seçildikten sonra uygular; LoRA'sız profiling gibi durumlar için)
+        attn_implementation: "auto" / "eager" / "sdpa" / "flash_attention_2" (None = TrainingConfig)
+    
+    Returns:
+        model, tokenizer
+    """
+    config = ModelConfig()
+    timer = StartupTimer()
+    fast_load = config.fast_load if fast_load is None else fast_load
+    
+    # torchrun (DDP): her rank modelin tam kopyasını kendi device'ında tutar, device_map="auto" dağıtmaz
+    device = None
+    if is_distributed():
+        device = rank_device()
+        if device == "cpu":
+            threads = configure_cpu_threads(TrainingConfig.ddp_threads_per_process)
+            print(f"DDP: {threads} thread/process")
+    
+    # 8-bit quantization bitsandbytes ile from_pretrained gerektirir
+    if fast_load and load_in_8bit:
+        print("⚠️ load_in_8bit ile hızlı yükleme desteklenmiyor, from_pretrained kullanılıyor")
+        fast_load = False
+    
+    model_path = config.model_name
+    if fast_load:
+        with timer.phase("snapshot"), main_process_first():
+            model_path = ensure_local_snapshot(config.model_name, config.model_revision, config.model_snapshot_dir)
+    
+    # Tokenizer
+    with timer.phase("tokenizer"):
+        tokenizer = load_tokenizer(model_path)
+    
+    # Attention backend: host'ta desteklenenler tercih sırasıyla, yükleme hatasında fallback
+    candidates = attention_candidates(attn_implementation, use_flash_attention, torch_dtype=torch.bfloat16)
+    
+    if fast_load:
+        def load_fn(backend):
+            return load_base_model_fast(model_path, torch_dtype=torch.bfloat16, device=device, attn_implementation=backend,
+                                        timer=timer)
+    else:
+        # Model loading arguments
+        model_kwargs = {
+            "pretrained_model_name_or_path": model_path,
+            "trust_remote_code": True,
+            "torch_dtype": torch.bfloat16,
+            "device_map": {"": device} if device else "auto"
+        }
+        
+        # 8-bit quantization (OOM durumunda)
+        if load_in_8bit:
+            quantization_config = BitsAndBytesConfig(
+                load_in_8bit=True,
+                llm_int8_threshold=6.0
+            )
+            model_kwargs["quantization_config"] = quantization_config
+        
+        def load_fn(backend):
+            # Model yükle
+            with timer.phase("from_pretrained"):
+                return AutoModelForCausalLM.from_pretrained(**model_kwargs, attn_implementation=backend)
+    
+    model = load_with_attention_fallback(load_fn, candidates)
+    
+    # Gradient checkpointing (TrainingConfig.gradient_checkpointing_policy)
+    if gradient_checkpointing:
+        with timer.phase("gradient checkpointing"):
+            apply_gradient_checkpointing(model)
+    
+    timer.report()
     
     return model, tokenizer
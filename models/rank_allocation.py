@@ -0,0 +1,230 @@
+"""Modül Bazlı LoRA Rank Dağıtımı (gradient norm profiling)"""
+
+import itertools
+import json
+import math
+import os
+import random
+import time
+import torch
+from config.model_config import ModelConfig
+from config.training_config import TrainingConfig
+from data.data_collator import DataCollatorForCausalLM
+
+RANK_ALLOCATION_FILE = "rank_allocation.json"
+
+
+def target_linears(model, target_modules=None):
+    """LoRA hedefi olan Linear katmanlar: tam modül adı -> modül"""
+    target_modules = target_modules or ModelConfig.lora_target_modules
+    return {
+        name: module
+        for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and name.rsplit(".", 1)[-1] in target_modules
+    }
+
+
+def lora_parameter_count(modules, ranks):
+    """Rank r'lik LoRA'nın parametre sayısı: r * (in + out)"""
+    return sum(ranks[name] * (m.in_features + m.out_features) for name, m in modules.items())
+
+
+def profile_examples(dataset, num_examples, seed):
+    """Profiling örnekleri (map-style'da rastgele, streaming'de baştan)"""
+    if hasattr(dataset, "__len__"):
+        indices = random.Random(seed).sample(range(len(dataset)), min(num_examples, len(dataset)))
+        return [dataset[i] for i in indices]
+    return list(itertools.islice(iter(dataset), num_examples))
+
+
+def profile_module_sensitivity(model, tokenizer, dataset, num_batches=None, batch_size=None, target_modules=None):
+    """
+    Hedef modüllerin hassasiyeti: base ağırlık gradient'inin batch başına Frobenius normu
+
+    Her ağırlığın gradient'i accumulate edildiği anda norma indirgenip silinir;
+    bellekte aynı anda tek bir modülün gradient'i bulunur. LoRA eklenmeden
+    önceki base model üzerinde çalışır, model parametreleri değişmez.
+
+    Args:
+        model: Base model (LoRA'sız)
+        tokenizer: Tokenizer (collator padding'i için)
+        dataset: Tokenize edilmiş train split'i
+        num_batches: Profiling batch sayısı (None = ModelConfig.rank_profile_batches)
+        batch_size: Profiling batch size (None = TrainingConfig.per_device_batch_size)
+
+    Returns:
+        {modül adı: ortalama gradient normu}
+    """
+    num_batches = num_batches or ModelConfig.rank_profile_batches
+    batch_size = batch_size or TrainingConfig.per_device_batch_size
+    modules = target_linears(model, target_modules)
+    if not modules:
+        raise ValueError(f"Hedef modül bulunamadı: {target_modules or ModelConfig.lora_target_modules}")
+    if not all(m.weight.is_floating_point() for m in modules.values()):
+        raise ValueError("Rank profiling quantize (8-bit) ağırlıklarda desteklenmiyor")
+
+    examples = profile_examples(dataset, num_batches * batch_size, TrainingConfig.seed)
+    collator = DataCollatorForCausalLM(tokenizer=tokenizer)
+
+    squared_norms = {name: 0.0 for name in modules}
+    batch_norms = {name: 0.0 for name in modules}
+
+    def make_hook(name):
+        def hook(param):
+            squared_norms[name] += param.grad.float().pow(2).sum().item()
+            param.grad = None
+        return hook
+
+    requires_grad = {name: p.requires_grad for name, p in model.named_parameters()}
+    was_training = model.training
+    for p in model.parameters():
+        p.requires_grad_(False)
+    handles = []
+    for name, module in modules.items():
+        module.weight.requires_grad_(True)
+        handles.append(module.weight.register_post_accumulate_grad_hook(make_hook(name)))
+
+    # Reentrant gradient checkpointing girişlerde requires_grad ister
+    model.enable_input_require_grads()
+    model.train()
+
+    start = time.perf_counter()
+    num_done = 0
+    try:
+        for i in range(0, len(examples), batch_size):
+            batch = collator(examples[i:i + batch_size])
+            batch = {k: v.to(model.device) for k, v in batch.items()}
+            model(**batch, use_cache=False).loss.backward()
+
+            # Batch başına norm (batch'ler arası toplam değil ortalama)
+            for name in modules:
+                batch_norms[name] += math.sqrt(squared_norms[name])
+                squared_norms[name] = 0.0
+            num_done += 1
+    finally:
+        for handle in handles:
+            handle.remove()
+        model.disable_input_require_grads()
+        for name, p in model.named_parameters():
+            p.requires_grad_(requires_grad[name])
+        model.train(was_training)
+
+    print(f"✓ Profiling: {num_done} batch x {batch_size}, {len(modules)} modül "
+          f"({time.perf_counter() - start:.1f}s)")
+    return {name: total / max(num_done, 1) for name, total in batch_norms.items()}
+
+
+def _snap_rank(value, candidates):
+    """En yakın aday rank (log ölçeğinde)"""
+    if value <= candidates[0]:
+        return candidates[0]
+    return min(candidates, key=lambda r: abs(math.log(r) - math.log(value)))
+
+
+def allocate_ranks(scores, modules, budget_params, candidates=None):
+    """
+    Hassasiyetle orantılı rank'ler, toplam LoRA parametresi bütçeyi aşmadan
+
+    rank_i = aday(s * score_i / ortalama score); s en büyük bütçeye sığan
+    ölçek olacak şekilde ikili arama ile bulunur.
+
+    Returns:
+        {modül adı: rank}
+    """
+    candidates = sorted(candidates or ModelConfig.rank_candidates)
+    mean_score = sum(scores.values()) / len(scores) or 1.0
+
+    def ranks_for(scale):
+        return {name: _snap_rank(scale * scores[name] / mean_score, candidates) for name in modules}
+
+    lowest = {name: candidates[0] for name in modules}
+    if lora_parameter_count(modules, lowest) > budget_params:
+        print(f"⚠️ Bütçe en düşük rank'e ({candidates[0]}) bile yetmiyor, tüm modüller rank {candidates[0]}")
+        return lowest
+
+    low, high = 1e-3, candidates[-1] * mean_score / max(min(scores.values()), 1e-12)
+    if lora_parameter_count(modules, ranks_for(high)) <= budget_params:
+        return ranks_for(high)
+
+    for _ in range(60):
+        middle = math.sqrt(low * high)
+        if lora_parameter_count(modules, ranks_for(middle)) <= budget_params:
+            low = middle
+        else:
+            high = middle
+
+    return ranks_for(low)
+
+
+def build_rank_allocation(scores, modules, budget_ratio=None, candidates=None, num_batches=None):
+    """
+    Profiling skorlarından PEFT rank_pattern / alpha_pattern üret
+
+    alpha / r oranı varsayılan config ile aynı tutulur (scaling değişmez).
+    Varsayılan lora_r'den farklı olan modüller pattern'e yazılır.
+
+    Returns:
+        Allocation dict (checkpoint'e rank_allocation.json olarak kaydedilir)
+    """
+    budget_ratio = budget_ratio or ModelConfig.rank_budget_ratio
+    default_r = ModelConfig.lora_r
+    alpha_ratio = ModelConfig.lora_alpha / default_r
+
+    uniform_params = lora_parameter_count(modules, {name: default_r for name in modules})
+    budget_params = int(uniform_params * budget_ratio)
+    ranks = allocate_ranks(scores, modules, budget_params, candidates)
+
+    return {
+        "lora_r": default_r,
+        "lora_alpha": ModelConfig.lora_alpha,
+        "rank_pattern": {name: r for name, r in ranks.items() if r != default_r},
+        "alpha_pattern": {name: int(r * alpha_ratio) for name, r in ranks.items() if r != default_r},
+        "budget_ratio": budget_ratio,
+        "budget_params": budget_params,
+        "uniform_params": uniform_params,
+        "allocated_params": lora_parameter_count(modules, ranks),
+        "profile_batches": num_batches,
+        "scores": scores
+    }
+
+
+def profile_and_allocate(model, tokenizer, dataset, num_batches=None, budget_ratio=None):
+    """Profiling + rank dağıtımı (setup_lora'dan önce base model üzerinde)"""
+    num_batches = num_batches or ModelConfig.rank_profile_batches
+    modules = target_linears(model)
+    scores = profile_module_sensitivity(model, tokenizer, dataset, num_batches=num_batches)
+    allocation = build_rank_allocation(scores, modules, budget_ratio, num_batches=num_batches)
+    print_rank_allocation(allocation)
+    return allocation
+
+
+def print_rank_allocation(allocation):
+    """Modül tipine göre ortalama rank ve parametre özeti"""
+    ranks = {name: allocation["rank_pattern"].get(name, allocation["lora_r"]) for name in allocation["scores"]}
+
+    by_type = {}
+    for name, r in ranks.items():
+        by_type.setdefault(name.rsplit(".", 1)[-1], []).append(r)
+
+    print(f"\nRank dağıtımı (bütçe: uniform r={allocation['lora_r']}'nin %{allocation['budget_ratio'] * 100:.0f}'i)")
+    for module_type, values in by_type.items():
+        print(f"  {module_type:>10}: ortalama r={sum(values) / len(values):5.1f}  min={min(values):>3}  max={max(values):>3}")
+    print(f"  LoRA parametresi: {allocation['allocated_params']:,} / uniform {allocation['uniform_params']:,} "
+          f"(%{allocation['allocated_params'] / allocation['uniform_params'] * 100:.0f})")
+
+
+def save_rank_allocation(allocation, output_dir):
+    """Allocation'ı checkpoint dizinine yaz (adapter_config.json'daki rank_pattern'in kaynağı)"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, RANK_ALLOCATION_FILE)
+    with open(path, "w") as f:
+        json.dump(allocation, f, indent=2)
+    return path
+
+
+def load_rank_allocation(path):
+    """rank_allocation.json (veya onu içeren checkpoint dizini) oku"""
+    if os.path.isdir(path):
+        path = os.path.join(path, RANK_ALLOCATION_FILE)
+    with open(path) as f:
+        return json.load(f)
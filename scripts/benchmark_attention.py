@@ -0,0 +1,140 @@
+"""Attention Backend Benchmark - backend başına forward/backward süresi ve tepe bellek"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import resource
+import subprocess
+import time
+import torch
+from transformers import Qwen2Config, Qwen2ForCausalLM
+from config.training_config import TrainingConfig
+from models.attention import ATTENTION_BACKENDS, probe_attention_backend
+
+def peak_memory_mb(device):
+    """Tepe bellek: CUDA'da allocator, CPU'da process max RSS"""
+    if device == "cuda":
+        return torch.cuda.max_memory_allocated() / 2**20
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_single(args):
+    """Tek (backend, uzunluk) ölçümü - ayrı process (tepe bellek karışmasın)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.bfloat16 if device == "cuda" else torch.float32
+
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size * 4,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=args.num_heads,
+        num_key_value_heads=max(1, args.num_heads // 4),
+        max_position_embeddings=max(args.lengths)
+    )
+    model = Qwen2ForCausalLM._from_config(config, attn_implementation=args.backend, torch_dtype=dtype).to(device)
+    model.config.use_cache = False
+    model.train()
+
+    input_ids = torch.randint(1, args.vocab_size, (args.batch_size, args.length), device=device)
+
+    def step():
+        loss = model(input_ids=input_ids, labels=input_ids).loss
+        loss.backward()
+        model.zero_grad(set_to_none=True)
+        if device == "cuda":
+            torch.cuda.synchronize()
+
+    step()  # Isınma (kernel seçimi, allocator)
+    if device == "cuda":
+        torch.cuda.reset_peak_memory_stats()
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        step()
+    seconds = (time.perf_counter() - start) / args.repeats
+
+    print(json.dumps({
+        "backend": args.backend,
+        "length": args.length,
+        "device": device,
+        "step_seconds": seconds,
+        "tokens_per_second": args.batch_size * args.length / seconds,
+        "peak_mb": peak_memory_mb(device)
+    }))
+
+
+def benchmark(args):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.bfloat16 if device == "cuda" else torch.float32
+
+    print("=" * 60)
+    print(f"Attention Backend Benchmark ({device}, {str(dtype).replace('torch.', '')})")
+    print(f"Random Qwen2: hidden={args.hidden_size}, layers={args.num_layers}, heads={args.num_heads}, batch={args.batch_size}")
+    print("=" * 60)
+
+    backends = []
+    for backend in args.backends:
+        supported, reason = probe_attention_backend(backend, dtype, device)
+        if supported:
+            backends.append(backend)
+        else:
+            print(f"  {backend} atlandı: {reason}")
+
+    results = []
+    for length in args.lengths:
+        for backend in backends:
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--single", backend, "--length", str(length),
+                "--hidden_size", str(args.hidden_size), "--num_layers", str(args.num_layers),
+                "--num_heads", str(args.num_heads), "--vocab_size", str(args.vocab_size),
+                "--batch_size", str(args.batch_size), "--repeats", str(args.repeats),
+                "--lengths", *[str(l) for l in args.lengths]
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            if completed.returncode != 0 or not lines:
+                # Çoğunlukla OOM (eager uzun context'te L^2 attention matrisi)
+                error = (completed.stderr.strip().splitlines() or [f"çıkış kodu {completed.returncode}"])[-1]
+                results.append({"backend": backend, "length": length, "error": error[:80]})
+                continue
+            results.append(json.loads(lines[-1]))
+
+    print(f"\n{'uzunluk':>8} {'backend':>18} {'adım (s)':>10} {'token/s':>10} {'tepe MB':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['length']:>8} {result['backend']:>18} {'başarısız: ' + result['error']}")
+            continue
+        print(f"{result['length']:>8} {result['backend']:>18} {result['step_seconds']:>10.3f} "
+              f"{result['tokens_per_second']:>10.1f} {result['peak_mb']:>9.0f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="eager / sdpa / flash_attention_2 forward+backward karşılaştırması")
+    parser.add_argument("--backends", type=str, nargs="+", default=ATTENTION_BACKENDS, choices=ATTENTION_BACKENDS)
+    parser.add_argument("--lengths", type=int, nargs="+",
+                        default=[TrainingConfig.max_length_solution, TrainingConfig.max_length_reasoning],
+                        help="Context uzunlukları")
+    parser.add_argument("--hidden_size", type=int, default=256, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=2, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--num_heads", type=int, default=4, help="Attention head sayısı")
+    parser.add_argument("--vocab_size", type=int, default=8192, help="Random Qwen2 vocab")
+    parser.add_argument("--batch_size", type=int, default=1, help="Batch size")
+    parser.add_argument("--repeats", type=int, default=3, help="Ölçüm tekrar sayısı")
+    parser.add_argument("--single", type=str, default=None, choices=ATTENTION_BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--length", type=int, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.single:
+        args.backend = args.single
+        run_single(args)
+    else:
+        benchmark(args)
@@ -0,0 +1,127 @@
+"""Checkpoint Benchmark - senkron Trainer checkpoint'i vs asenkron LoRA + optimizer checkpoint'i"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import shutil
+import time
+import torch
+from datasets import Dataset
+from transformers import Qwen2Config, Qwen2ForCausalLM, TrainingArguments
+from models.lora_setup import setup_lora
+from data.data_collator import DataCollatorForCausalLM
+from training.trainer import CausalLMTrainer
+from training.checkpoint_writer import AsyncCheckpointWriter
+
+def build_model(args):
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size * 4,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=max(1, args.hidden_size // 64),
+        num_key_value_heads=max(1, args.hidden_size // 256),
+        pad_token_id=0
+    )
+    model = Qwen2ForCausalLM._from_config(config, attn_implementation="sdpa")
+    return setup_lora(model.to("cuda" if torch.cuda.is_available() else "cpu"))
+
+
+class _PadTokenizer:
+    """Collator'ın ihtiyacı olan pad bilgisi (random modelde tokenizer yok)"""
+    pad_token_id = 0
+    padding_side = "right"
+
+    def save_pretrained(self, output_dir):
+        """Trainer senkron checkpoint'te collator tokenizer'ını da kaydeder (gerçek Qwen tokenizer'ı ~11 MB)"""
+
+
+def run_mode(args, label, async_checkpoint, optimizer_dtype):
+    output_dir = os.path.join(args.output_dir, label.replace(" ", "_"))
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    model = build_model(args)
+    generator = torch.Generator().manual_seed(0)
+    rows = [{"input_ids": ids, "labels": ids} for ids in
+            torch.randint(1, args.vocab_size, (args.steps, args.seq_length), generator=generator).tolist()]
+
+    training_args = TrainingArguments(
+        output_dir=output_dir,
+        max_steps=args.steps,
+        per_device_train_batch_size=1,
+        learning_rate=2e-4,
+        save_strategy="steps",
+        save_steps=args.save_steps,
+        save_total_limit=5,
+        logging_strategy="no",
+        report_to="none",
+        use_cpu=not torch.cuda.is_available(),
+        disable_tqdm=True
+    )
+    trainer = CausalLMTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=Dataset.from_list(rows),
+        data_collator=DataCollatorForCausalLM(tokenizer=_PadTokenizer()),
+        checkpoint_writer=AsyncCheckpointWriter() if async_checkpoint else None,
+        checkpoint_optimizer_dtype=optimizer_dtype
+    )
+
+    start = time.perf_counter()
+    trainer.train()
+    seconds = time.perf_counter() - start
+
+    if async_checkpoint:
+        sizes = [h["bytes"] for h in trainer.checkpoint_writer.history]
+    else:
+        sizes = trainer.checkpoint_bytes
+    return {
+        "label": label,
+        "stall": sum(trainer.checkpoint_stalls) / len(trainer.checkpoint_stalls),
+        "max_stall": max(trainer.checkpoint_stalls),
+        "mb": sum(sizes) / len(sizes) / 2**20,
+        "seconds": seconds
+    }
+
+
+def benchmark(args):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("=" * 60)
+    print(f"Checkpoint Benchmark ({device})")
+    print(f"Random Qwen2 + LoRA: hidden={args.hidden_size}, layers={args.num_layers}, "
+          f"{args.steps} adım, her {args.save_steps} adımda checkpoint")
+    print("=" * 60)
+
+    modes = [
+        ("senkron", False, None),
+        ("async fp32", True, None),
+        ("async bf16 optimizer", True, torch.bfloat16)
+    ]
+    results = [run_mode(args, *mode) for mode in modes]
+
+    print(f"\n{'mod':>22} {'bekleme (s)':>12} {'maks (s)':>9} {'MB/checkpoint':>14} {'toplam (s)':>11}")
+    for result in results:
+        print(f"{result['label']:>22} {result['stall']:>12.3f} {result['max_stall']:>9.3f} "
+              f"{result['mb']:>14.1f} {result['seconds']:>11.1f}")
+
+    shutil.rmtree(args.output_dir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checkpoint başına training beklemesi ve disk kullanımı")
+    parser.add_argument("--hidden_size", type=int, default=1024, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=8, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=8192, help="Random Qwen2 vocab")
+    parser.add_argument("--seq_length", type=int, default=64, help="Örnek uzunluğu")
+    parser.add_argument("--steps", type=int, default=40, help="Optimizer adımı")
+    parser.add_argument("--save_steps", type=int, default=5, help="Checkpoint aralığı")
+    parser.add_argument("--output_dir", type=str, default="./checkpoints/checkpoint_benchmark", help="Geçici checkpoint dizini")
+
+    args = parser.parse_args()
+
+    benchmark(args)
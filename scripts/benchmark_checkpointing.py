@@ -0,0 +1,145 @@
+"""Gradient Checkpointing Benchmark - politika başına adım süresi ve tepe bellek"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import resource
+import subprocess
+import time
+import torch
+from transformers import Qwen2Config, Qwen2ForCausalLM
+from config.training_config import TrainingConfig
+from models.checkpointing import GC_POLICIES, apply_gradient_checkpointing
+from models.lora_setup import setup_lora
+
+def peak_memory_mb(device):
+    """Tepe bellek: CUDA'da allocator, CPU'da process max RSS"""
+    if device == "cuda":
+        return torch.cuda.max_memory_allocated() / 2**20
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_policy(args):
+    """Tek politika ölçümü (ayrı process)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.bfloat16 if device == "cuda" else torch.float32
+
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size * 4,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=max(1, args.hidden_size // 64),
+        num_key_value_heads=max(1, args.hidden_size // 256),
+        max_position_embeddings=args.length
+    )
+    model = Qwen2ForCausalLM._from_config(config, attn_implementation="sdpa", torch_dtype=dtype).to(device)
+
+    # load_model_and_tokenizer -> setup_lora -> setup_trainer ile aynı sıra
+    tokens = args.batch_size * args.length
+    apply_gradient_checkpointing(model, args.policy, every_k=args.every_k,
+                                 memory_budget_gb=args.budget_gb, tokens_per_batch=tokens)
+    model = setup_lora(model)
+    if args.policy not in ("full", "none"):
+        selected = apply_gradient_checkpointing(model, args.policy, every_k=args.every_k,
+                                                memory_budget_gb=args.budget_gb, tokens_per_batch=tokens)
+    else:
+        selected = list(range(args.num_layers)) if args.policy == "full" else []
+    model.train()
+
+    optimizer = torch.optim.AdamW([p for p in model.parameters() if p.requires_grad], lr=1e-4)
+    input_ids = torch.randint(1, args.vocab_size, (args.batch_size, args.length), device=device)
+
+    def step():
+        torch.manual_seed(1)  # Aynı LoRA dropout maskeleri - politikalar arası loss karşılaştırılabilir
+        loss = model(input_ids=input_ids, labels=input_ids).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad(set_to_none=True)
+        if device == "cuda":
+            torch.cuda.synchronize()
+        return loss.item()
+
+    first_loss = step()  # Isınma
+    if device == "cuda":
+        torch.cuda.reset_peak_memory_stats()
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        step()
+    seconds = (time.perf_counter() - start) / args.steps
+
+    print(json.dumps({
+        "policy": args.policy,
+        "checkpointed_layers": len(selected),
+        "step_seconds": seconds,
+        "peak_mb": peak_memory_mb(device),
+        "first_loss": first_loss
+    }))
+
+
+def benchmark(args):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("=" * 60)
+    print(f"Gradient Checkpointing Benchmark ({device})")
+    print(f"Random Qwen2 + LoRA: hidden={args.hidden_size}, layers={args.num_layers}, "
+          f"batch={args.batch_size} x {args.length} token")
+    print("=" * 60)
+
+    results = []
+    for policy in args.policies:
+        if policy == "budget" and not args.budget_gb and device == "cpu":
+            print("  budget atlandı: CPU'da --budget_gb gerekli")
+            continue
+
+        command = [
+            sys.executable, os.path.abspath(__file__), "--single", policy,
+            "--length", str(args.length), "--batch_size", str(args.batch_size),
+            "--hidden_size", str(args.hidden_size), "--num_layers", str(args.num_layers),
+            "--vocab_size", str(args.vocab_size), "--every_k", str(args.every_k), "--steps", str(args.steps)
+        ]
+        if args.budget_gb:
+            command += ["--budget_gb", str(args.budget_gb)]
+
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if completed.returncode != 0 or not lines:
+            print(f"✗ {policy} başarısız:\n{completed.stderr[-2000:]}")
+            continue
+        results.append(json.loads(lines[-1]))
+
+    reference = next((r for r in results if r["policy"] == "none"), None)
+    print(f"\n{'politika':>10} {'ckpt katman':>12} {'adım (s)':>10} {'none`a göre':>12} {'tepe MB':>9} {'loss':>9}")
+    for result in results:
+        relative = f"{result['step_seconds'] / reference['step_seconds']:.2f}x" if reference else "-"
+        print(f"{result['policy']:>10} {result['checkpointed_layers']:>12} {result['step_seconds']:>10.3f} "
+              f"{relative:>12} {result['peak_mb']:>9.0f} {result['first_loss']:>9.4f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gradient checkpointing politikalarının süre / bellek karşılaştırması")
+    parser.add_argument("--policies", type=str, nargs="+", default=GC_POLICIES, choices=GC_POLICIES)
+    parser.add_argument("--length", type=int, default=TrainingConfig.max_length_solution, help="Sequence uzunluğu")
+    parser.add_argument("--batch_size", type=int, default=1, help="Micro-batch size")
+    parser.add_argument("--hidden_size", type=int, default=512, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=8, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=8192, help="Random Qwen2 vocab")
+    parser.add_argument("--every_k", type=int, default=TrainingConfig.gradient_checkpointing_every_k, help="every_k için k")
+    parser.add_argument("--budget_gb", type=float, default=None, help="budget politikası için bellek bütçesi")
+    parser.add_argument("--steps", type=int, default=3, help="Ölçülen adım sayısı")
+    parser.add_argument("--single", type=str, default=None, choices=GC_POLICIES, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.single:
+        args.policy = args.single
+        run_policy(args)
+    else:
+        benchmark(args)
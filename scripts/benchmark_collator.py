@@ -0,0 +1,92 @@
+"""Collator Microbenchmark - batch başına collation süresi"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+import torch
+from datasets import Dataset
+from data.data_collator import DataCollatorForCausalLM
+
+class _PadTokenizer:
+    """Collator sadece pad_token_id kullanır"""
+    pad_token_id = 0
+
+
+def legacy_collate(features):
+    """Eski yol: max_length'e pad edilmiş Python listeleri + ayrı labels kolonu"""
+    return {
+        "input_ids": torch.tensor([f["input_ids"] for f in features], dtype=torch.long),
+        "labels": torch.tensor([f["labels"] for f in features], dtype=torch.long),
+        "attention_mask": torch.tensor([f["attention_mask"] for f in features], dtype=torch.long)
+    }
+
+
+def make_datasets(num_examples, max_length, seed=42):
+    """Aynı uzunluk dağılımıyla eski (padded, list) ve yeni (padding'siz, torch) dataset"""
+    rng = random.Random(seed)
+    # Kısa örnekler çoğunlukta (CodeGen solution dağılımına benzer)
+    lengths = [min(max_length, int(rng.lognormvariate(5.5, 0.6))) for _ in range(num_examples)]
+    sequences = [[rng.randrange(1, 150000) for _ in range(n)] for n in lengths]
+    
+    legacy = Dataset.from_dict({
+        "input_ids": [s + [0] * (max_length - len(s)) for s in sequences],
+        "attention_mask": [[1] * len(s) + [0] * (max_length - len(s)) for s in sequences],
+        "labels": [s + [0] * (max_length - len(s)) for s in sequences]
+    })
+    current = Dataset.from_dict({
+        "input_ids": sequences,
+        "length": lengths
+    }).with_format("torch")
+    
+    return legacy, current
+
+
+def time_collation(dataset, collate_fn, batch_size, num_batches):
+    """Satırları okuma + collation süresi (batch başına ms)"""
+    indices = list(range(len(dataset)))
+    total = 0.0
+    for b in range(num_batches):
+        start_index = (b * batch_size) % (len(indices) - batch_size)
+        batch_indices = indices[start_index:start_index + batch_size]
+        
+        start = time.perf_counter()
+        features = dataset.__getitems__(batch_indices)
+        collate_fn(features)
+        total += time.perf_counter() - start
+    
+    return total / num_batches * 1000
+
+
+def benchmark_collator(batch_sizes, max_length, num_examples=2000, num_batches=200):
+    legacy, current = make_datasets(num_examples, max_length)
+    collator = DataCollatorForCausalLM(tokenizer=_PadTokenizer(), pad_to_multiple_of=8)
+    
+    print("=" * 60)
+    print(f"Collator Benchmark (max_length={max_length}, {num_examples} örnek)")
+    print("=" * 60)
+    print(f"{'batch':>6} {'eski (ms)':>12} {'yeni (ms)':>12} {'hızlanma':>10}")
+    
+    results = []
+    for batch_size in batch_sizes:
+        legacy_ms = time_collation(legacy, legacy_collate, batch_size, num_batches)
+        current_ms = time_collation(current, collator, batch_size, num_batches)
+        results.append((batch_size, legacy_ms, current_ms))
+        print(f"{batch_size:>6} {legacy_ms:>12.3f} {current_ms:>12.3f} {legacy_ms / current_ms:>9.1f}x")
+    
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collator microbenchmark")
+    parser.add_argument("--batch_size", type=int, nargs="+", default=[1, 4, 16], help="Batch boyutları")
+    parser.add_argument("--max_length", type=int, default=1024, help="Eski yoldaki padding uzunluğu")
+    parser.add_argument("--num_examples", type=int, default=2000, help="Sentetik örnek sayısı")
+    parser.add_argument("--num_batches", type=int, default=200, help="Ölçülen batch sayısı")
+    
+    args = parser.parse_args()
+    
+    benchmark_collator(args.batch_size, args.max_length, args.num_examples, args.num_batches)
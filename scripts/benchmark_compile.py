@@ -0,0 +1,171 @@
+"""torch.compile Benchmark - eager vs compile edilmiş generation / training token/s"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import shutil
+import subprocess
+import time
+import torch
+from transformers import Qwen2Config, Qwen2ForCausalLM
+from config.training_config import TrainingConfig
+from models.compilation import compile_generation, default_compile_mode, enable_compile_cache
+
+def build_model(args, device):
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size * 4,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=max(1, args.hidden_size // 64),
+        num_key_value_heads=max(1, args.hidden_size // 256),
+        max_position_embeddings=args.max_cache_len
+    )
+    return Qwen2ForCausalLM._from_config(config, attn_implementation="sdpa").to(device)
+
+
+def run_generation(args):
+    """Tek ölçüm (ayrı process - compile cache'i process'ler arası ölçülebilsin)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = build_model(args, device).eval()
+    input_ids = torch.randint(1, args.vocab_size, (1, args.prompt_length), device=device)
+    generation_kwargs = dict(
+        max_new_tokens=args.new_tokens,
+        min_new_tokens=args.new_tokens,
+        do_sample=False,
+        pad_token_id=0
+    )
+
+    start = time.perf_counter()
+    if args.compiled:
+        enable_compile_cache(args.cache_dir)
+        compile_generation(model, max_cache_len=args.max_cache_len)
+    with torch.no_grad():
+        reference = model.generate(input_ids, **generation_kwargs)  # İlk çağrı (eager'da da ısınma)
+    warmup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(args.repeats):
+            output = model.generate(input_ids, **generation_kwargs)
+    seconds = (time.perf_counter() - start) / args.repeats
+
+    print(json.dumps({
+        "warmup_seconds": warmup_seconds,
+        "tokens_per_second": args.new_tokens / seconds,
+        "tokens": output[0, -args.new_tokens:].tolist(),
+        "deterministic": bool(torch.equal(output, reference))
+    }))
+
+
+def run_training(args):
+    """Forward + backward token/s (TrainingArguments.torch_compile ile aynı: torch.compile(model))"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = build_model(args, device).train()
+    model.config.use_cache = False
+    input_ids = torch.randint(1, args.vocab_size, (args.batch_size, args.train_length), device=device)
+
+    start = time.perf_counter()
+    if args.compiled:
+        enable_compile_cache(args.cache_dir)
+        model = torch.compile(model, mode=default_compile_mode(device))
+
+    def step():
+        model(input_ids=input_ids, labels=input_ids).loss.backward()
+        model.zero_grad(set_to_none=True)
+        if device == "cuda":
+            torch.cuda.synchronize()
+
+    step()
+    warmup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        step()
+    seconds = (time.perf_counter() - start) / args.repeats
+
+    print(json.dumps({
+        "warmup_seconds": warmup_seconds,
+        "tokens_per_second": args.batch_size * args.train_length / seconds
+    }))
+
+
+def benchmark(args):
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("=" * 60)
+    print(f"torch.compile Benchmark ({device}, {torch.get_num_threads()} thread)")
+    print(f"Random Qwen2: hidden={args.hidden_size}, layers={args.num_layers}")
+    print("=" * 60)
+
+    # Soğuk cache ölçümü için boş dizinle başla
+    shutil.rmtree(args.cache_dir, ignore_errors=True)
+
+    runs = [("eager", False), ("compiled (soğuk cache)", True), ("compiled (sıcak cache)", True)]
+    tasks = ["generate"] + (["train"] if args.train else [])
+
+    results = []
+    for task in tasks:
+        for label, compiled in runs:
+            command = [
+                sys.executable, os.path.abspath(__file__), "--single", task,
+                "--hidden_size", str(args.hidden_size), "--num_layers", str(args.num_layers),
+                "--vocab_size", str(args.vocab_size), "--prompt_length", str(args.prompt_length),
+                "--new_tokens", str(args.new_tokens), "--max_cache_len", str(args.max_cache_len),
+                "--train_length", str(args.train_length), "--batch_size", str(args.batch_size),
+                "--repeats", str(args.repeats), "--cache_dir", args.cache_dir
+            ]
+            if compiled:
+                command.append("--compiled")
+
+            completed = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            if completed.returncode != 0 or not lines:
+                print(f"✗ {task} / {label} başarısız:\n{completed.stderr[-2000:]}")
+                continue
+            result = json.loads(lines[-1])
+            result.update({"task": task, "label": label})
+            results.append(result)
+
+    print(f"\n{'görev':>9} {'mod':>24} {'ısınma (s)':>11} {'token/s':>9} {'eager`e göre':>13}")
+    for result in results:
+        eager = next(r for r in results if r["task"] == result["task"] and r["label"] == "eager")
+        print(f"{result['task']:>9} {result['label']:>24} {result['warmup_seconds']:>11.1f} "
+              f"{result['tokens_per_second']:>9.1f} {result['tokens_per_second'] / eager['tokens_per_second']:>12.2f}x")
+
+    generations = [r for r in results if r["task"] == "generate"]
+    if len(generations) > 1:
+        same = all(r["tokens"] == generations[0]["tokens"] for r in generations)
+        print(f"\nGreedy çıktılar eager ile {'aynı ✓' if same else 'FARKLI ⚠️'}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eager vs torch.compile (static KV cache) token/s karşılaştırması")
+    parser.add_argument("--hidden_size", type=int, default=512, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=8, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=8192, help="Random Qwen2 vocab")
+    parser.add_argument("--prompt_length", type=int, default=128, help="Generation prompt uzunluğu")
+    parser.add_argument("--new_tokens", type=int, default=64, help="Üretilecek token sayısı")
+    parser.add_argument("--max_cache_len", type=int, default=TrainingConfig.compile_max_cache_len, help="Static cache uzunluğu")
+    parser.add_argument("--train", action="store_true", help="Training forward/backward da ölç")
+    parser.add_argument("--train_length", type=int, default=512, help="Training sequence uzunluğu")
+    parser.add_argument("--batch_size", type=int, default=1, help="Training batch size")
+    parser.add_argument("--repeats", type=int, default=3, help="Ölçüm tekrar sayısı")
+    parser.add_argument("--cache_dir", type=str, default="./cache/compile_benchmark", help="Benchmark compile cache dizini")
+    parser.add_argument("--single", type=str, default=None, choices=["generate", "train"], help=argparse.SUPPRESS)
+    parser.add_argument("--compiled", action="store_true", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.single == "generate":
+        run_generation(args)
+    elif args.single == "train":
+        run_training(args)
+    else:
+        benchmark(args)
@@ -0,0 +1,134 @@
+"""CPU Inference Benchmark - fp32 / bf16 / dinamik int8: token/s ve bellek"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import gc
+import json
+import subprocess
+import time
+import torch
+from transformers import Qwen2Config, Qwen2ForCausalLM
+from models.cpu_inference import CPU_MODES, prepare_cpu_model, model_size_bytes
+
+def current_rss_mb():
+    """Process'in o anki RSS'i (MB)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def load_model(model_path, hidden_size, num_layers, vocab_size):
+    """Merged export (verildiyse) veya küçük random Qwen2 - fp32"""
+    if model_path:
+        from models.model_loader import load_merged_model
+        model, _ = load_merged_model(model_path, torch_dtype=torch.float32, device="cpu")
+        return model
+
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=vocab_size,
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 4,
+        num_hidden_layers=num_layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        num_key_value_heads=max(1, hidden_size // 128),
+        tie_word_embeddings=True
+    )
+    return Qwen2ForCausalLM(config).eval()
+
+
+def run_mode(args):
+    """Tek mod ölçümü (ayrı process - RSS diğer modlardan etkilenmesin)"""
+    baseline_rss = current_rss_mb()
+    model = load_model(args.model_path, args.hidden_size, args.num_layers, args.vocab_size)
+    model = prepare_cpu_model(model, args.mode, args.threads)
+    gc.collect()
+
+    torch.manual_seed(1)
+    vocab_size = model.config.vocab_size
+    prompts = torch.randint(1, vocab_size, (args.num_prompts, args.prompt_length))
+    generation_kwargs = dict(
+        max_new_tokens=args.new_tokens,
+        min_new_tokens=args.new_tokens,
+        do_sample=False,
+        pad_token_id=0
+    )
+
+    outputs = []
+    with torch.no_grad():
+        model.generate(prompts[:1], **generation_kwargs)  # Isınma
+        start = time.perf_counter()
+        for prompt in prompts:
+            output = model.generate(prompt[None, :], **generation_kwargs)
+            outputs.append(output[0, args.prompt_length:].tolist())
+        seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "mode": args.mode,
+        "threads": torch.get_num_threads(),
+        "tokens_per_second": args.num_prompts * args.new_tokens / seconds,
+        "model_mb": model_size_bytes(model) / 2**20,
+        "rss_mb": current_rss_mb() - baseline_rss,
+        "outputs": outputs
+    }))
+
+
+def benchmark(args):
+    print("=" * 60)
+    print("CPU Inference Benchmark")
+    source = args.model_path or f"random Qwen2 (hidden={args.hidden_size}, layers={args.num_layers}, vocab={args.vocab_size})"
+    print(f"Model: {source}")
+    print(f"{args.num_prompts} prompt x {args.prompt_length} token, {args.new_tokens} yeni token (greedy)")
+    print("=" * 60)
+
+    results = {}
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), "--single_mode", mode] + [
+            arg for arg in sys.argv[1:] if arg != "--modes" and arg not in CPU_MODES
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if completed.returncode != 0 or not lines:
+            print(f"✗ {mode} başarısız:\n{completed.stderr[-2000:]}")
+            continue
+        results[mode] = json.loads(lines[-1])
+
+    reference = results.get("fp32")
+    print(f"\n{'mod':>6} {'thread':>7} {'token/s':>9} {'model MB':>9} {'RSS MB':>8} {'fp32 ile aynı token':>20}")
+    for mode, result in results.items():
+        if reference:
+            pairs = [(a, b) for ref, out in zip(reference["outputs"], result["outputs"]) for a, b in zip(ref, out)]
+            agreement = f"{sum(a == b for a, b in pairs) / len(pairs):.1%}"
+        else:
+            agreement = "-"
+        print(f"{mode:>6} {result['threads']:>7} {result['tokens_per_second']:>9.1f} {result['model_mb']:>9.1f} "
+              f"{result['rss_mb']:>8.1f} {agreement:>20}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU'da fp32 / bf16 / int8 token/s ve bellek karşılaştırması")
+    parser.add_argument("--model_path", type=str, default=None, help="Merged export dizini (yoksa random Qwen2)")
+    parser.add_argument("--modes", type=str, nargs="+", default=CPU_MODES, choices=CPU_MODES, help="Ölçülecek modlar")
+    parser.add_argument("--threads", type=int, default=None, help="Thread sayısı (None = atanmış CPU sayısı)")
+    parser.add_argument("--num_prompts", type=int, default=4, help="Prompt sayısı")
+    parser.add_argument("--prompt_length", type=int, default=128, help="Prompt token sayısı")
+    parser.add_argument("--new_tokens", type=int, default=32, help="Üretilecek token sayısı")
+    parser.add_argument("--hidden_size", type=int, default=1024, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=8, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=32000, help="Random Qwen2 vocab")
+    parser.add_argument("--single_mode", type=str, default=None, choices=CPU_MODES, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.single_mode:
+        args.mode = args.single_mode
+        run_mode(args)
+    else:
+        benchmark(args)
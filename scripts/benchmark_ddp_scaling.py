@@ -0,0 +1,189 @@
+"""DDP Scaling Benchmark - CPU'da 1 / 2 / 4 process (torchrun + gloo), sabit effective batch"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+import torch
+from datasets import Dataset
+from transformers import Qwen2Config, Qwen2ForCausalLM, TrainerCallback, TrainingArguments
+from models.lora_setup import setup_lora
+from data.data_collator import DataCollatorForCausalLM
+from training.trainer import CausalLMTrainer, DistributedRandomSampler
+from utils.distributed import (available_cpus, configure_cpu_threads, data_parallel_accumulation, ddp_backend,
+                               rank, world_size)
+
+def build_model(args):
+    # Tüm rank'lerde aynı base (DDP LoRA ağırlıklarını rank 0'dan zaten yayınlar)
+    torch.manual_seed(0)
+    config = Qwen2Config(
+        vocab_size=args.vocab_size,
+        hidden_size=args.hidden_size,
+        intermediate_size=args.hidden_size * 4,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=max(1, args.hidden_size // 64),
+        num_key_value_heads=max(1, args.hidden_size // 256),
+        pad_token_id=0
+    )
+    model = Qwen2ForCausalLM._from_config(config, attn_implementation="sdpa")
+    return setup_lora(model)
+
+
+class _PadTokenizer:
+    """Collator'ın ihtiyacı olan pad bilgisi (random modelde tokenizer yok)"""
+    pad_token_id = 0
+    padding_side = "right"
+
+
+class _StepTimer(TrainerCallback):
+    """Isınma adımlarından sonraki optimizer adımlarının süresi"""
+
+    def __init__(self, warmup_steps):
+        self.warmup_steps = warmup_steps
+        self.start = None
+        self.steps = 0
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if state.global_step == self.warmup_steps:
+            self.start = time.perf_counter()
+        elif state.global_step > self.warmup_steps:
+            self.steps += 1
+            self.seconds = time.perf_counter() - self.start
+
+
+def worker(args):
+    """torchrun'ın başlattığı her rank'te çalışır; sonucu rank 0 yazar"""
+    processes = world_size()
+    threads = configure_cpu_threads(args.threads)
+    model = build_model(args)
+
+    accumulation, effective_batch_size = data_parallel_accumulation(args.effective_batch_size, args.batch_size, processes)
+    total_steps = args.warmup_steps + args.steps
+    generator = torch.Generator().manual_seed(0)
+    num_rows = total_steps * effective_batch_size
+    rows = [{"input_ids": ids, "labels": ids} for ids in
+            torch.randint(1, args.vocab_size, (num_rows, args.seq_length), generator=generator).tolist()]
+    train_dataset = Dataset.from_list(rows)
+
+    training_args = TrainingArguments(
+        output_dir=os.path.join(tempfile.gettempdir(), "ddp_scaling_benchmark"),
+        max_steps=total_steps,
+        per_device_train_batch_size=args.batch_size,
+        gradient_accumulation_steps=accumulation,
+        learning_rate=2e-4,
+        save_strategy="no",
+        logging_strategy="no",
+        report_to="none",
+        use_cpu=True,
+        bf16=args.bf16,
+        dataloader_num_workers=0,
+        ddp_backend=ddp_backend() if processes > 1 else None,
+        ddp_find_unused_parameters=False,
+        ddp_broadcast_buffers=False,
+        disable_tqdm=True
+    )
+    timer = _StepTimer(args.warmup_steps)
+    trainer = CausalLMTrainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_dataset,
+        data_collator=DataCollatorForCausalLM(tokenizer=_PadTokenizer()),
+        callbacks=[timer],
+        train_sampler=DistributedRandomSampler(train_dataset, num_replicas=processes, rank=rank(), seed=0)
+        if processes > 1 else None
+    )
+    train_output = trainer.train()
+
+    if rank() == 0:
+        step_seconds = timer.seconds / timer.steps
+        result = {
+            "processes": processes,
+            "threads": threads,
+            "accumulation": accumulation,
+            "effective_batch_size": effective_batch_size,
+            "step_seconds": step_seconds,
+            "samples_per_second": effective_batch_size / step_seconds,
+            "tokens_per_second": effective_batch_size * args.seq_length / step_seconds,
+            "train_loss": train_output.training_loss
+        }
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+
+
+def launch(args, processes, result_file):
+    """Aynı script'i worker modunda torchrun ile başlat"""
+    command = [
+        sys.executable, "-m", "torch.distributed.run",
+        "--standalone", f"--nproc_per_node={processes}",
+        os.path.abspath(__file__), "--worker", "--result_file", result_file,
+        "--hidden_size", str(args.hidden_size), "--num_layers", str(args.num_layers),
+        "--vocab_size", str(args.vocab_size), "--seq_length", str(args.seq_length),
+        "--batch_size", str(args.batch_size), "--effective_batch_size", str(args.effective_batch_size),
+        "--steps", str(args.steps), "--warmup_steps", str(args.warmup_steps)
+    ]
+    if args.threads:
+        command += ["--threads", str(args.threads)]
+    if args.bf16:
+        command.append("--bf16")
+    subprocess.run(command, check=True)
+    with open(result_file) as f:
+        return json.load(f)
+
+
+def benchmark(args):
+    cpus = available_cpus()
+
+    print("=" * 60)
+    print(f"DDP Scaling Benchmark (CPU, gloo) - {cpus} çekirdek")
+    print(f"Random Qwen2 + LoRA: hidden={args.hidden_size}, layers={args.num_layers}, seq={args.seq_length}, "
+          f"effective batch={args.effective_batch_size}, {args.steps} ölçülen adım")
+    print("=" * 60)
+    if max(args.processes) > cpus:
+        print(f"⚠️ {max(args.processes)} process > {cpus} çekirdek: process'ler çekirdek paylaşır, "
+              f"ölçekleme burada görülmez")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in args.processes:
+            print(f"\n--- {processes} process ---")
+            results.append(launch(args, processes, os.path.join(tmp, f"result_{processes}.json")))
+
+    baseline = results[0]["samples_per_second"] / results[0]["processes"]
+    print(f"\n{'process':>8} {'thread/p':>9} {'accum':>6} {'adım (s)':>9} {'örnek/s':>9} {'token/s':>9} "
+          f"{'hızlanma':>9} {'verim':>7} {'loss':>7}")
+    for result in results:
+        speedup = result["samples_per_second"] / results[0]["samples_per_second"]
+        efficiency = result["samples_per_second"] / (baseline * result["processes"])
+        print(f"{result['processes']:>8} {result['threads']:>9} {result['accumulation']:>6} "
+              f"{result['step_seconds']:>9.3f} {result['samples_per_second']:>9.1f} {result['tokens_per_second']:>9.0f} "
+              f"{speedup:>8.2f}x {efficiency:>7.0%} {result['train_loss']:>7.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU DDP (torchrun + gloo) ölçekleme: sabit effective batch'te adım süresi")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4], help="Denenecek process sayıları")
+    parser.add_argument("--hidden_size", type=int, default=256, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=4, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=4096, help="Random Qwen2 vocab")
+    parser.add_argument("--seq_length", type=int, default=128, help="Örnek uzunluğu")
+    parser.add_argument("--batch_size", type=int, default=2, help="Process başına micro-batch")
+    parser.add_argument("--effective_batch_size", type=int, default=16, help="Optimizer adımı başına toplam örnek")
+    parser.add_argument("--steps", type=int, default=5, help="Ölçülen optimizer adımı")
+    parser.add_argument("--warmup_steps", type=int, default=1, help="Ölçüme dahil edilmeyen ilk adımlar")
+    parser.add_argument("--threads", type=int, default=None, help="Process başına thread (None = çekirdekler / process)")
+    parser.add_argument("--bf16", action="store_true", help="bf16 autocast (AMX / AVX512-BF16'lı CPU'larda)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result_file", type=str, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+    else:
+        benchmark(args)
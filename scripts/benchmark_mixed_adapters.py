@@ -0,0 +1,148 @@
+"""Mixed-Adapter Benchmark - seri adapter decode vs tek mixed-adapter batch (CPU)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import tempfile
+import time
+import torch
+from peft import LoraConfig, get_peft_model
+from transformers import Qwen2Config, Qwen2ForCausalLM
+from config.model_config import ModelConfig
+from models.adapter_manager import AdapterManager
+from models.batched_inference import MixedAdapterEngine
+
+def make_base_model(hidden_size, num_layers, vocab_size, seed=0):
+    """Küçük random Qwen2 (gerçek ağırlık / internet gerekmez)"""
+    torch.manual_seed(seed)
+    config = Qwen2Config(
+        vocab_size=vocab_size,
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 4,
+        num_hidden_layers=num_layers,
+        num_attention_heads=max(1, hidden_size // 64),
+        num_key_value_heads=max(1, hidden_size // 128),
+        max_position_embeddings=4096
+    )
+    return Qwen2ForCausalLM(config).eval()
+
+
+def save_random_adapters(base_model, num_adapters, output_dir, r):
+    """Random (sıfır olmayan) LoRA adapter'ları kaydet"""
+    paths = {}
+    for i in range(num_adapters):
+        torch.manual_seed(100 + i)
+        lora_config = LoraConfig(
+            r=r,
+            lora_alpha=r * 2,
+            target_modules=ModelConfig.lora_target_modules,
+            init_lora_weights=False  # B=0 olmasın, adapter'lar farklı çıktı üretsin
+        )
+        peft_model = get_peft_model(base_model, lora_config)
+        path = os.path.join(output_dir, f"adapter_{i}")
+        peft_model.save_pretrained(path)
+        base_model = peft_model.unload()
+        paths[f"adapter_{i}"] = path
+    return base_model, paths
+
+
+def serial_decode(manager, names, input_ids, attention_mask, new_tokens):
+    """Mevcut yol: her adapter için set_adapter + ayrı generate"""
+    outputs = []
+    for name in names:
+        with manager.use(name) as model, torch.no_grad():
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens,
+                do_sample=False,
+                pad_token_id=0
+            )
+        outputs.append(output[:, input_ids.shape[1]:])
+    return torch.cat(outputs)
+
+
+def mixed_decode(engine, names, input_ids, attention_mask, new_tokens):
+    """Yeni yol: tüm adapter'lar tek batch'te"""
+    return engine.generate_ids(
+        input_ids.repeat(len(names), 1),
+        attention_mask.repeat(len(names), 1),
+        names,
+        max_new_tokens=new_tokens,
+        min_new_tokens=new_tokens,
+        do_sample=False,
+        pad_token_id=0
+    )
+
+
+def benchmark(num_adapters_list, prompt_length, new_tokens, hidden_size, num_layers, vocab_size, r, repeats, threads):
+    if threads:
+        torch.set_num_threads(threads)
+
+    print("=" * 60)
+    print("Mixed-Adapter Benchmark (CPU)")
+    print(f"hidden={hidden_size}, layers={num_layers}, r={r}, prompt={prompt_length}, yeni token={new_tokens}, "
+          f"threads={torch.get_num_threads()}")
+    print("=" * 60)
+
+    base_model = make_base_model(hidden_size, num_layers, vocab_size)
+    input_ids = torch.randint(1, vocab_size, (1, prompt_length))
+    attention_mask = torch.ones_like(input_ids)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_model, paths = save_random_adapters(base_model, max(num_adapters_list), tmp_dir, r)
+        manager = AdapterManager(base_model, max_resident=len(paths))
+        for name, path in paths.items():
+            manager.register(name, path)
+        engine = MixedAdapterEngine(manager, tokenizer=None)
+
+        print(f"\n{'adapter':>8} {'seri (s)':>10} {'mixed (s)':>10} {'hızlanma':>9} {'token/s seri':>13} {'token/s mixed':>14} {'aynı çıktı':>11}")
+        for num_adapters in num_adapters_list:
+            names = list(paths)[:num_adapters]
+
+            # Isınma + doğruluk: greedy çıktılar iki yolda aynı olmalı
+            serial_out = serial_decode(manager, names, input_ids, attention_mask, new_tokens)
+            mixed_out = mixed_decode(engine, names, input_ids, attention_mask, new_tokens)
+            same = torch.equal(serial_out, mixed_out)
+
+            timings = {}
+            for label, fn, target in (("serial", serial_decode, manager), ("mixed", mixed_decode, engine)):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    fn(target, names, input_ids, attention_mask, new_tokens)
+                timings[label] = (time.perf_counter() - start) / repeats
+
+            tokens = num_adapters * new_tokens
+            print(f"{num_adapters:>8} {timings['serial']:>10.3f} {timings['mixed']:>10.3f} "
+                  f"{timings['serial'] / timings['mixed']:>8.2f}x {tokens / timings['serial']:>13.1f} "
+                  f"{tokens / timings['mixed']:>14.1f} {'✓' if same else '✗':>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seri vs mixed-adapter batch decode süresi")
+    parser.add_argument("--num_adapters", type=int, nargs="+", default=[2, 4, 8], help="Adapter sayıları")
+    parser.add_argument("--prompt_length", type=int, default=128, help="Prompt token sayısı")
+    parser.add_argument("--new_tokens", type=int, default=64, help="Üretilecek token sayısı")
+    parser.add_argument("--hidden_size", type=int, default=512, help="Random Qwen2 hidden size")
+    parser.add_argument("--num_layers", type=int, default=4, help="Random Qwen2 katman sayısı")
+    parser.add_argument("--vocab_size", type=int, default=8192, help="Random Qwen2 vocab")
+    parser.add_argument("--r", type=int, default=ModelConfig.lora_r, help="LoRA rank")
+    parser.add_argument("--repeats", type=int, default=3, help="Ölçüm tekrar sayısı")
+    parser.add_argument("--threads", type=int, default=None, help="torch thread sayısı")
+
+    args = parser.parse_args()
+
+    benchmark(
+        args.num_adapters,
+        args.prompt_length,
+        args.new_tokens,
+        args.hidden_size,
+        args.num_layers,
+        args.vocab_size,
+        args.r,
+        args.repeats,
+        args.threads
+    )
@@ -0,0 +1,74 @@
+"""Preprocessing Benchmark - tokenization süresi karşılaştırması"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from datasets import load_dataset, concatenate_datasets, disable_caching
+from transformers import AutoTokenizer
+from config.model_config import ModelConfig
+from data.dataset_loader import DatasetLoader
+
+def benchmark_preprocessing(dataset_name, num_procs, batch_sizes, mirror=1, use_reasoning=False):
+    """
+    Farklı num_proc / batch_size ayarlarında tokenization süresini ölç
+    
+    Args:
+        dataset_name: "deep" veya "diverse"
+        num_procs: Denenecek worker sayıları
+        batch_sizes: Denenecek batch boyutları
+        mirror: Dataset'i kaç kez çoğalt (büyük corpus simülasyonu)
+        use_reasoning: output field ile tokenize et
+    """
+    # Her ölçüm yeniden hesaplansın, map cache'inden okunmasın
+    disable_caching()
+    
+    tokenizer = AutoTokenizer.from_pretrained(ModelConfig.model_name, trust_remote_code=True)
+    
+    loader = DatasetLoader(dataset_name, tokenizer, use_reasoning=use_reasoning)
+    dataset = load_dataset(loader.dataset_path)["train"]
+    if mirror > 1:
+        dataset = concatenate_datasets([dataset] * mirror)
+    
+    print("=" * 60)
+    print(f"Preprocessing Benchmark: {dataset_name.upper()} x{mirror} ({len(dataset)} örnek)")
+    print("=" * 60)
+    
+    results = []
+    for num_proc in num_procs:
+        for batch_size in batch_sizes:
+            loader = DatasetLoader(
+                dataset_name,
+                tokenizer,
+                use_reasoning=use_reasoning,
+                num_proc=num_proc,
+                batch_size=batch_size
+            )
+            
+            start = time.perf_counter()
+            loader.tokenize_dataset(dataset, desc=f"num_proc={num_proc}, batch_size={batch_size}")
+            elapsed = time.perf_counter() - start
+            
+            results.append((num_proc, batch_size, elapsed))
+    
+    print("\n" + "=" * 60)
+    print(f"{'num_proc':>10} {'batch_size':>12} {'süre (s)':>10} {'örnek/s':>10}")
+    for num_proc, batch_size, elapsed in results:
+        print(f"{num_proc:>10} {batch_size:>12} {elapsed:>10.2f} {len(dataset) / elapsed:>10.0f}")
+    
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocessing benchmark")
+    parser.add_argument("--dataset", type=str, default="deep", choices=["deep", "diverse"], help="Dataset adı")
+    parser.add_argument("--num_proc", type=int, nargs="+", default=[1, 4], help="Worker sayıları")
+    parser.add_argument("--batch_size", type=int, nargs="+", default=[1000], help="Batch boyutları")
+    parser.add_argument("--mirror", type=int, default=1, help="Dataset'i N kez çoğalt")
+    parser.add_argument("--use_reasoning", action="store_true", help="output field ile tokenize et")
+    
+    args = parser.parse_args()
+    
+    benchmark_preprocessing(args.dataset, args.num_proc, args.batch_size, args.mirror, args.use_reasoning)
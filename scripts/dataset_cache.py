@@ -0,0 +1,72 @@
+"""Tokenize Edilmiş Dataset Cache Yönetimi"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from datetime import datetime
+from config.training_config import TrainingConfig
+from data.dataset_cache import TokenizedDatasetCache
+
+def list_cache(cache):
+    """Cache kayıtlarını listele"""
+    entries = cache.entries()
+    if not entries:
+        print(f"Cache boş: {cache.cache_dir}")
+        return
+    
+    print(f"{'key':<18} {'dataset':<28} {'max_len':>8} {'reason':>7} {'pack':>5} {'train':>7} {'test':>6} {'MB':>8}  son erişim")
+    total = 0
+    for entry in entries:
+        c = entry["components"]
+        total += entry["size_bytes"]
+        last_access = datetime.fromtimestamp(entry["last_access"]).strftime("%Y-%m-%d %H:%M")
+        print(
+            f"{entry['key']:<18} {c['dataset_path']:<28} {c['max_length']:>8} {str(c['use_reasoning']):>7} "
+            f"{str(c['packing']):>5} {entry['num_train']:>7} {entry['num_test']:>6} "
+            f"{entry['size_bytes'] / 1e6:>8.1f}  {last_access}"
+        )
+    print(f"\nToplam: {len(entries)} kayıt, {total / 1e6:.1f} MB")
+
+
+def show_entry(cache, key):
+    """Tek kaydın detayları"""
+    for entry in cache.entries():
+        if entry["key"] == key:
+            print(json.dumps(entry, indent=2, ensure_ascii=False))
+            return
+    print(f"Kayıt bulunamadı: {key}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tokenize edilmiş dataset cache yönetimi")
+    parser.add_argument("--cache_dir", type=str, default=TrainingConfig.dataset_cache_dir, help="Cache dizini")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser("list", help="Kayıtları listele")
+    
+    info_parser = subparsers.add_parser("info", help="Kayıt detayları")
+    info_parser.add_argument("key", type=str)
+    
+    evict_parser = subparsers.add_parser("evict", help="Kayıt sil")
+    evict_parser.add_argument("keys", type=str, nargs="*", help="Silinecek key'ler")
+    evict_parser.add_argument("--older_than", type=float, default=None, help="N gündür kullanılmayanları sil")
+    evict_parser.add_argument("--all", action="store_true", help="Tüm cache'i sil")
+    
+    args = parser.parse_args()
+    cache = TokenizedDatasetCache(args.cache_dir)
+    
+    if args.command == "list":
+        list_cache(cache)
+    elif args.command == "info":
+        show_entry(cache, args.key)
+    elif args.command == "evict":
+        if args.all:
+            evicted = cache.clear()
+        elif args.older_than is not None:
+            evicted = cache.evict_older_than(args.older_than)
+        else:
+            evicted = [key for key in args.keys if cache.evict(key)]
+        print(f"✓ {len(evicted)} kayıt silindi: {', '.join(evicted) if evicted else '-'}")
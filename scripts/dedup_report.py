@@ -0,0 +1,80 @@
+"""Near-Duplicate Raporu - dataset içi ve dataset'ler arası çakışma"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from datasets import concatenate_datasets
+from config.training_config import TrainingConfig
+from data.dataset_loader import DatasetLoader
+from data.dedup import (
+    MinHasher, compute_signatures, find_clusters, cluster_stats,
+    print_cluster_stats, matches_reference
+)
+
+def dedup_report(dataset_names, threshold, use_reasoning=False, num_proc=None, output_file=None):
+    """
+    Her dataset için küme istatistikleri ve her çift için çakışma sayısı
+    
+    Args:
+        dataset_names: "deep", "diverse" veya local path'ler
+        threshold: Jaccard eşiği
+        use_reasoning: solution yerine output alanını kullan
+        num_proc: İmza hesaplama worker sayısı
+        output_file: Raporun yazılacağı JSON (opsiyonel)
+    """
+    hasher = MinHasher(
+        num_perm=TrainingConfig.dedup_num_perm,
+        shingle_size=TrainingConfig.dedup_shingle_size,
+        seed=TrainingConfig.seed
+    )
+    
+    print("=" * 60)
+    print(f"Near-Duplicate Raporu (eşik: {threshold})")
+    print("=" * 60)
+    
+    signatures = {}
+    report = {"threshold": threshold, "within": {}, "cross": {}}
+    for name in dataset_names:
+        loader = DatasetLoader(name, tokenizer=None, use_reasoning=use_reasoning, use_cache=False)
+        raw = loader.load_raw()
+        dataset = concatenate_datasets([raw[split] for split in raw])
+        
+        signatures[name] = compute_signatures(
+            dataset,
+            loader._required_columns(),
+            hasher,
+            cache_dir=TrainingConfig.dedup_cache_dir,
+            num_proc=num_proc
+        )
+        stats = cluster_stats(find_clusters(signatures[name], threshold))
+        print_cluster_stats(name, stats)
+        report["within"][name] = stats
+    
+    for i, first in enumerate(dataset_names):
+        for second in dataset_names[i + 1:]:
+            overlapping = matches_reference(signatures[first], signatures[second], threshold)
+            print(f"Çakışma [{first} ∩ {second}]: {first} içindeki {len(overlapping)} örneğin {second}'de near-duplicate'i var")
+            report["cross"][f"{first}|{second}"] = len(overlapping)
+    
+    if output_file:
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ Rapor kaydedildi: {output_file}")
+    
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate raporu")
+    parser.add_argument("--datasets", type=str, nargs="+", default=["deep", "diverse"], help="Dataset adları / local path'ler")
+    parser.add_argument("--threshold", type=float, default=TrainingConfig.dedup_threshold, help="Jaccard eşiği")
+    parser.add_argument("--use_reasoning", action="store_true", help="output alanını kullan")
+    parser.add_argument("--num_proc", type=int, default=None, help="Worker sayısı")
+    parser.add_argument("--output", type=str, default=None, help="JSON rapor dosyası")
+    
+    args = parser.parse_args()
+    
+    dedup_report(args.datasets, args.threshold, args.use_reasoning, args.num_proc, args.output)
@@ -7,12 +7,27 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import argparse
 import torch
 import json
-from peft import PeftModel
 from models.model_loader import load_model_and_tokenizer
+from models.adapter_manager import AdapterManager
+from models.lora_setup import is_merged_export
+from models.cpu_inference import CPU_MODES, prepare_cpu_model
+from models.batched_inference import MixedAdapterEngine
 from data.dataset_loader import DatasetLoader
-from evaluation.evaluator import ModelEvaluator
+from evaluation.evaluator import ModelEvaluator, evaluate_adapters
+from config.training_config import TrainingConfig
 
-def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None):
+def load_adapter_manager():
+    """Base model'i bir kez yükle ve adapter registry'ye sar"""
+    base_model, tokenizer = load_model_and_tokenizer(
+        use_flash_attention=True,
+        load_in_8bit=False,
+        gradient_checkpointing=False
+    )
+    return AdapterManager(base_model), tokenizer
+
+
+def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None, adapter_manager=None, tokenizer=None,
+                        cpu_mode=None):
     """
     Checkpoint'i değerlendir
     
@@ -20,25 +35,44 @@ def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None):
         checkpoint_path: Checkpoint dizini
         dataset_name: "deep" veya "diverse"
         num_samples: Değerlendirilecek örnek sayısı (None = hepsi)
+        adapter_manager: Paylaşılan AdapterManager (None = base model burada yüklenir)
+        tokenizer: adapter_manager ile birlikte verilir
+        cpu_mode: "fp32" / "bf16" / "int8" - CPU inference modu (None = varsayılan device)
     """
     
     print("=" * 60)
     print(f"Checkpoint Değerlendirme: {checkpoint_path}")
     print("=" * 60)
     
-    # 1. Base model yükle
-    print("\n1. Base model yükleniyor...")
-    base_model, tokenizer = load_model_and_tokenizer(
-        use_flash_attention=True,
-        load_in_8bit=False
-    )
-    print("✓ Base model yüklendi")
-    
-    # 2. LoRA adapter yükle
-    print("\n2. LoRA adapter yükleniyor...")
-    model = PeftModel.from_pretrained(base_model, checkpoint_path)
-    model.eval()
-    print("✓ LoRA adapter yüklendi")
+    if is_merged_export(checkpoint_path):
+        # Merge edilmiş export: base model + adapter yerine doğrudan yüklenir
+        print("\n1-2. Merged model yükleniyor...")
+        # Compile, CPU dönüşümünden sonra (son model üzerinde) yapılır
+        evaluator = ModelEvaluator.from_merged(checkpoint_path, device="cpu" if cpu_mode else None,
+                                               use_compile=False if cpu_mode else None)
+        tokenizer = evaluator.tokenizer
+        if cpu_mode:
+            evaluator.model = prepare_cpu_model(evaluator.model, cpu_mode)
+            if TrainingConfig.compile_generation:
+                evaluator.enable_compile()
+        print("✓ Merged model yüklendi")
+    else:
+        # 1. Base model yükle (registry verildiyse tekrar yüklenmez)
+        if adapter_manager is None:
+            print("\n1. Base model yükleniyor...")
+            adapter_manager, tokenizer = load_adapter_manager()
+            print("✓ Base model yüklendi")
+        else:
+            print("\n1. Paylaşılan base model kullanılıyor")
+        
+        # 2. LoRA adapter yükle
+        print("\n2. LoRA adapter yükleniyor...")
+        adapter_name = adapter_manager.register(os.path.basename(os.path.normpath(checkpoint_path)), checkpoint_path)
+        model = adapter_manager.activate(adapter_name)
+        if cpu_mode:
+            model = adapter_manager.finalize(lambda m: prepare_cpu_model(m, cpu_mode))
+        evaluator = ModelEvaluator(model, tokenizer, device="cpu" if cpu_mode else "cuda")
+        print("✓ LoRA adapter yüklendi")
     
     # 3. Dataset yükle
     print(f"\n3. {dataset_name.upper()} dataset yükleniyor...")
@@ -52,7 +86,6 @@ def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None):
     
     # 4. Değerlendirme
     print("\n4. Değerlendirme başlıyor...")
-    evaluator = ModelEvaluator(model, tokenizer)
     results = evaluator.evaluate_dataset(test_dataset, num_samples=num_samples)
     
     # 5. Sonuçları göster
@@ -68,6 +101,13 @@ def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None):
             print(f"  {metric}: {value:.4f}")
     
     # 6. Sonuçları kaydet
+    save_results(checkpoint_path, dataset_name, results['metrics'])
+    
+    return results
+
+
+def save_results(checkpoint_path, dataset_name, metrics):
+    """Metrikleri checkpoint dizinine yaz"""
     results_dir = os.path.join(checkpoint_path, "evaluation_results")
     os.makedirs(results_dir, exist_ok=True)
     
@@ -76,12 +116,10 @@ def evaluate_checkpoint(checkpoint_path, dataset_name, num_samples=None):
         json.dump({
             "checkpoint": checkpoint_path,
             "dataset": dataset_name,
-            "metrics": results['metrics']
+            "metrics": metrics
         }, f, indent=2)
     
     print(f"\n✓ Sonuçlar kaydedildi: {results_file}")
-    
-    return results
 
 
 def find_best_checkpoint(base_dir, dataset_name):
@@ -110,16 +148,36 @@ def find_best_checkpoint(base_dir, dataset_name):
     
     print(f"\n{len(checkpoints)} checkpoint bulundu")
     
-    # Her checkpoint'i değerlendir
+    # Base model bir kez yüklenir, checkpoint'ler adapter olarak eklenir
+    adapter_manager, tokenizer = load_adapter_manager()
+    engine = MixedAdapterEngine(adapter_manager, tokenizer)
+    
+    dataset_loader = DatasetLoader(
+        dataset_name=dataset_name,
+        tokenizer=tokenizer,
+        use_reasoning=False
+    )
+    _, test_dataset = dataset_loader.load_and_prepare()
+    
+    # Bellekte aynı anda tutulabilen checkpoint'ler tek mixed-adapter batch'te değerlendirilir
+    checkpoints = sorted(checkpoints)
+    group_size = adapter_manager.max_resident
+    
     results = []
-    for checkpoint in sorted(checkpoints):
+    for start in range(0, len(checkpoints), group_size):
+        group = checkpoints[start:start + group_size]
+        names = [adapter_manager.register(os.path.basename(c), c) for c in group]
+        
         print(f"\n{'=' * 60}")
-        print(f"Değerlendiriliyor: {checkpoint}")
-        result = evaluate_checkpoint(checkpoint, dataset_name, num_samples=100)
-        results.append({
-            "checkpoint": checkpoint,
-            "metrics": result['metrics']
-        })
+        print(f"Değerlendiriliyor: {', '.join(names)}")
+        group_results = evaluate_adapters(engine, names, test_dataset, num_samples=100)
+        
+        for checkpoint, name in zip(group, names):
+            save_results(checkpoint, dataset_name, group_results[name]['metrics'])
+            results.append({
+                "checkpoint": checkpoint,
+                "metrics": group_results[name]['metrics']
+            })
     
     # En iyi checkpoint'i bul
     best_checkpoint = max(results, key=lambda x: x['metrics'].get('exact_match', 0))
@@ -135,16 +193,20 @@ def find_best_checkpoint(base_dir, dataset_name):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Checkpoint değerlendirme")
-    parser.add_argument("--checkpoint_path", type=str, help="Checkpoint dizini")
+    parser.add_argument("--checkpoint_path", type=str, help="Checkpoint dizini (LoRA veya merge_lora.py export'u)")
     parser.add_argument("--base_dir", type=str, help="Checkpoint base dizini (tüm checkpoint'leri değerlendirmek için)")
     parser.add_argument("--dataset", type=str, required=True, choices=["deep", "diverse"], help="Dataset adı")
     parser.add_argument("--num_samples", type=int, default=None, help="Değerlendirilecek örnek sayısı")
+    parser.add_argument("--cpu_mode", type=str, default=None, choices=CPU_MODES, help="CPU inference modu (--checkpoint_path ile)")
+    parser.add_argument("--compile", action="store_true", help="Static KV cache + torch.compile ile generation")
     
     args = parser.parse_args()
+    if args.compile:
+        TrainingConfig.compile_generation = True
     
     if args.checkpoint_path:
         # Tek checkpoint değerlendir
-        evaluate_checkpoint(args.checkpoint_path, args.dataset, args.num_samples)
+        evaluate_checkpoint(args.checkpoint_path, args.dataset, args.num_samples, cpu_mode=args.cpu_mode)
     elif args.base_dir:
         # Tüm checkpoint'leri değerlendir
         find_best_checkpoint(args.base_dir, args.dataset)
@@ -0,0 +1,75 @@
+"""LoRA Merge & Export - checkpoint'i base ağırlıklara merge edip tek başına model olarak kaydet"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from models.model_loader import load_model_and_tokenizer
+from models.lora_setup import merge_lora_checkpoint
+from models.batched_inference import build_prompt
+
+# Logit doğrulaması için örnek problemler (demo örnekleri)
+SAMPLE_PROBLEMS = [
+    "Write a Python function that returns the nth Fibonacci number.",
+    "Write a function to check if a string is a palindrome.",
+    "Given an array of integers nums and an integer target, return indices of the two numbers that add up to target.",
+    "Implement a binary search algorithm."
+]
+
+def merge_and_export(checkpoint_path, output_dir, tolerance=None, latency_tokens=64):
+    """
+    Checkpoint'i merge et, doğrula ve kaydet
+
+    Args:
+        checkpoint_path: LoRA checkpoint dizini
+        output_dir: Export dizini
+        tolerance: Göreli logit farkı sınırı (None = ModelConfig.merge_tolerance)
+        latency_tokens: Token başına gecikme ölçümünde üretilecek token (0 = ölçme)
+    """
+    print("=" * 60)
+    print(f"LoRA Merge & Export: {checkpoint_path} -> {output_dir}")
+    print("=" * 60)
+
+    # 1. Base model
+    print("\n1. Base model yükleniyor...")
+    base_model, tokenizer = load_model_and_tokenizer(load_in_8bit=False, gradient_checkpointing=False)
+    print("✓ Base model yüklendi")
+
+    # 2. Merge + doğrulama + kayıt
+    print("\n2. Merge ediliyor...")
+    prompts = [build_prompt(problem) for problem in SAMPLE_PROBLEMS]
+    _, info = merge_lora_checkpoint(
+        base_model,
+        tokenizer,
+        checkpoint_path,
+        output_dir,
+        prompts,
+        tolerance=tolerance,
+        latency_tokens=latency_tokens
+    )
+    print(f"✓ Merged model kaydedildi: {output_dir}")
+
+    # 3. Gecikme raporu
+    if latency_tokens:
+        peft_ms, merged_ms = info["peft_ms_per_token"], info["merged_ms_per_token"]
+        print("\nToken başına gecikme (greedy decode):")
+        print(f"  PEFT:   {peft_ms:.2f} ms")
+        print(f"  Merged: {merged_ms:.2f} ms")
+        print(f"  Kazanç: {(1 - merged_ms / peft_ms) * 100:.1f}% ({peft_ms / merged_ms:.2f}x)")
+
+    print(f"\nDeğerlendirme: python scripts/evaluate.py --checkpoint_path {output_dir} --dataset deep")
+
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LoRA checkpoint'ini merge edip export et")
+    parser.add_argument("--checkpoint_path", type=str, required=True, help="LoRA checkpoint dizini")
+    parser.add_argument("--output_dir", type=str, required=True, help="Export dizini")
+    parser.add_argument("--tolerance", type=float, default=None, help="Göreli logit farkı sınırı")
+    parser.add_argument("--latency_tokens", type=int, default=64, help="Gecikme ölçümü token sayısı (0 = ölçme)")
+
+    args = parser.parse_args()
+
+    merge_and_export(args.checkpoint_path, args.output_dir, args.tolerance, args.latency_tokens)
@@ -0,0 +1,100 @@
+"""LoRA Rank Profiling - gradient norm ile modül bazlı rank dağıtımı ve uniform karşılaştırması"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import torch
+from models.model_loader import load_model_and_tokenizer
+from models.lora_setup import setup_lora
+from models.rank_allocation import profile_and_allocate, save_rank_allocation, profile_examples
+from data.dataset_loader import DatasetLoader
+from data.data_collator import DataCollatorForCausalLM
+from config.model_config import ModelConfig
+from config.training_config import TrainingConfig
+
+def measure_training_steps(model, tokenizer, dataset, steps):
+    """
+    LoRA modelinde optimizer adımı süresi ve Adam state boyutu
+
+    Returns:
+        (trainable parametre, optimizer state MB, adım süresi s)
+    """
+    trainable = [p for p in model.parameters() if p.requires_grad]
+    optimizer = torch.optim.AdamW(trainable, lr=TrainingConfig.learning_rate)
+    collator = DataCollatorForCausalLM(tokenizer=tokenizer)
+    batch_size = TrainingConfig.per_device_batch_size
+    examples = profile_examples(dataset, (steps + 1) * batch_size, TrainingConfig.seed + 1)
+    model.train()
+
+    seconds = 0.0
+    for i in range(steps + 1):
+        batch = collator(examples[i * batch_size:(i + 1) * batch_size])
+        batch = {k: v.to(model.device) for k, v in batch.items()}
+        start = time.perf_counter()
+        model(**batch).loss.backward()
+        optimizer.step()
+        optimizer.zero_grad(set_to_none=True)
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        if i:  # İlk adım ısınma
+            seconds += time.perf_counter() - start
+
+    state_bytes = sum(
+        t.numel() * t.element_size()
+        for state in optimizer.state.values()
+        for t in state.values()
+        if torch.is_tensor(t)
+    )
+    return sum(p.numel() for p in trainable), state_bytes / 2**20, seconds / steps
+
+
+def profile_ranks(dataset_name, output_dir, num_batches, budget_ratio, compare_steps):
+    print("=" * 60)
+    print("LoRA Rank Profiling")
+    print("=" * 60)
+
+    model, tokenizer = load_model_and_tokenizer(
+        use_flash_attention=TrainingConfig.use_flash_attention_2,
+        gradient_checkpointing=TrainingConfig.gradient_checkpointing
+    )
+    dataset_loader = DatasetLoader(dataset_name=dataset_name, tokenizer=tokenizer, use_reasoning=False)
+    train_dataset, _ = dataset_loader.load_and_prepare()
+
+    allocation = profile_and_allocate(model, tokenizer, train_dataset, num_batches=num_batches, budget_ratio=budget_ratio)
+    path = save_rank_allocation(allocation, output_dir)
+    print(f"\n✓ Rank dağıtımı kaydedildi: {path}")
+    print(f"  Training'de kullanmak için: --rank_allocation {path}")
+
+    if not compare_steps:
+        return allocation
+
+    # Aynı base model üzerinde uniform ve profiling'li LoRA karşılaştırması
+    results = {}
+    for label, rank_allocation in (("uniform", None), ("allocated", allocation)):
+        peft_model = setup_lora(model, rank_allocation=rank_allocation)
+        results[label] = measure_training_steps(peft_model, tokenizer, train_dataset, compare_steps)
+        model = peft_model.unload()
+        del model.peft_config  # unload config'i base model'de bırakır
+
+    print(f"\n{'':>10} {'trainable':>12} {'Adam state MB':>14} {'adım (s)':>10}")
+    for label, (params, state_mb, seconds) in results.items():
+        print(f"{label:>10} {params:>12,} {state_mb:>14.1f} {seconds:>10.3f}")
+
+    return allocation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gradient norm profiling ile modül bazlı LoRA rank dağıtımı")
+    parser.add_argument("--dataset", type=str, default="deep", help="deep / diverse / local JSONL-Parquet yolu")
+    parser.add_argument("--output_dir", type=str, default="./checkpoints/rank_allocation", help="rank_allocation.json dizini")
+    parser.add_argument("--num_batches", type=int, default=ModelConfig.rank_profile_batches, help="Profiling batch sayısı")
+    parser.add_argument("--budget_ratio", type=float, default=ModelConfig.rank_budget_ratio,
+                        help="LoRA parametre bütçesi / uniform lora_r parametresi")
+    parser.add_argument("--compare_steps", type=int, default=5, help="Uniform vs dağıtılmış adım ölçümü (0 = atla)")
+
+    args = parser.parse_args()
+
+    profile_ranks(args.dataset, args.output_dir, args.num_batches, args.budget_ratio, args.compare_steps)
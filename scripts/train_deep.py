@@ -4,20 +4,41 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
 import torch
 from models.model_loader import load_model_and_tokenizer
 from models.lora_setup import setup_lora
 from data.dataset_loader import DatasetLoader
-from training.trainer import setup_trainer
+from training.trainer import setup_trainer, find_resume_checkpoint, load_sampler_state, stream_skip_examples
+from utils.distributed import is_distributed, is_main_process, main_process_first
+from models.rank_allocation import (RANK_ALLOCATION_FILE, load_rank_allocation, profile_and_allocate,
+                                   save_rank_allocation)
+from config.model_config import ModelConfig
 from config.training_config import TrainingConfig
 
-def train_deep():
-    """DEEP dataset ile training"""
+def train_deep(data_path=None, rank_allocation_path=None, resume=None):
+    """
+    DEEP dataset ile training
+    
+    Args:
+        data_path: Hub yerine local JSONL/Parquet dosya / dizin (offline node'lar için)
+        rank_allocation_path: Önceki çalıştırmanın rank_allocation.json'ı (profiling atlanır)
+        resume: Checkpoint dizini veya "latest" (output_dir'deki son tamamlanmış checkpoint)
+    """
     
     print("=" * 60)
     print("DEEP Dataset Training")
     print("=" * 60)
     
+    output_dir = "./checkpoints/deep"
+    
+    # Resume checkpoint'i - veri pozisyonu dataset yüklenirken gerekiyor
+    resume_checkpoint = None
+    if resume:
+        resume_checkpoint = find_resume_checkpoint(output_dir) if resume == "latest" else resume
+        if resume_checkpoint is None:
+            print(f"⚠️ {output_dir} içinde tamamlanmış checkpoint yok, training baştan başlıyor")
+    
     # 1. Model ve tokenizer yükle
     print("\n1. Base model yükleniyor...")
     model, tokenizer = load_model_and_tokenizer(
@@ -26,25 +47,47 @@ def train_deep():
     )
     print("✓ Model yüklendi")
     
-    # 2. LoRA setup
-    print("\n2. LoRA yapılandırılıyor...")
-    model = setup_lora(model, use_8bit=TrainingConfig.use_8bit)
-    print("✓ LoRA yapılandırıldı")
-    
-    # 3. Dataset yükle
-    print("\n3. DEEP dataset yükleniyor...")
+    # 2. Dataset yükle (rank profiling train split'ini kullanır)
+    print("\n2. DEEP dataset yükleniyor...")
     dataset_loader = DatasetLoader(
-        dataset_name="deep",
+        dataset_name=data_path or "deep",
         tokenizer=tokenizer,
         use_reasoning=False  # Sadece solution field
     )
-    train_dataset, eval_dataset = dataset_loader.load_and_prepare()
-    print(f"✓ Dataset yüklendi - Train: {len(train_dataset)}, Eval: {len(eval_dataset)}")
+    skip_examples = 0
+    if resume_checkpoint and TrainingConfig.streaming:
+        skip_examples = stream_skip_examples(load_sampler_state(resume_checkpoint))
+    # DDP: node'da tokenization / cache yazımı bir kez, diğer rank'ler cache'ten okur
+    with main_process_first():
+        train_dataset, eval_dataset = dataset_loader.load_and_prepare(
+            packing=TrainingConfig.packing,
+            streaming=TrainingConfig.streaming,
+            skip_examples=skip_examples
+        )
+    if TrainingConfig.streaming:
+        print(f"✓ Dataset streaming modda hazır - max_steps: {TrainingConfig.max_steps}")
+    else:
+        print(f"✓ Dataset yüklendi - Train: {len(train_dataset)}, Eval: {len(eval_dataset)}")
+    
+    # 3. LoRA setup (opsiyonel: profiling ile modül bazlı rank'ler)
+    print("\n3. LoRA yapılandırılıyor...")
+    rank_allocation = None
+    if not rank_allocation_path and resume_checkpoint and os.path.isfile(os.path.join(resume_checkpoint, RANK_ALLOCATION_FILE)):
+        # Resume'da adapter şekilleri checkpoint'teki rank'lerle aynı olmalı
+        rank_allocation_path = resume_checkpoint
+    if rank_allocation_path:
+        rank_allocation = load_rank_allocation(rank_allocation_path)
+        print(f"✓ Rank dağıtımı yüklendi: {rank_allocation_path}")
+    elif ModelConfig.rank_allocation:
+        rank_allocation = profile_and_allocate(model, tokenizer, train_dataset)
+    model = setup_lora(model, use_8bit=TrainingConfig.use_8bit, rank_allocation=rank_allocation)
+    print("✓ LoRA yapılandırıldı")
     
     # 4. Trainer setup
     print("\n4. Trainer yapılandırılıyor...")
-    output_dir = "./checkpoints/deep"
     os.makedirs(output_dir, exist_ok=True)
+    if rank_allocation and is_main_process():
+        save_rank_allocation(rank_allocation, output_dir)
     
     trainer = setup_trainer(
         model=model,
@@ -52,20 +95,26 @@ def train_deep():
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
         output_dir=output_dir,
-        run_name="deep_training"
+        run_name="deep_training",
+        max_length=dataset_loader.max_length,
+        rank_allocation=rank_allocation,
+        stream_examples_skipped=skip_examples
     )
     print("✓ Trainer hazır")
     
     # 5. Training başlat
     print("\n5. Training başlıyor...")
     print("=" * 60)
-    trainer.train()
+    trainer.train(resume_from_checkpoint=resume_checkpoint)
     
     # 6. Final model kaydet
     print("\n6. Final model kaydediliyor...")
     final_model_path = os.path.join(output_dir, "final_model")
     trainer.save_model(final_model_path)
-    tokenizer.save_pretrained(final_model_path)
+    if trainer.is_world_process_zero():
+        tokenizer.save_pretrained(final_model_path)
+        if rank_allocation:
+            save_rank_allocation(rank_allocation, final_model_path)
     print(f"✓ Model kaydedildi: {final_model_path}")
     
     print("\n" + "=" * 60)
@@ -76,11 +125,19 @@ def train_deep():
 
 
 if __name__ == "__main__":
-    # GPU kontrolü
-    if not torch.cuda.is_available():
+    parser = argparse.ArgumentParser(description="DEEP training")
+    parser.add_argument("--data_path", type=str, default=None, help="Local JSONL/Parquet dosya / dizin (hub yerine)")
+    parser.add_argument("--rank_allocation", type=str, default=None,
+                        help="rank_allocation.json / checkpoint dizini (aynı modül bazlı rank'leri tekrar kullan)")
+    parser.add_argument("--resume", type=str, nargs="?", const="latest", default=None,
+                        help="Checkpoint'ten devam: dizin yolu veya değersiz (son tamamlanmış checkpoint)")
+    args = parser.parse_args()
+    
+    # GPU kontrolü (torchrun ile CPU DDP'de sorulmaz - rank'lerin stdin'i yok)
+    if not torch.cuda.is_available() and not is_distributed():
         print("UYARI: CUDA bulunamadı! CPU'da training çok yavaş olacak.")
         response = input("Devam etmek istiyor musunuz? (y/n): ")
         if response.lower() != 'y':
             exit()
     
-    train_deep()
+    train_deep(data_path=args.data_path, rank_allocation_path=args.rank_allocation, resume=args.resume)
@@ -0,0 +1,302 @@
+"""Run Matrix - tek yüklenmiş base model üzerinde sırayla birden fazla LoRA adapter training'i"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import gc
+import itertools
+import json
+import time
+import torch
+from contextlib import contextmanager
+from transformers import set_seed
+from models.model_loader import load_model_and_tokenizer
+from models.lora_setup import setup_lora
+from models.rank_allocation import profile_and_allocate, save_rank_allocation
+from data.dataset_loader import DatasetLoader
+from training.trainer import setup_trainer
+from utils.distributed import is_distributed, is_main_process, main_process_first
+from config.model_config import ModelConfig
+from config.training_config import TrainingConfig
+
+SUMMARY_FILE = "run_matrix_summary.json"
+
+
+def parse_value(text, current=None):
+    """CLI değerini config değerine çevir (sayılar / listeler JSON olarak, bool mevcut değerin tipine göre)"""
+    if text == "None":
+        return None
+    if isinstance(current, bool):
+        return text.lower() in ("1", "true", "yes")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def config_class(key):
+    """Override anahtarının ait olduğu config sınıfı (TrainingConfig öncelikli)"""
+    for cls in (TrainingConfig, ModelConfig):
+        if hasattr(cls, key):
+            return cls
+    raise KeyError(f"Bilinmeyen config anahtarı: {key} (TrainingConfig / ModelConfig)")
+
+
+@contextmanager
+def config_overrides(overrides):
+    """TrainingConfig / ModelConfig class attribute'larını run süresince değiştir, sonra geri al"""
+    previous = []
+    try:
+        for key, value in overrides.items():
+            cls = config_class(key)
+            previous.append((cls, key, getattr(cls, key)))
+            setattr(cls, key, value)
+        yield
+    finally:
+        for cls, key, value in reversed(previous):
+            setattr(cls, key, value)
+
+
+def expand_runs(datasets, sweep=None, runs_file=None):
+    """
+    Run listesi: runs_file (JSON) veya dataset x sweep kartezyen çarpımı
+
+    runs_file formatı:
+        [{"name": "deep_r16", "dataset": "deep", "overrides": {"lora_r": 16, "lora_alpha": 32}}, ...]
+
+    Sweep formatı: ["learning_rate=1e-4,2e-4", "lora_r=16,32"]
+
+    Returns:
+        [{"name", "dataset", "use_reasoning", "overrides"}]
+    """
+    if runs_file:
+        with open(runs_file) as f:
+            runs = json.load(f)
+        for run in runs:
+            run.setdefault("overrides", {})
+            run.setdefault("use_reasoning", False)
+            run.setdefault("name", _run_name(run["dataset"], run["overrides"]))
+        return runs
+
+    axes = []
+    for item in sweep or []:
+        key, values = item.split("=", 1)
+        current = getattr(config_class(key), key)
+        axes.append([(key, parse_value(value, current)) for value in values.split(",")])
+
+    runs = []
+    for dataset in datasets:
+        for combination in itertools.product(*axes):
+            overrides = dict(combination)
+            runs.append({
+                "name": _run_name(dataset, overrides),
+                "dataset": dataset,
+                "use_reasoning": False,
+                "overrides": overrides
+            })
+    return runs
+
+
+def _run_name(dataset, overrides):
+    name = os.path.splitext(os.path.basename(os.path.normpath(dataset)))[0]
+    return "_".join([name] + [f"{key}-{value}" for key, value in overrides.items()])
+
+
+def load_run_datasets(run, tokenizer, dataset_cache):
+    """
+    Run'ın train / eval split'leri
+
+    Aynı process'teki önceki run'larla aynı preprocessing ayarlarını
+    paylaşan run'lar split'leri bellekten alır; diğerleri DatasetLoader'ın
+    disk cache'inden (yoksa tokenize ederek) yükler.
+    """
+    dataset_loader = DatasetLoader(
+        dataset_name=run["dataset"],
+        tokenizer=tokenizer,
+        use_reasoning=run["use_reasoning"]
+    )
+    key = dataset_loader.memory_cache_key(packing=TrainingConfig.packing, streaming=TrainingConfig.streaming)
+    if key in dataset_cache:
+        print("✓ Dataset bu process'te zaten yüklü - tekrar kullanılıyor")
+        return dataset_cache[key]
+
+    with main_process_first():
+        train_dataset, eval_dataset = dataset_loader.load_and_prepare(
+            packing=TrainingConfig.packing,
+            streaming=TrainingConfig.streaming
+        )
+    dataset_cache[key] = (train_dataset, eval_dataset, dataset_loader.max_length)
+    return dataset_cache[key]
+
+
+def train_run(model, tokenizer, run, output_root, dataset_cache):
+    """
+    Paylaşılan base model üzerinde taze LoRA adapter ile tek run
+
+    Training bitince (veya hata verince) LoRA katmanları kaldırılır, base
+    model bir sonraki run için ilk haline döner.
+
+    Returns:
+        (base model, sonuç dict'i)
+    """
+    output_dir = os.path.join(output_root, run["name"])
+    result = {"name": run["name"], "dataset": run["dataset"], "overrides": run["overrides"], "output_dir": output_dir}
+
+    peft_model = None
+    trainer = None
+    start = time.perf_counter()
+    try:
+        with config_overrides(run["overrides"]):
+            train_dataset, eval_dataset, max_length = load_run_datasets(run, tokenizer, dataset_cache)
+
+            rank_allocation = None
+            if ModelConfig.rank_allocation:
+                rank_allocation = profile_and_allocate(model, tokenizer, train_dataset)
+
+            # Her run aynı LoRA başlangıcı ile (sweep'te farklar sadece override'lardan)
+            set_seed(TrainingConfig.seed)
+            peft_model = setup_lora(model, use_8bit=TrainingConfig.use_8bit, rank_allocation=rank_allocation)
+            result["trainable_params"] = sum(p.numel() for p in peft_model.parameters() if p.requires_grad)
+
+            os.makedirs(output_dir, exist_ok=True)
+            if rank_allocation and is_main_process():
+                save_rank_allocation(rank_allocation, output_dir)
+
+            trainer = setup_trainer(
+                model=peft_model,
+                tokenizer=tokenizer,
+                train_dataset=train_dataset,
+                eval_dataset=eval_dataset,
+                output_dir=output_dir,
+                run_name=run["name"],
+                max_length=max_length,
+                rank_allocation=rank_allocation
+            )
+            result["setup_seconds"] = time.perf_counter() - start
+
+            train_output = trainer.train()
+
+            final_model_path = os.path.join(output_dir, "final_model")
+            trainer.save_model(final_model_path)
+            if trainer.is_world_process_zero():
+                tokenizer.save_pretrained(final_model_path)
+                if rank_allocation:
+                    save_rank_allocation(rank_allocation, final_model_path)
+
+        eval_losses = [entry["eval_loss"] for entry in trainer.state.log_history if "eval_loss" in entry]
+        result.update({
+            "status": "ok",
+            "steps": trainer.state.global_step,
+            "train_loss": train_output.training_loss,
+            "best_eval_loss": trainer.state.best_metric,
+            "last_eval_loss": eval_losses[-1] if eval_losses else None,
+            "train_seconds": train_output.metrics.get("train_runtime"),
+            "final_model": final_model_path
+        })
+    except Exception as error:
+        # Sweep'te tek run'ın hatası diğerlerini durdurmasın
+        print(f"⚠️ Run başarısız: {run['name']} - {type(error).__name__}: {error}")
+        result.update({"status": "hata", "error": f"{type(error).__name__}: {error}"})
+    finally:
+        # Checkpoint / log yazıcı thread'leri run ile biter
+        if trainer is not None:
+            trainer.close_writers()
+            trainer = None
+        if peft_model is not None:
+            model = peft_model.unload()
+            if hasattr(model, "peft_config"):
+                del model.peft_config  # unload config'i base model'de bırakır
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    result["total_seconds"] = time.perf_counter() - start
+    return model, result
+
+
+def print_summary(results, load_seconds):
+    """Run'ların tek tablo özeti"""
+    print("\n" + "=" * 100)
+    print("Run Matrix Özeti")
+    print("=" * 100)
+    print(f"{'run':<40} {'durum':>6} {'adım':>6} {'train loss':>11} {'en iyi eval':>12} "
+          f"{'son eval':>9} {'hazırlık s':>11} {'train s':>8}")
+
+    def number(value, fmt):
+        return format(value, fmt) if isinstance(value, (int, float)) else "-"
+
+    for result in results:
+        print(f"{result['name'][:40]:<40} {result['status']:>6} {number(result.get('steps'), 'd'):>6} "
+              f"{number(result.get('train_loss'), '.4f'):>11} {number(result.get('best_eval_loss'), '.4f'):>12} "
+              f"{number(result.get('last_eval_loss'), '.4f'):>9} {number(result.get('setup_seconds'), '.1f'):>11} "
+              f"{number(result.get('train_seconds'), '.1f'):>8}")
+
+    total = load_seconds + sum(result["total_seconds"] for result in results)
+    print(f"\nBase model bir kez yüklendi: {load_seconds:.1f}s "
+          f"(ayrı script'lerle {len(results)} run ~{load_seconds * (len(results) - 1):.1f}s daha fazla yükleme)")
+    print(f"Toplam: {total:.1f}s")
+
+
+def train_matrix(runs, output_root):
+    print("=" * 60)
+    print(f"Run Matrix: {len(runs)} run, tek base model")
+    print("=" * 60)
+    for run in runs:
+        print(f"  - {run['name']}: {run['dataset']} {run['overrides'] or ''}")
+
+    # 1. Base model ve tokenizer - tüm run'lar için bir kez
+    print("\n1. Base model yükleniyor (bir kez)...")
+    start = time.perf_counter()
+    model, tokenizer = load_model_and_tokenizer(
+        use_flash_attention=TrainingConfig.use_flash_attention_2,
+        load_in_8bit=TrainingConfig.use_8bit
+    )
+    load_seconds = time.perf_counter() - start
+    print(f"✓ Model yüklendi ({load_seconds:.1f}s)")
+
+    # 2. Run'lar sırayla: her biri taze LoRA, base donuk ve paylaşılan
+    dataset_cache = {}
+    results = []
+    for i, run in enumerate(runs, 1):
+        print("\n" + "=" * 60)
+        print(f"{i}/{len(runs)}. Run: {run['name']}")
+        print("=" * 60)
+        model, result = train_run(model, tokenizer, run, output_root, dataset_cache)
+        results.append(result)
+
+        # Her run'dan sonra özet dosyasını güncelle (yarıda kalan matrix'te de sonuçlar kalsın)
+        if is_main_process():
+            os.makedirs(output_root, exist_ok=True)
+            with open(os.path.join(output_root, SUMMARY_FILE), "w") as f:
+                json.dump({"load_seconds": load_seconds, "runs": results}, f, indent=2)
+
+    if is_main_process():
+        print_summary(results, load_seconds)
+        print(f"\nÖzet: {os.path.join(output_root, SUMMARY_FILE)}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Tek base model ile birden fazla LoRA training (dataset x hiperparametre)",
+        epilog="Örnek: python scripts/train_matrix.py --datasets deep diverse --sweep learning_rate=1e-4,2e-4"
+    )
+    parser.add_argument("--datasets", type=str, nargs="+", default=["deep", "diverse"],
+                        help="deep / diverse / local JSONL-Parquet yolları")
+    parser.add_argument("--sweep", type=str, nargs="*", default=[],
+                        help="anahtar=değer1,değer2 (TrainingConfig / ModelConfig attribute'ları)")
+    parser.add_argument("--runs_file", type=str, default=None,
+                        help="Run listesi JSON'ı (--datasets / --sweep yerine)")
+    parser.add_argument("--output_root", type=str, default="./checkpoints", help="Run dizinlerinin kökü")
+    args = parser.parse_args()
+
+    # GPU kontrolü (torchrun ile CPU DDP'de sorulmaz - rank'lerin stdin'i yok)
+    if not torch.cuda.is_available() and not is_distributed():
+        print("UYARI: CUDA bulunamadı! CPU'da training çok yavaş olacak.")
+        response = input("Devam etmek istiyor musunuz? (y/n): ")
+        if response.lower() != 'y':
+            exit()
+
+    train_matrix(expand_runs(args.datasets, args.sweep, args.runs_file), args.output_root)
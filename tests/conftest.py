@@ -0,0 +1,39 @@
+"""Test'ler repo kökünden import eder (script'lerle aynı)"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import torch
+from tokenizers import Tokenizer, models
+from transformers import PreTrainedTokenizerFast, Qwen2Config, Qwen2ForCausalLM
+
+
+@pytest.fixture
+def tiny_qwen2():
+    """Random küçük Qwen2 (hub'a gitmeden)"""
+    def build(attn_implementation="sdpa", dtype=torch.float32, num_layers=2):
+        torch.manual_seed(0)
+        config = Qwen2Config(
+            vocab_size=128,
+            hidden_size=64,
+            intermediate_size=128,
+            num_hidden_layers=num_layers,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+            pad_token_id=0
+        )
+        model = Qwen2ForCausalLM._from_config(config, attn_implementation=attn_implementation)
+        return model.to(dtype).eval()
+    return build
+
+
+@pytest.fixture
+def tiny_tokenizer():
+    """Qwen2 fixture'ının vocab'ına uyan kelime bazlı tokenizer"""
+    vocab = {"<pad>": 0, "<eos>": 1, **{f"w{i}": i for i in range(2, 128)}}
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=Tokenizer(models.WordLevel(vocab, unk_token="<pad>")),
+                                        pad_token="<pad>", eos_token="<eos>")
+    tokenizer.padding_side = "right"
+    return tokenizer
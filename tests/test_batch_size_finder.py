@@ -0,0 +1,14 @@
+import pytest
+from training.batch_size_finder import candidate_batch_sizes
+
+
+@pytest.mark.parametrize("effective, processes, max_batch_size, expected", [
+    (16, 1, None, [1, 2, 4, 8, 16]),
+    (16, 2, None, [1, 2, 4, 8]),
+    (16, 4, 2, [1, 2]),
+    (24, 1, None, [1, 2, 4, 8, 16]),  # 2'nin kuvveti, effective'i aşmadan
+    (64, 1, 48, [1, 2, 4, 8, 16, 32]),
+    (2, 4, None, [1]),  # Process başına pay 1'den küçük olsa da en az 1
+])
+def test_candidate_batch_sizes(effective, processes, max_batch_size, expected):
+    assert candidate_batch_sizes(effective, processes, max_batch_size) == expected
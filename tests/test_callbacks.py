@@ -0,0 +1,51 @@
+from transformers import TrainerControl, TrainerState
+from training.callbacks import EpochEndEvalCallback, LoggingCallback
+
+
+def test_epoch_end_skips_save_when_step_already_saved():
+    callback = EpochEndEvalCallback()
+    state = TrainerState(global_step=100)
+    control = TrainerControl()
+
+    # Son adım save_steps'e denk geldi: checkpoint kaydedildi, eval yapılmadı
+    callback.on_save(None, state, control)
+    callback.on_epoch_end(None, state, control)
+
+    assert control.should_evaluate
+    assert not control.should_save
+
+
+def test_epoch_end_triggers_eval_and_save():
+    callback = EpochEndEvalCallback()
+    state = TrainerState(global_step=100)
+    control = TrainerControl()
+    callback.on_save(None, TrainerState(global_step=50), control)
+
+    callback.on_epoch_end(None, state, control)
+
+    assert control.should_evaluate
+    assert control.should_save
+
+
+def test_epoch_end_skips_when_step_already_evaluated():
+    callback = EpochEndEvalCallback()
+    state = TrainerState(global_step=100)
+    control = TrainerControl()
+
+    callback.on_evaluate(None, state, control)
+    callback.on_epoch_end(None, state, control)
+
+    assert not control.should_evaluate
+    assert not control.should_save
+
+
+def test_logging_callback_skips_empty_console_line(tmp_path, capsys):
+    callback = LoggingCallback(log_dir=str(tmp_path))
+    state = TrainerState(global_step=5, epoch=0.5)
+
+    callback.on_log(None, state, TrainerControl(), logs={"train_runtime": 1.0})
+    assert capsys.readouterr().out == ""
+
+    callback.on_log(None, state, TrainerControl(), logs={"loss": 1.25})
+    callback.close()
+    assert capsys.readouterr().out == "Step 5: train_loss=1.25\n"
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+import torch
+from data.data_collator import DataCollatorForCausalLM
+
+IGNORE = -100
+
+
+def make_collator(pad_to_multiple_of=None):
+    return DataCollatorForCausalLM(tokenizer=SimpleNamespace(pad_token_id=0), pad_to_multiple_of=pad_to_multiple_of)
+
+
+def test_packed_labels_mask_document_starts_and_padding():
+    features = [
+        {"input_ids": [11, 12, 13, 21, 22], "position_ids": [0, 1, 2, 0, 1]},
+        {"input_ids": [31, 32, 33], "position_ids": [0, 1, 2]}
+    ]
+    batch = make_collator()(features)
+
+    assert "attention_mask" not in batch
+    assert batch["input_ids"].tolist() == [[11, 12, 13, 21, 22], [31, 32, 33, 0, 0]]
+    # Her dokümanın ilk token'ı ve padding loss'a girmez
+    assert batch["labels"].tolist() == [
+        [IGNORE, 12, 13, IGNORE, 22],
+        [IGNORE, 32, 33, IGNORE, IGNORE]
+    ]
+    # Padding ayrı bir doküman gibi 0'dan başlar
+    assert batch["position_ids"].tolist() == [[0, 1, 2, 0, 1], [0, 1, 2, 0, 1]]
+
+
+def test_packed_torch_rows_with_pad_to_multiple_of():
+    features = [{"input_ids": torch.tensor([5, 6, 7]), "position_ids": torch.tensor([0, 0, 1])}]
+    batch = make_collator(pad_to_multiple_of=4)(features)
+
+    assert batch["labels"].tolist() == [[IGNORE, IGNORE, 7, IGNORE]]
+    assert batch["position_ids"].tolist() == [[0, 0, 1, 0]]
+
+
+def test_unpacked_labels_mask_only_padding():
+    batch = make_collator()([{"input_ids": [1, 2, 3]}, {"input_ids": [4]}])
+
+    assert batch["labels"].tolist() == [[1, 2, 3], [4, IGNORE, IGNORE]]
+    assert batch["attention_mask"].tolist() == [[1, 1, 1], [1, 0, 0]]
+    assert "position_ids" not in batch
@@ -0,0 +1,42 @@
+import json
+import pytest
+from config.training_config import TrainingConfig
+from data.dataset_loader import DatasetLoader
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    path = tmp_path / "train.jsonl"
+    path.write_text(json.dumps({"input": "w2 w3", "solution": "w4"}) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("streaming, name, value", [
+    (False, "seed", 7),
+    (False, "dedup", True),
+    (False, "dataset_revision", "abc123"),
+    (True, "preprocessing_batch_size", 17),
+    (True, "streaming_test_fraction", 0.5),
+])
+def test_memory_cache_key_tracks_preprocessing_settings(corpus_path, tiny_tokenizer, monkeypatch, streaming, name, value):
+    def key():
+        loader = DatasetLoader(corpus_path, tiny_tokenizer, use_cache=False)
+        # Hub revision'ı local corpus'ta fingerprint ile değişir - hub yolunu taklit et
+        if name == "dataset_revision":
+            loader.is_local = False
+            monkeypatch.setattr("data.dataset_loader.resolve_dataset_revision", lambda path, revision: revision)
+        return loader.memory_cache_key(packing=True, streaming=streaming)
+
+    before = key()
+    monkeypatch.setattr(TrainingConfig, name, value)
+
+    assert key() != before
+
+
+def test_memory_cache_key_packing_batch_size(corpus_path, tiny_tokenizer, monkeypatch):
+    loader = DatasetLoader(corpus_path, tiny_tokenizer, use_cache=False)
+    before = loader.memory_cache_key(packing=True)
+    monkeypatch.setattr(TrainingConfig, "packing_batch_size", TrainingConfig.packing_batch_size + 1)
+
+    assert loader.memory_cache_key(packing=True) != before
+    assert loader.memory_cache_key(packing=True, streaming=True) != loader.memory_cache_key(packing=True)
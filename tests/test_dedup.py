@@ -0,0 +1,64 @@
+import zlib
+import numpy as np
+from data.dedup import MinHasher, find_clusters
+
+NUM_PERM = 128
+
+
+def changed(signature, start, stop, offset):
+    signature = signature.copy()
+    signature[start:stop] += offset
+    return signature
+
+
+def test_find_clusters_is_transitive():
+    a = np.arange(NUM_PERM, dtype=np.uint64)
+    b = changed(a, 96, 128, 1000)   # a ile %75 aynı
+    c = changed(b, 0, 48, 2000)     # b ile %62.5, a ile %37.5 aynı
+    unrelated = a + 5000
+
+    clusters = find_clusters(np.stack([a, unrelated, b, c]), threshold=0.5)
+
+    assert sorted(map(sorted, clusters)) == [[0, 2, 3], [1]]
+
+
+def test_find_clusters_singletons_and_exact_duplicates():
+    rows = [np.arange(NUM_PERM, dtype=np.uint64) + offset for offset in (0, 1000, 0, 2000, 1000)]
+
+    clusters = find_clusters(np.stack(rows), threshold=0.8)
+
+    assert sorted(map(sorted, clusters)) == [[0, 2], [1, 4], [3]]
+
+
+def test_find_clusters_on_near_duplicate_texts():
+    hasher = MinHasher(num_perm=NUM_PERM, shingle_size=3, seed=0)
+    base = " ".join(f"word{i}" for i in range(200))
+    texts = [
+        base,
+        base.replace("word100", "changed"),
+        " ".join(f"other{i}" for i in range(200)),
+    ]
+    signatures = np.stack([hasher.signature({"input": text}) for text in texts])
+
+    clusters = find_clusters(signatures, threshold=0.8)
+
+    assert sorted(map(sorted, clusters)) == [[0, 1], [2]]
+
+
+def test_minhash_permutations_do_not_overflow():
+    hasher = MinHasher(num_perm=NUM_PERM, seed=0)
+    max_hash = (1 << 32) - 1
+
+    # Python int'lerle (taşmasız) hesaplanan imza ile aynı olmalı
+    texts = {"input": "the quick brown fox jumps over the lazy dog again and again"}
+    shingles = set()
+    for tag, text in texts.items():
+        shingles |= hasher._shingles(tag, text)
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    expected = [
+        min(((int(a) * h + int(b)) % ((1 << 61) - 1)) & max_hash for h in hashes)
+        for a, b in zip(hasher.a, hasher.b)
+    ]
+
+    assert hasher.signature(texts).tolist() == expected
+    assert int(hasher.a.max()) * max_hash + int(hasher.b.max()) < 1 << 64
@@ -0,0 +1,23 @@
+import pytest
+from utils.distributed import data_parallel_accumulation
+
+
+@pytest.mark.parametrize("effective, per_device, processes, expected", [
+    (16, 2, 1, (8, 16)),
+    (16, 2, 2, (4, 16)),
+    (16, 2, 4, (2, 16)),
+    (16, 4, 4, (1, 16)),
+    (16, 8, 4, (1, 32)),  # Tek micro-step bile effective'i aşar: accumulation en az 1
+])
+def test_data_parallel_accumulation(effective, per_device, processes, expected):
+    assert data_parallel_accumulation(effective, per_device, processes) == expected
+
+
+def test_data_parallel_accumulation_warns_when_not_divisible(capsys):
+    assert data_parallel_accumulation(10, 2, 3) == (2, 12)
+    assert "tam bölünmüyor - 12 kullanılıyor" in capsys.readouterr().out
+
+
+def test_data_parallel_accumulation_defaults_to_world_size(monkeypatch):
+    monkeypatch.setenv("WORLD_SIZE", "2")
+    assert data_parallel_accumulation(16, 2) == (4, 16)
@@ -0,0 +1,23 @@
+import pytest
+from training.trainer import eval_agreement
+
+
+def test_first_epoch_reports_gap_only():
+    assert eval_agreement([(1.1, 1.0)]) == {"eval_subset_gap": pytest.approx(0.1)}
+
+
+def test_decision_agreement_counts_matching_improvements():
+    pairs = [
+        (2.0, 2.2),
+        (1.8, 2.0),  # İkisi de iyileşti
+        (1.9, 1.9),  # Subset kötüleşti, tam iyileşti
+        (1.7, 1.8),  # İkisi de iyileşti
+    ]
+    agreement = eval_agreement(pairs)
+
+    assert agreement["eval_decision_agreement"] == pytest.approx(2 / 3)
+    assert agreement["eval_subset_gap"] == pytest.approx((1.7 - 1.8) / 1.8)
+
+
+def test_full_agreement():
+    assert eval_agreement([(3.0, 3.1), (2.5, 2.6), (2.6, 2.7)])["eval_decision_agreement"] == 1.0
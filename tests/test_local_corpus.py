@@ -0,0 +1,47 @@
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from data.local_corpus import load_local_corpus, load_local_corpus_streaming
+
+COLUMNS = ["input", "output", "solution"]
+ROWS = [
+    {"input": "2+2?", "output": "4", "solution": "2+2=4", "difficulty": 1, "source": "a"},
+    {"input": "3*3?", "output": "9", "solution": "3*3=9", "difficulty": 7},
+    {"input": "1-1?", "output": "0", "solution": "1-1=0"},
+]
+
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    with open(tmp_path / "train.jsonl", "w", encoding="utf-8") as f:
+        for row in ROWS:
+            f.write(json.dumps(row) + "\n")
+    return tmp_path
+
+
+def test_load_local_corpus_numeric_difficulty(corpus_dir):
+    train = load_local_corpus(str(corpus_dir), COLUMNS)["train"]
+
+    assert train.column_names == COLUMNS + ["difficulty"]
+    assert train["difficulty"] == [1, 7, None]
+    assert train["input"] == [row["input"] for row in ROWS]
+
+
+def test_load_local_corpus_streaming_numeric_difficulty(corpus_dir):
+    rows = list(load_local_corpus_streaming(str(corpus_dir), COLUMNS)["train"])
+
+    assert [row["difficulty"] for row in rows] == [1, 7, None]
+    assert all("source" not in row for row in rows)
+
+
+def test_load_local_corpus_mixed_jsonl_parquet(corpus_dir):
+    # Parquet'te difficulty int32 - JSONL (int64) ile concat edilebilmeli
+    pq.write_table(pa.table({
+        "input": ["5/5?"], "output": ["1"], "solution": ["5/5=1"],
+        "difficulty": pa.array([3], type=pa.int32()),
+    }), corpus_dir / "train_extra.parquet")
+
+    train = load_local_corpus(str(corpus_dir), COLUMNS)["train"]
+
+    assert sorted(d for d in train["difficulty"] if d is not None) == [1, 3, 7]
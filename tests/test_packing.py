@@ -0,0 +1,48 @@
+import pytest
+import torch
+from training.trainer import supports_packed_attention
+
+
+@pytest.mark.parametrize("attn_implementation", ["sdpa", "eager"])
+@pytest.mark.parametrize("dtype", [torch.float32, torch.bfloat16])
+def test_no_attention_across_position_ids_reset(tiny_qwen2, attn_implementation, dtype):
+    model = tiny_qwen2(attn_implementation, dtype)
+    first = torch.tensor([[5, 6, 7]])
+    second = torch.tensor([[9, 10, 11, 12]])
+
+    with torch.no_grad():
+        alone = model(input_ids=second, position_ids=torch.arange(4).unsqueeze(0), use_cache=False).logits
+        packed = model(
+            input_ids=torch.cat([first, second], dim=1),
+            position_ids=torch.tensor([[0, 1, 2, 0, 1, 2, 3]]),
+            use_cache=False
+        ).logits
+
+    torch.testing.assert_close(packed[:, 3:], alone)
+    assert supports_packed_attention(model)
+
+
+class _CausalOnly(torch.nn.Module):
+    """Tüm pencereye tek attention_mask veren model: dokümanlar birbirini görür"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.config = model.config
+
+    @property
+    def device(self):
+        return self.model.device
+
+    def forward(self, input_ids, **kwargs):
+        return self.model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), **kwargs)
+
+
+def test_supports_packed_attention_detects_leak(tiny_qwen2):
+    assert not supports_packed_attention(_CausalOnly(tiny_qwen2()))
+
+
+def test_supports_packed_attention_restores_train_mode(tiny_qwen2):
+    model = tiny_qwen2().train()
+    supports_packed_attention(model)
+    assert model.training
@@ -0,0 +1,47 @@
+import torch
+from models.rank_allocation import allocate_ranks, lora_parameter_count
+
+CANDIDATES = [4, 8, 16, 32, 64]
+
+
+def make_modules(count=4, features=64):
+    return {f"layers.{i}.q_proj": torch.nn.Linear(features, features, bias=False) for i in range(count)}
+
+
+def test_ranks_follow_sensitivity_within_budget():
+    modules = make_modules()
+    scores = {name: score for name, score in zip(modules, [1.0, 2.0, 4.0, 8.0])}
+    budget = lora_parameter_count(modules, {name: 16 for name in modules})
+
+    ranks = allocate_ranks(scores, modules, budget, CANDIDATES)
+
+    assert set(ranks.values()) <= set(CANDIDATES)
+    assert lora_parameter_count(modules, ranks) <= budget
+    ordered = [ranks[name] for name in sorted(scores, key=scores.get)]
+    assert ordered == sorted(ordered)
+    assert ordered[0] < ordered[-1]
+
+
+def test_equal_scores_get_uniform_ranks():
+    modules = make_modules()
+    budget = lora_parameter_count(modules, {name: 16 for name in modules})
+
+    ranks = allocate_ranks({name: 1.0 for name in modules}, modules, budget, CANDIDATES)
+
+    assert set(ranks.values()) == {16}
+
+
+def test_budget_below_lowest_rank_falls_back_to_lowest(capsys):
+    modules = make_modules()
+    ranks = allocate_ranks({name: 1.0 for name in modules}, modules, budget_params=1, candidates=CANDIDATES)
+
+    assert set(ranks.values()) == {4}
+    assert "Bütçe en düşük rank'e (4) bile yetmiyor" in capsys.readouterr().out
+
+
+def test_large_budget_caps_at_highest_rank():
+    modules = make_modules()
+    scores = {name: score for name, score in zip(modules, [1.0, 1.0, 1.0, 100.0])}
+    ranks = allocate_ranks(scores, modules, budget_params=10**9, candidates=CANDIDATES)
+
+    assert set(ranks.values()) == {64}
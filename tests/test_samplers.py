@@ -0,0 +1,78 @@
+import random
+import pytest
+from training.trainer import LengthGroupedSampler, TokenBudgetBatchSampler, shard_for_rank
+
+LENGTHS = [random.Random(0).randint(5, 300) for _ in range(97)]
+
+
+def make_samplers(seed=42, **kwargs):
+    return [
+        LengthGroupedSampler(LENGTHS, batch_size=4, mega_batch_mult=5, seed=seed, **kwargs),
+        TokenBudgetBatchSampler(LENGTHS, max_tokens=1024, pad_to_multiple_of=8, seed=seed, **kwargs)
+    ]
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_state_dict_round_trip_reproduces_order(index):
+    sampler = make_samplers(seed=7)[index]
+    sampler.set_epoch(3)
+    expected = list(sampler)
+
+    restored = make_samplers()[index]
+    restored.load_state_dict(sampler.state_dict())
+
+    assert list(restored) == expected
+    assert restored.state_dict() == sampler.state_dict()
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_epochs_differ(index):
+    sampler = make_samplers()[index]
+    first = list(sampler)
+    sampler.set_epoch(1)
+    assert list(sampler) != first
+    assert sorted(map(str, sampler)) == sorted(map(str, first))
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_changed_layout_warns(index, capsys):
+    state = make_samplers()[index].state_dict()
+    state["size"] += 1
+    make_samplers()[index].load_state_dict(state)
+    assert "Sampler düzeni checkpoint'tekinden farklı" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("size", [1, 7, 8, 9])
+@pytest.mark.parametrize("num_replicas", [1, 2, 3])
+def test_shard_for_rank_covers_items_evenly(size, num_replicas):
+    items = list(range(size))
+    shards = [shard_for_rank(items, num_replicas, rank) for rank in range(num_replicas)]
+
+    assert len({len(shard) for shard in shards}) == 1
+    assert sorted(set(sum(shards, []))) == items
+    # Tamamlama baştan tekrarlanarak yapılır (DistributedSampler gibi)
+    assert sum(len(shard) for shard in shards) - size < num_replicas
+
+
+def test_shard_for_rank_interleaves():
+    assert shard_for_rank(list("abcde"), 2, 0) == list("ace")
+    assert shard_for_rank(list("abcde"), 2, 1) == list("bda")
+    assert shard_for_rank([], 2, 1) == []
+
+
+@pytest.mark.parametrize("index", [0, 1])
+def test_rank_shards_cover_dataset(index):
+    shards = [make_samplers(num_replicas=3, rank=rank)[index] for rank in range(3)]
+    seen = [list(shard) for shard in shards]
+
+    assert len({len(items) for items in seen}) == 1
+    assert all(len(items) == len(shard) for items, shard in zip(seen, shards))
+    flat = [idx for items in seen for entry in items for idx in (entry if isinstance(entry, list) else [entry])]
+    assert set(flat) == set(range(len(LENGTHS)))
+
+
+def test_length_grouped_rank_batches_are_full():
+    batch_size = 4
+    for rank in range(3):
+        sampler = LengthGroupedSampler(LENGTHS, batch_size=batch_size, mega_batch_mult=5, num_replicas=3, rank=rank)
+        assert len(sampler) % batch_size == 0
@@ -0,0 +1,40 @@
+import pytest
+import torch
+from datasets import Dataset
+import training.trainer as trainer_module
+from config.training_config import TrainingConfig
+from models.lora_setup import setup_lora
+
+
+@pytest.fixture
+def small_run(monkeypatch, tmp_path):
+    """2 adımlık CPU run'ı için TrainingConfig (sınıf attribute'ları test sonunda geri alınır)"""
+    for name, value in {
+        "max_steps": 2, "eval_steps": 1, "save_steps": 1, "logging_steps": 1,
+        "per_device_batch_size": 2, "gradient_accumulation_steps": 1, "effective_batch_size": 2,
+        "dataloader_num_workers": 0, "dataloader_pin_memory": False, "fast_eval": False,
+    }.items():
+        monkeypatch.setattr(TrainingConfig, name, value)
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+
+    generator = torch.Generator().manual_seed(0)
+    rows = [{"input_ids": ids, "length": len(ids)}
+            for ids in (torch.randint(2, 128, (int(n),), generator=generator).tolist()
+                        for n in torch.randint(4, 24, (12,), generator=generator))]
+    dataset = Dataset.from_list(rows)
+    return dataset, str(tmp_path)
+
+
+@pytest.mark.parametrize("bf16", [True, False])
+def test_setup_trainer_trains_on_cpu(tiny_qwen2, tiny_tokenizer, small_run, monkeypatch, bf16):
+    monkeypatch.setattr(trainer_module, "bf16_supported", lambda: bf16)
+    dataset, output_dir = small_run
+    model = setup_lora(tiny_qwen2())
+
+    trainer = trainer_module.setup_trainer(model, tiny_tokenizer, dataset, dataset, output_dir, "cpu-test", max_length=24)
+
+    assert trainer.args.use_cpu
+    assert trainer.args.bf16 == bf16
+    trainer.train()
+    trainer.close_writers()
+    assert trainer.state.global_step == 2
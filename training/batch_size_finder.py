@@ -0,0 +1,219 @@
+"""Otomatik Micro-Batch Boyutu (effective batch sabit kalır)"""
+
+import os
+import threading
+import time
+import torch
+import torch.distributed as dist
+from models.checkpointing import apply_gradient_checkpointing
+from utils.distributed import data_parallel_accumulation, init_process_group, is_distributed, world_size
+
+
+def _proc_kb(path, key):
+    """/proc dosyasındaki "key: <değer> kB" satırı (yoksa None)"""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_bytes():
+    """Process'in o anki RSS'i"""
+    return (_proc_kb("/proc/self/status", "VmRSS") or 0) * 1024
+
+
+class _PeakRSS:
+    """
+    Probe süresince RSS tepe değeri
+
+    ru_maxrss process ömrü boyunca monoton (model yükleme tepesi probe'ları
+    gizler) - RSS bunun yerine arka plan thread'inde örneklenir.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return False
+
+
+def memory_budget_bytes(device, budget_gb=None):
+    """
+    Probe'ların aşmaması gereken tepe bellek
+
+    None: GPU'da toplam belleğin %90'ı; CPU'da şu anki RSS + kullanılabilir
+    RAM'in %90'ının node'daki process'lere düşen payı.
+    """
+    if budget_gb:
+        return int(budget_gb * 2**30)
+    if device.type == "cuda":
+        return int(torch.cuda.get_device_properties(device).total_memory * 0.9)
+    available = (_proc_kb("/proc/meminfo", "MemAvailable") or 0) * 1024
+    processes = int(os.environ.get("LOCAL_WORLD_SIZE", 1))
+    return int(current_rss_bytes() + available * 0.9 / processes)
+
+
+def candidate_batch_sizes(effective_batch_size, processes=1, max_batch_size=None):
+    """Denenecek micro-batch'ler: 2'nin kuvvetleri, rank başına effective batch'i aşmadan"""
+    limit = max(1, effective_batch_size // processes)
+    if max_batch_size:
+        limit = min(limit, max_batch_size)
+    sizes = []
+    batch_size = 1
+    while batch_size <= limit:
+        sizes.append(batch_size)
+        batch_size *= 2
+    return sizes
+
+
+def probe_batch_size(model, batch_size, max_length, steps=2, autocast_dtype=None):
+    """
+    max_length'lik random batch ile forward + backward (optimizer adımı yok)
+
+    İlk adım ısınmadır, süreye dahil edilmez; bellek tüm adımlarda ölçülür.
+
+    Returns:
+        (token/s, tepe bellek byte)
+    """
+    device = model.device
+    cuda = device.type == "cuda"
+    vocab_size = model.get_input_embeddings().num_embeddings
+    input_ids = torch.randint(0, vocab_size, (batch_size, max_length), device=device)
+    batch = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids), "labels": input_ids}
+
+    def step():
+        with torch.autocast(device.type, dtype=autocast_dtype or torch.bfloat16, enabled=autocast_dtype is not None):
+            loss = model(**batch).loss
+        loss.backward()
+        model.zero_grad(set_to_none=True)
+
+    if cuda:
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats(device)
+    with _PeakRSS() as rss:
+        step()
+        if cuda:
+            torch.cuda.synchronize(device)
+        start = time.perf_counter()
+        for _ in range(steps):
+            step()
+        if cuda:
+            torch.cuda.synchronize(device)
+        seconds = time.perf_counter() - start
+
+    peak = torch.cuda.max_memory_allocated(device) if cuda else rss.peak
+    return batch_size * max_length * steps / seconds, peak
+
+
+def find_micro_batch_size(model, max_length, effective_batch_size, processes=None, max_batch_size=None,
+                          memory_budget_gb=None, plateau=0.05, probe_steps=2, autocast_dtype=None,
+                          gradient_checkpointing_policy=None):
+    """
+    Throughput'u en yüksek micro-batch'i bul, accumulation'ı effective batch'e göre ayarla
+
+    Micro-batch 1'den başlayıp ikiye katlanarak configured max_length'te
+    denenir. Durma koşulları: tepe bellek bütçeyi aşar (veya CUDA OOM), bir
+    sonraki boyutun tahmini belleği bütçeyi aşar (CPU'da OOM exception
+    değil OOM-killer'dır) ya da token/s artışı plateau oranının altında kalır.
+    DDP'de rank'lerin en küçük seçimi kullanılır.
+
+    gradient_checkpointing_policy verilirse her probe'dan önce o boyutun
+    training'deki düzeni kurulur ("budget" micro-batch token sayısına bağlı);
+    son düzeni seçimden sonra çağıran uygular.
+
+    Returns:
+        {"per_device_batch_size", "gradient_accumulation_steps", "effective_batch_size",
+         "max_length", "memory_budget_mb", "probes": [{"batch_size", "tokens_per_second", "peak_memory_mb", "status"}]}
+    """
+    processes = processes or world_size()
+    budget = memory_budget_bytes(model.device, memory_budget_gb)
+    was_training = model.training
+    model.train()
+
+    probes = []
+    best = None
+    previous_peak = None
+    for batch_size in candidate_batch_sizes(effective_batch_size, processes, max_batch_size):
+        if gradient_checkpointing_policy:
+            apply_gradient_checkpointing(model, gradient_checkpointing_policy, tokens_per_batch=batch_size * max_length,
+                                         verbose=False)
+        try:
+            tokens_per_second, peak = probe_batch_size(model, batch_size, max_length, probe_steps, autocast_dtype)
+        except torch.cuda.OutOfMemoryError:
+            model.zero_grad(set_to_none=True)
+            torch.cuda.empty_cache()
+            probes.append({"batch_size": batch_size, "tokens_per_second": None, "peak_memory_mb": None, "status": "oom"})
+            break
+
+        probe = {"batch_size": batch_size, "tokens_per_second": tokens_per_second, "peak_memory_mb": peak / 2**20}
+        probes.append(probe)
+        if peak > budget:
+            probe["status"] = "bütçe aşıldı"
+            break
+        if best is not None and tokens_per_second < best["tokens_per_second"] * (1 + plateau):
+            probe["status"] = "plato"
+            break
+        probe["status"] = "ok"
+        best = probe
+
+        # İki katı batch'in aktivasyonu yaklaşık iki katı artış getirir
+        if previous_peak is not None and peak + 2 * (peak - previous_peak) > budget:
+            probe["status"] = "ok (sonraki boyut bütçeyi aşar)"
+            break
+        previous_peak = peak
+
+    model.train(was_training)
+
+    batch_size = best["batch_size"] if best else 1
+
+    if is_distributed():
+        # Rank'ler farklı host'larda olabilir: hepsine sığan en küçük seçim
+        init_process_group()
+        chosen = torch.tensor([batch_size], device=model.device)
+        dist.all_reduce(chosen, op=dist.ReduceOp.MIN)
+        batch_size = int(chosen.item())
+
+    accumulation, effective = data_parallel_accumulation(effective_batch_size, batch_size, processes)
+    result = {
+        "per_device_batch_size": batch_size,
+        "gradient_accumulation_steps": accumulation,
+        "effective_batch_size": effective,
+        "max_length": max_length,
+        "memory_budget_mb": budget / 2**20,
+        "probes": probes
+    }
+    print_batch_size_search(result)
+    if best is None:
+        print("⚠️ Micro-batch 1 bile bellek bütçesini aşıyor - 1 kullanılıyor")
+    return result
+
+
+def print_batch_size_search(result):
+    print(f"\nMicro-batch araması (max_length={result['max_length']}, "
+          f"bellek bütçesi {result['memory_budget_mb']:.0f} MB):")
+    print(f"  {'batch':>6} {'token/s':>10} {'tepe MB':>10}  durum")
+    for probe in result["probes"]:
+        tokens = f"{probe['tokens_per_second']:.0f}" if probe["tokens_per_second"] is not None else "-"
+        memory = f"{probe['peak_memory_mb']:.0f}" if probe["peak_memory_mb"] is not None else "-"
+        print(f"  {probe['batch_size']:>6} {tokens:>10} {memory:>10}  {probe['status']}")
+    print(f"✓ Micro-batch {result['per_device_batch_size']} x accumulation {result['gradient_accumulation_steps']}"
+          f" -> effective batch {result['effective_batch_size']}")
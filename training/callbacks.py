@@ -1,27 +1,189 @@
 """Training Callbacks for Logging and Early Stopping"""
 
 from transformers import TrainerCallback, TrainerState, TrainerControl
+from transformers.trainer_utils import PREFIX_CHECKPOINT_DIR
+import atexit
 import json
 import os
+import queue
+import resource
+import threading
+import time
+import torch
 from datetime import datetime
+from models.rank_allocation import save_rank_allocation
+
+_FLUSH = object()
+_STOP = object()
+
+
+class BackgroundJSONLWriter:
+    """
+    JSONL satırlarını arka plan thread'inde yaz
+    
+    Training thread'i sadece kuyruğa ekler; serialize + disk yazımı thread'de
+    yapılır. Dosya bir kez açılır, flush_interval saniyede bir flush edilir.
+    """
+    
+    def __init__(self, path, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="jsonl-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def write(self, entry):
+        self.queue.put(entry)
+    
+    def flush(self):
+        """Kuyruktaki her şey diske yazılana kadar bekle"""
+        if self._thread.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+    
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        atexit.unregister(self.close)
+    
+    def _run(self):
+        with open(self.path, "a", buffering=1 << 16) as f:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    entry = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    f.flush()
+                    last_flush = time.monotonic()
+                    continue
+                
+                # task_done yazımdan sonra - flush() / join() diske inene kadar bekler
+                try:
+                    if entry is _STOP:
+                        break
+                    if entry is not _FLUSH:
+                        f.write(json.dumps(entry) + "\n")
+                    if entry is _FLUSH or time.monotonic() - last_flush > self.flush_interval:
+                        f.flush()
+                        last_flush = time.monotonic()
+                finally:
+                    self.queue.task_done()
+
+
+class TelemetryCallback(TrainerCallback):
+    """
+    Throughput telemetrisi: token/s, padding, adım aşamalarının süreleri, tepe bellek
+    
+    Her optimizer adımı üç aşamaya ayrılır: dataloader bekleme (batch'lerin
+    hazırlanması, CausalLMTrainer.get_batch_samples), compute (forward +
+    backward + grad clipping) ve optimizer step. Değerler log aralığı boyunca
+    toplanır, LoggingCallback her train log'unda collect() ile alır.
+    """
+    
+    def __init__(self):
+        self.cuda = torch.cuda.is_available()
+        self._reset()
+        self._step_start = None
+        self._optimizer_start = None
+    
+    def _reset(self):
+        self.steps = 0
+        self.real_tokens = 0
+        self.total_tokens = 0
+        self.wait_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.optimizer_seconds = 0.0
+    
+    def _now(self):
+        # GPU kernel'leri asenkron - aşama sınırında senkronize edilmezse süreler kayar
+        if self.cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+    
+    def record_batches(self, batch_samples, wait_seconds):
+        """Bir optimizer adımının micro-batch'leri (gerçek / pad dahil token sayısı)"""
+        self.wait_seconds += wait_seconds
+        for inputs in batch_samples:
+            self.total_tokens += inputs["input_ids"].numel()
+            if "attention_mask" in inputs:
+                self.real_tokens += int(inputs["attention_mask"].sum())
+            else:
+                # Packed batch: padding ve doküman başları label'da -100
+                self.real_tokens += int((inputs["labels"] != -100).sum())
+    
+    def on_step_begin(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        self._step_start = self._now()
+    
+    def on_pre_optimizer_step(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        self._optimizer_start = self._now()
+        if self._step_start is not None:
+            self.compute_seconds += self._optimizer_start - self._step_start
+    
+    def on_optimizer_step(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        if self._optimizer_start is not None:
+            self.optimizer_seconds += self._now() - self._optimizer_start
+    
+    def on_step_end(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        self.steps += 1
+    
+    def collect(self):
+        """Son collect'ten beri aralık telemetrisi (log satırına eklenecek alanlar)"""
+        if not self.steps:
+            return {}
+        
+        step_seconds = self.wait_seconds + self.compute_seconds + self.optimizer_seconds
+        telemetry = {
+            "tokens_per_second": self.real_tokens / step_seconds if step_seconds else None,
+            "padding_fraction": 1 - self.real_tokens / self.total_tokens if self.total_tokens else None,
+            "dataloader_wait_seconds": self.wait_seconds / self.steps,
+            "compute_seconds": self.compute_seconds / self.steps,
+            "optimizer_seconds": self.optimizer_seconds / self.steps,
+            # Linux'ta ru_maxrss KB
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        }
+        if self.cuda:
+            telemetry["peak_accelerator_mb"] = torch.cuda.max_memory_allocated() / 2**20
+            torch.cuda.reset_peak_memory_stats()
+        
+        self._reset()
+        return telemetry
+
 
 class LoggingCallback(TrainerCallback):
     """Training ve validation loss'ları kaydet"""
     
-    def __init__(self, log_dir="./logs"):
+    def __init__(self, log_dir="./logs", telemetry=None, run_info=None):
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
         
         # Log dosyası
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_file = os.path.join(log_dir, f"training_log_{timestamp}.jsonl")
+        self.writer = None  # İlk log'da açılır
+        self.telemetry = telemetry
+        self.run_info = run_info  # Batch düzeni vb. (log'un ilk satırı ve özet)
         
         self.train_losses = []
         self.eval_losses = []
     
+    def on_train_begin(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        """Run ayarlarını log'un başına yaz"""
+        if not self.run_info or not state.is_world_process_zero:
+            return
+        if self.writer is None:
+            self.writer = BackgroundJSONLWriter(self.log_file)
+        self.writer.write({
+            "step": state.global_step,
+            "timestamp": datetime.now().isoformat(),
+            "run_info": self.run_info
+        })
+    
     def on_log(self, args, state: TrainerState, control: TrainerControl, logs=None, **kwargs):
         """Her log adımında çağrılır"""
-        if logs is None:
+        # DDP: loss'lar rank'ler arasında zaten ortalanmış - sadece rank 0 yazar
+        if logs is None or not state.is_world_process_zero:
             return
         
         log_entry = {
@@ -46,31 +208,59 @@ class LoggingCallback(TrainerCallback):
                 "loss": logs["eval_loss"]
             })
         
+        # Epoch sonu tam eval ve subset uyumu (hızlı eval modu)
+        for key in ("eval_full_loss", "eval_subset_gap", "eval_decision_agreement"):
+            if key in logs:
+                log_entry[key] = logs[key]
+        
         # Learning rate
         if "learning_rate" in logs:
             log_entry["learning_rate"] = logs["learning_rate"]
         
-        # Dosyaya yaz
-        with open(self.log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        # Throughput telemetrisi (train log aralığı)
+        if self.telemetry is not None and "loss" in logs:
+            log_entry.update(self.telemetry.collect())
         
-        # Console'a da yazdır
-        print(f"Step {state.global_step}: {log_entry}")
+        # Dosyaya yaz (arka plan thread'i)
+        if self.writer is None:
+            self.writer = BackgroundJSONLWriter(self.log_file)
+        self.writer.write(log_entry)
+        
+        # Console'a kısa özet (step/epoch/timestamp dışında metrik yoksa boş satır basılmaz)
+        metrics = [
+            f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in log_entry.items()
+            if key not in ("step", "epoch", "timestamp")
+        ]
+        if metrics:
+            print(f"Step {state.global_step}: " + ", ".join(metrics))
     
     def on_train_end(self, args, state: TrainerState, control: TrainerControl, **kwargs):
         """Training bittiğinde özet kaydet"""
+        if not state.is_world_process_zero:
+            return
+        self.close()
+        
         summary = {
             "total_steps": state.global_step,
             "total_epochs": state.epoch,
             "train_losses": self.train_losses,
             "eval_losses": self.eval_losses
         }
+        if self.run_info:
+            summary["run_info"] = self.run_info
         
         summary_file = os.path.join(self.log_dir, "training_summary.json")
         with open(summary_file, "w") as f:
             json.dump(summary, f, indent=2)
         
         print(f"\nTraining tamamlandı! Log dosyası: {self.log_file}")
+    
+    def close(self):
+        """Log yazıcı thread'ini kapat (training hata ile bittiyse on_train_end çağrılmaz)"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
 
 
 class EarlyStoppingCallback(TrainerCallback):
@@ -90,18 +280,66 @@ class EarlyStoppingCallback(TrainerCallback):
         if eval_loss is None:
             return
         
+        # Karar tüm rank'lerde aynı (eval loss ortalanmış), sadece rank 0 yazdırır
+        verbose = state.is_world_process_zero
+        
         # İyileşme var mı?
         if eval_loss < self.best_eval_loss:
             self.best_eval_loss = eval_loss
             self.patience_counter = 0
-            print(f"✓ Yeni en iyi eval loss: {eval_loss:.4f}")
+            if verbose:
+                print(f"✓ Yeni en iyi eval loss: {eval_loss:.4f}")
         else:
             self.patience_counter += 1
-            print(f"✗ Eval loss iyileşmedi ({self.patience_counter}/{self.patience})")
+            if verbose:
+                print(f"✗ Eval loss iyileşmedi ({self.patience_counter}/{self.patience})")
             
             # Patience doldu mu?
             if self.patience_counter >= self.patience:
-                print(f"\nEarly stopping! {self.patience} evaluation boyunca iyileşme yok.")
+                if verbose:
+                    print(f"\nEarly stopping! {self.patience} evaluation boyunca iyileşme yok.")
                 control.should_training_stop = True
         
         return control
+
+
+class EpochEndEvalCallback(TrainerCallback):
+    """
+    Hızlı eval modunda her epoch sonunda eval tetikle (tam eval orada yapılır)
+
+    eval_steps epoch'un son adımına denk geldiyse eval zaten yapılmıştır -
+    tekrar tetiklenmez (early stopping aynı eval'i iki kez saymasın). Epoch
+    sonu eval'i checkpoint ile birlikte yapılır: en iyi metrik olursa
+    load_best_model_at_end'in yükleyeceği checkpoint o adımda bulunur. Adım
+    save_steps ile zaten kaydedildiyse checkpoint ikinci kez yazılmaz.
+    """
+    
+    def __init__(self):
+        self.last_eval_step = None
+        self.last_save_step = None
+    
+    def on_evaluate(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        self.last_eval_step = state.global_step
+    
+    def on_save(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        self.last_save_step = state.global_step
+    
+    def on_epoch_end(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        if self.last_eval_step != state.global_step:
+            control.should_evaluate = True
+            if self.last_save_step != state.global_step:
+                control.should_save = True
+        return control
+
+
+class RankAllocationCallback(TrainerCallback):
+    """Modül bazlı rank dağıtımını her checkpoint'e kaydet (tekrar üretilebilirlik)"""
+    
+    def __init__(self, rank_allocation):
+        self.rank_allocation = rank_allocation
+    
+    def on_save(self, args, state: TrainerState, control: TrainerControl, **kwargs):
+        """Checkpoint kaydedildikten sonra çağrılır"""
+        checkpoint_dir = os.path.join(args.output_dir, f"{PREFIX_CHECKPOINT_DIR}-{state.global_step}")
+        if os.path.isdir(checkpoint_dir):
+            save_rank_allocation(self.rank_allocation, checkpoint_dir)
@@ -0,0 +1,196 @@
+"""Asenkron Checkpoint Yazıcı (sadece LoRA ağırlıkları + optimizer state)"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import numpy as np
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+OPTIMIZER_SAFE_NAME = "optimizer.safetensors"
+
+_STOP = object()
+
+
+def snapshot_tensors(tensors, dtype=None):
+    """
+    Tensor'ların host (CPU) kopyası
+
+    Kopya alındıktan sonra training ağırlıkları / optimizer state'i
+    değiştirebilir; yazıcı thread'i sadece bu kopyaları okur. CUDA'da
+    pinned buffer'a asenkron kopyalanır ve tek senkronizasyonla beklenir.
+
+    Args:
+        tensors: {isim: tensor}
+        dtype: Floating point tensor'ların saklanacağı dtype (None = olduğu gibi; skalerler hep olduğu gibi)
+    """
+    host = {}
+    synchronize = False
+    for name, tensor in tensors.items():
+        tensor = tensor.detach()
+        if dtype is not None and tensor.is_floating_point() and tensor.dim() > 0:
+            tensor = tensor.to(dtype)
+        copy = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=tensor.is_cuda)
+        copy.copy_(tensor, non_blocking=tensor.is_cuda)
+        synchronize = synchronize or tensor.is_cuda
+        host[name] = copy
+
+    if synchronize:
+        torch.cuda.synchronize()
+    return host
+
+
+def optimizer_tensors(state_dict, dtype=None):
+    """
+    Optimizer state_dict'ini safetensors'a uygun düz tensor dict'ine çevir
+
+    Tensor state'ler "state.<param index>.<anahtar>" adıyla, param_groups ve
+    tensor olmayan değerler JSON metadata olarak saklanır.
+
+    Returns:
+        (host tensor dict, safetensors metadata)
+    """
+    tensors = {}
+    scalars = {}
+    for index, state in state_dict["state"].items():
+        for key, value in state.items():
+            name = f"state.{index}.{key}"
+            if torch.is_tensor(value):
+                tensors[name] = value
+            else:
+                scalars[name] = value
+
+    metadata = {
+        "param_groups": state_dict["param_groups"],
+        "scalars": scalars,
+        "dtype": str(dtype).replace("torch.", "") if dtype is not None else None
+    }
+    return snapshot_tensors(tensors, dtype), {"optimizer": json.dumps(metadata)}
+
+
+def load_optimizer_state(path):
+    """
+    optimizer.safetensors'tan optimizer state_dict'i
+
+    Compact dtype'ta saklanan state'ler optimizer.load_state_dict sırasında
+    parametrenin dtype'ına (fp32) geri çevrilir.
+    """
+    with safe_open(path, framework="pt") as f:
+        metadata = json.loads(f.metadata()["optimizer"])
+        tensors = {name: f.get_tensor(name) for name in f.keys()}
+
+    state = {}
+    for name, value in list(tensors.items()) + list(metadata["scalars"].items()):
+        _, index, key = name.split(".", 2)
+        state.setdefault(int(index), {})[key] = value
+
+    return {"state": state, "param_groups": metadata["param_groups"]}
+
+
+def rng_state():
+    """Trainer'ın rng_state.pth formatı (resume'da Trainer._load_rng_state okur)"""
+    states = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "cpu": torch.random.get_rng_state()
+    }
+    if torch.cuda.is_available():
+        states["cuda"] = torch.cuda.random.get_rng_state()
+    return states
+
+
+def directory_size(path):
+    """Dizindeki dosyaların toplam boyutu (byte)"""
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class AsyncCheckpointWriter:
+    """
+    Checkpoint'leri arka plan thread'inde diske yaz
+
+    Training thread'i sadece host kopyalarını kuyruğa ekler. Kuyrukta en
+    fazla max_pending checkpoint bekler; disk training'den yavaşsa bir
+    sonraki submit önceki yazım bitene kadar bloklar (host belleği sınırlı
+    kalır). trainer_state.json en son yazılır - dosya yoksa checkpoint
+    yarım kalmıştır.
+    """
+
+    def __init__(self, max_pending=1, verbose=True):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.verbose = verbose  # DDP'de sadece rank 0 raporlar
+        self.history = []  # Checkpoint başına {"checkpoint", "bytes", "write_seconds"}
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, output_dir, safetensors=None, objects=None, texts=None, on_done=None):
+        """
+        Args:
+            output_dir: Checkpoint dizini
+            safetensors: {dosya adı: (host tensor dict, metadata)}
+            objects: {dosya adı: torch.save ile yazılacak obje}
+            texts: {dosya adı: metin} (bu sırayla, en son yazılır)
+            on_done: Yazım bitince thread'de çağrılır (örn. eski checkpoint'leri silme)
+        """
+        self._raise_error()
+        self.queue.put((output_dir, safetensors or {}, objects or {}, texts or {}, on_done))
+
+    def flush(self):
+        """Kuyruktaki checkpoint'ler diske inene kadar bekle"""
+        self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Arka plan checkpoint yazımı başarısız") from error
+
+    def _write(self, output_dir, safetensors, objects, texts, on_done):
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Önce geçici ada yaz, sonra rename - yarım dosya görünmez
+        for name, (tensors, metadata) in safetensors.items():
+            path = os.path.join(output_dir, name)
+            save_file(tensors, path + ".tmp", metadata=metadata)
+            os.replace(path + ".tmp", path)
+        for name, obj in objects.items():
+            path = os.path.join(output_dir, name)
+            torch.save(obj, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        for name, text in texts.items():
+            path = os.path.join(output_dir, name)
+            with open(path + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+
+        seconds = time.perf_counter() - start
+        size = directory_size(output_dir)
+        self.history.append({"checkpoint": output_dir, "bytes": size, "write_seconds": seconds})
+        if self.verbose:
+            print(f"✓ {os.path.basename(output_dir)} arka planda yazıldı: {size / 2**20:.1f} MB, {seconds:.2f}s")
+
+        if on_done is not None:
+            on_done()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is _STOP:
+                    break
+                self._write(*job)
+            except Exception as error:  # Training thread'inde bir sonraki submit / flush'ta yükseltilir
+                self.error = error
+            finally:
+                self.queue.task_done()
@@ -1,22 +1,844 @@
 """Training Loop Setup"""
 
+import copy
+import dataclasses
+import json
+import math
+import time
+import torch
+from peft import PeftModel, get_peft_model_state_dict
+from torch.utils.data import DataLoader, DistributedSampler, IterableDataset, Sampler
+from accelerate.data_loader import prepare_data_loader
 from transformers import Trainer, TrainingArguments
+from transformers.trainer import SCHEDULER_NAME, TRAINER_STATE_NAME
+from transformers.trainer_callback import ExportableState
+from transformers.trainer_utils import PREFIX_CHECKPOINT_DIR
 from config.training_config import TrainingConfig
-from training.callbacks import LoggingCallback, EarlyStoppingCallback
-from data.data_collator import DataCollatorForCausalLM
+from training.callbacks import (LoggingCallback, EarlyStoppingCallback, RankAllocationCallback, TelemetryCallback,
+                                EpochEndEvalCallback)
+from training.checkpoint_writer import (AsyncCheckpointWriter, OPTIMIZER_SAFE_NAME, directory_size, load_optimizer_state,
+                                        optimizer_tensors, rng_state, snapshot_tensors)
+from data.data_collator import DataCollatorForCausalLM, padded_length, padding_ratio
+from models.checkpointing import apply_gradient_checkpointing
+from models.compilation import training_compile_kwargs
+from utils.distributed import bf16_supported, data_parallel_accumulation, ddp_backend, rank, world_size
+from training.batch_size_finder import find_micro_batch_size
 import os
 
+SAMPLER_STATE_FILE = "sampler_state.json"
+
+
+class LengthGroupedSampler(Sampler):
+    """
+    Benzer uzunluktaki örnekleri yan yana getiren sampler
+
+    Index'ler her epoch'ta karıştırılır, sonra megabatch'ler
+    (batch_size * mega_batch_mult örnek) kendi içinde uzunluğa göre sıralanır.
+    Batch'ler rastgele kalır ama dinamik padding'de pad oranı düşer.
+    num_replicas > 1 (DDP) iken tüm rank'ler aynı sırayı üretir ve her biri
+    batch'lerin kendi payını alır (DistributedSampler gibi).
+    """
+
+    def __init__(self, lengths, batch_size, mega_batch_mult=50, seed=42, num_replicas=1, rank=0):
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.mega_batch_mult = mega_batch_mult
+        self.seed = seed
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Her epoch farklı permütasyon"""
+        self.epoch = epoch
+
+    def _indices(self):
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        indices = torch.randperm(len(self.lengths), generator=generator).tolist()
+
+        # Megabatch'lere böl ve her birini uzundan kısaya sırala
+        megabatch_size = self.batch_size * self.mega_batch_mult
+        megabatches = [
+            sorted(indices[i:i + megabatch_size], key=lambda idx: self.lengths[idx], reverse=True)
+            for i in range(0, len(indices), megabatch_size)
+        ]
+
+        # En uzun örneği ilk batch'e al - OOM varsa hemen görülsün
+        if megabatches:
+            longest = max(range(len(megabatches)), key=lambda i: self.lengths[megabatches[i][0]])
+            megabatches[0][0], megabatches[longest][0] = megabatches[longest][0], megabatches[0][0]
+
+        indices = [idx for megabatch in megabatches for idx in megabatch]
+        if self.num_replicas == 1 or not indices:
+            return indices
+
+        # Rank payı batch bazında: batch'ler uzunluğa göre gruplu kalır. Index'ler önce
+        # tam batch'lere tamamlanır - her rank'in her micro-batch'i batch_size örnek
+        total = len(self) * self.num_replicas
+        indices = indices + (indices * math.ceil(total / len(indices)))[:total - len(indices)]
+        batches = [indices[i:i + self.batch_size] for i in range(0, total, self.batch_size)]
+        return [idx for batch in shard_for_rank(batches, self.num_replicas, self.rank) for idx in batch]
+
+    def __iter__(self):
+        return iter(self._indices())
+
+    def __len__(self):
+        if self.num_replicas == 1:
+            return len(self.lengths)
+        return math.ceil(len(self.lengths) / (self.batch_size * self.num_replicas)) * self.batch_size
+
+    def state_dict(self):
+        """Permütasyonu yeniden üretmek için gereken her şey (seed + epoch)"""
+        return {"type": type(self).__name__, "seed": self.seed, "epoch": self.epoch, "size": len(self),
+                "num_replicas": self.num_replicas}
+
+    def load_state_dict(self, state):
+        check_sampler_state(self, state)
+        self.seed = state["seed"]
+        self.epoch = state["epoch"]
+
+
+class TokenBudgetBatchSampler(Sampler):
+    """
+    Sabit token bütçeli batch sampler
+
+    Örnekler uzunluğa göre sıralanıp, pad dahil token sayısı
+    (batch_size * batch'in pad edilmiş uzunluğu) max_tokens'ı aşmayacak
+    şekilde batch'lere doldurulur. Batch'ler bir kez kurulur, her epoch'ta
+    sadece sıraları karıştırılır - böylece len() sabit kalır. shuffle=False
+    (eval) batch'leri kısadan uzuna sırayla verir. num_replicas > 1 (DDP)
+    iken her rank karıştırılmış batch listesinin kendi payını alır.
+    """
+
+    def __init__(self, lengths, max_tokens, pad_to_multiple_of=None, seed=42, shuffle=True, num_replicas=1, rank=0):
+        self.lengths = list(lengths)
+        self.max_tokens = max_tokens
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.seed = seed
+        self.shuffle = shuffle
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.epoch = 0
+        self.batches = self._build_batches()
+
+    def _build_batches(self):
+        order = sorted(range(len(self.lengths)), key=lambda idx: self.lengths[idx])
+
+        batches = []
+        batch = []
+        for idx in order:
+            # Sıralı olduğu için yeni örnek batch'in en uzunu
+            width = padded_length(self.lengths[idx], self.pad_to_multiple_of)
+            if batch and width * (len(batch) + 1) > self.max_tokens:
+                batches.append(batch)
+                batch = []
+            batch.append(idx)
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def set_epoch(self, epoch):
+        """Her epoch farklı batch sırası"""
+        self.epoch = epoch
+
+    def __iter__(self):
+        if not self.shuffle:
+            batches = self.batches
+        else:
+            generator = torch.Generator()
+            generator.manual_seed(self.seed + self.epoch)
+            batches = [self.batches[b] for b in torch.randperm(len(self.batches), generator=generator).tolist()]
+        yield from shard_for_rank(batches, self.num_replicas, self.rank)
+
+    def __len__(self):
+        return math.ceil(len(self.batches) / self.num_replicas)
+
+    def state_dict(self):
+        """Batch sırasını yeniden üretmek için gereken her şey (seed + epoch)"""
+        return {"type": type(self).__name__, "seed": self.seed, "epoch": self.epoch, "size": len(self),
+                "num_replicas": self.num_replicas}
+
+    def load_state_dict(self, state):
+        check_sampler_state(self, state)
+        self.seed = state["seed"]
+        self.epoch = state["epoch"]
+
+
+class DistributedRandomSampler(DistributedSampler):
+    """Uzunluk gruplaması olmadan DDP: DistributedSampler + resume için sampler state'i"""
+
+    def state_dict(self):
+        return {"type": type(self).__name__, "seed": self.seed, "epoch": self.epoch, "size": len(self),
+                "num_replicas": self.num_replicas}
+
+    def load_state_dict(self, state):
+        check_sampler_state(self, state)
+        self.seed = state["seed"]
+        self.epoch = state["epoch"]
+
+
+def shard_for_rank(items, num_replicas, rank):
+    """
+    DistributedSampler ile aynı paylaştırma: liste baştan tekrarlanarak
+    num_replicas'ın katına tamamlanır, rank her num_replicas'ıncı elemanı alır
+
+    Tüm rank'ler aynı sayıda batch görür (DDP all-reduce'ları eşleşir).
+    """
+    if num_replicas == 1 or not items:
+        return items
+    total = math.ceil(len(items) / num_replicas) * num_replicas
+    padded = items + (items * math.ceil(total / len(items)))[:total - len(items)]
+    return padded[rank:total:num_replicas]
+
+
+def check_sampler_state(sampler, state):
+    """Checkpoint'teki sampler düzeni şimdikiyle aynı mı? (farklıysa atlanan batch'ler görülen örnekler değildir)"""
+    current = (type(sampler).__name__, len(sampler))
+    saved = (state.get("type"), state.get("size"))
+    if current != saved:
+        print(f"⚠️ Sampler düzeni checkpoint'tekinden farklı ({saved[0]}/{saved[1]} -> {current[0]}/{current[1]}): "
+              f"veri sırası birebir devam etmeyecek (dataset / batching ayarları değişmiş olabilir)")
+
+
+class CausalLMTrainer(Trainer):
+    """Özel train sampler / batch sampler, telemetri ve asenkron checkpoint destekleyen Trainer"""
+
+    def __init__(self, *args, train_sampler=None, train_batch_sampler=None, telemetry=None,
+                 eval_max_tokens=None, full_eval_dataset=None, checkpoint_writer=None,
+                 checkpoint_optimizer_dtype=None, **kwargs):
+        self.train_sampler = train_sampler
+        self.train_batch_sampler = train_batch_sampler
+        self.telemetry = telemetry
+        # Hızlı eval: token bütçeli, uzunluğa göre sıralı eval batch'leri + epoch sonunda tam eval
+        self.eval_max_tokens = eval_max_tokens
+        self.full_eval_dataset = full_eval_dataset
+        self.eval_agreement = []  # Epoch sonu (subset loss, tam loss) çiftleri
+        self._full_eval_epoch = None  # Tam eval'in son yapıldığı epoch
+        # Asenkron checkpoint: sadece LoRA ağırlıkları + optimizer state, yazım arka planda
+        self.checkpoint_writer = checkpoint_writer
+        self.checkpoint_optimizer_dtype = checkpoint_optimizer_dtype
+        self.checkpoint_stalls = []  # Checkpoint başına training'in beklediği süre (s)
+        self.checkpoint_bytes = []  # Senkron checkpoint boyutları (async'te writer.history)
+        # Veri pozisyonu: epoch içinde tüketilen micro-batch / örnek sayısı (sampler_state.json'a yazılır)
+        self.data_position = {"epoch": 0, "batches": 0, "examples": 0}
+        self._position_iterator = None
+        super().__init__(*args, **kwargs)
+
+    def train(self, resume_from_checkpoint=None, *args, **kwargs):
+        if resume_from_checkpoint is True:
+            resume_from_checkpoint = find_resume_checkpoint(self.args.output_dir)
+        if resume_from_checkpoint:
+            self._restore_data_position(resume_from_checkpoint)
+        try:
+            return super().train(resume_from_checkpoint, *args, **kwargs)
+        finally:
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.flush()
+            self.print_checkpoint_summary()
+
+    def _save_checkpoint(self, model, trial):
+        start = time.perf_counter()
+        if self.checkpoint_writer is not None and isinstance(self.model, PeftModel):
+            self._save_adapter_checkpoint(trial)
+        else:
+            super()._save_checkpoint(model, trial)
+            checkpoint_dir = os.path.join(self._get_output_dir(trial=trial), f"{PREFIX_CHECKPOINT_DIR}-{self.state.global_step}")
+            if os.path.isdir(checkpoint_dir) and self.args.should_save:
+                with open(os.path.join(checkpoint_dir, SAMPLER_STATE_FILE), "w") as f:
+                    json.dump(self.sampler_state(), f, indent=2)
+                self.checkpoint_bytes.append(directory_size(checkpoint_dir))
+        self.checkpoint_stalls.append(time.perf_counter() - start)
+
+    def _save_adapter_checkpoint(self, trial):
+        """
+        LoRA ağırlıkları + optimizer state'inin host kopyasını al, yazımı thread'e bırak
+
+        Training sadece kopya süresince bekler. Dosya formatı Trainer'ınkiyle
+        aynı (adapter_model.safetensors, scheduler.pt, rng_state.pth,
+        trainer_state.json); sadece optimizer optimizer.safetensors olarak
+        (opsiyonel compact dtype ile) saklanır; sampler_state.json veri
+        pozisyonunu tutar.
+        """
+        run_dir = self._get_output_dir(trial=trial)
+        output_dir = os.path.join(run_dir, f"{PREFIX_CHECKPOINT_DIR}-{self.state.global_step}")
+        # Dizin hemen açılır: on_save callback'leri (rank_allocation.json) ve en iyi checkpoint kontrolü görsün
+        os.makedirs(output_dir, exist_ok=True)
+        self.store_flos()
+
+        if self.state.best_global_step:
+            best_checkpoint_dir = os.path.join(run_dir, f"{PREFIX_CHECKPOINT_DIR}-{self.state.best_global_step}")
+            if os.path.exists(best_checkpoint_dir):
+                self.state.best_model_checkpoint = best_checkpoint_dir
+
+        # DDP: adapter / optimizer tüm rank'lerde aynı - rank 0 yazar, diğerleri sadece kendi RNG state'ini
+        rng_file = f"rng_state_{self.args.process_index}.pth" if self.args.world_size > 1 else "rng_state.pth"
+        if not self.args.should_save:
+            self.checkpoint_writer.submit(output_dir, objects={rng_file: rng_state()})
+            return
+
+        adapter_name = self.model.active_adapter
+        adapter = snapshot_tensors(get_peft_model_state_dict(self.model, adapter_name=adapter_name))
+        self.model.peft_config[adapter_name].save_pretrained(output_dir)
+        optimizer, optimizer_metadata = optimizer_tensors(self.optimizer.state_dict(), self.checkpoint_optimizer_dtype)
+
+        for cb in [cb for cb in self.callback_handler.callbacks + [self.control] if isinstance(cb, ExportableState)]:
+            self.state.stateful_callbacks[cb.__class__.__name__] = cb.state()
+        trainer_state = json.dumps(dataclasses.asdict(self.state), indent=2, sort_keys=True) + "\n"
+
+        # Eski checkpoint'ler yazım bittikten sonra silinir (yazılmakta olan dizine dokunulmaz)
+        on_done = lambda: self._rotate_checkpoints(use_mtime=False, output_dir=run_dir)  # noqa: E731
+
+        self.checkpoint_writer.submit(
+            output_dir,
+            safetensors={
+                "adapter_model.safetensors": (adapter, {"format": "pt"}),
+                OPTIMIZER_SAFE_NAME: (optimizer, optimizer_metadata)
+            },
+            objects={
+                SCHEDULER_NAME: copy.deepcopy(self.lr_scheduler.state_dict()),
+                rng_file: rng_state()
+            },
+            texts={SAMPLER_STATE_FILE: json.dumps(self.sampler_state(), indent=2), TRAINER_STATE_NAME: trainer_state},
+            on_done=on_done
+        )
+
+    def _load_optimizer_and_scheduler(self, checkpoint):
+        # Trainer sadece optimizer.pt'yi tanır - async checkpoint'in optimizer.safetensors'ı burada yüklenir
+        if checkpoint is None or not os.path.isfile(os.path.join(checkpoint, OPTIMIZER_SAFE_NAME)):
+            return super()._load_optimizer_and_scheduler(checkpoint)
+
+        self.optimizer.load_state_dict(load_optimizer_state(os.path.join(checkpoint, OPTIMIZER_SAFE_NAME)))
+        self.lr_scheduler.load_state_dict(torch.load(os.path.join(checkpoint, SCHEDULER_NAME), weights_only=True))
+
+    def _load_best_model(self):
+        # En iyi checkpoint hâlâ yazılıyor olabilir (DDP'de rank 0'ın yazıcısında - diğer rank'ler onu bekler)
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.flush()
+            self.accelerator.wait_for_everyone()
+        return super()._load_best_model()
+
+    def close_writers(self):
+        """
+        Arka plan yazıcı thread'lerini kapat (checkpoint + JSONL log)
+        
+        Aynı process'te art arda run'larda (train_matrix) her run'ın
+        thread'leri bir sonrakine sızmasın diye training bitince çağrılır.
+        """
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()
+        for callback in self.callback_handler.callbacks:
+            if isinstance(callback, LoggingCallback):
+                callback.close()
+
+    def print_checkpoint_summary(self):
+        """Checkpoint başına training beklemesi ve disk kullanımı"""
+        if not self.checkpoint_stalls or not self.is_world_process_zero():
+            return
+        sizes = [h["bytes"] for h in self.checkpoint_writer.history] if self.checkpoint_writer else self.checkpoint_bytes
+        mode = "async (LoRA + optimizer)" if self.checkpoint_writer else "senkron"
+        line = (f"Checkpoint ({mode}): {len(self.checkpoint_stalls)} adet, training beklemesi ortalama "
+                f"{sum(self.checkpoint_stalls) / len(self.checkpoint_stalls):.2f}s / maks {max(self.checkpoint_stalls):.2f}s")
+        if sizes:
+            line += f", ortalama {sum(sizes) / len(sizes) / 2**20:.1f} MB/checkpoint"
+        print(line)
+
+    def get_batch_samples(self, epoch_iterator, num_batches, device):
+        # Bir optimizer adımının micro-batch'leri burada çekilir: dataloader bekleme süresi
+        start = time.perf_counter()
+        batch_samples, num_items_in_batch = super().get_batch_samples(epoch_iterator, num_batches, device)
+        if self.telemetry is not None:
+            self.telemetry.record_batches(batch_samples, time.perf_counter() - start)
+
+        # Trainer her epoch'ta yeni iterator açar - pozisyon sıfırlanır (resume'daki ilk iterator hariç)
+        if epoch_iterator is not self._position_iterator:
+            if self._position_iterator is not None:
+                self.data_position = dict(self.data_position, epoch=self.data_position["epoch"] + 1, batches=0, examples=0)
+            self._position_iterator = epoch_iterator
+        self.data_position["batches"] += len(batch_samples)
+        self.data_position["examples"] += sum(inputs["input_ids"].shape[0] for inputs in batch_samples)
+        if batch_samples:
+            # Packed pencerelerde örnek sayısı ham doküman sayısı değildir
+            self.data_position["packing"] = "position_ids" in batch_samples[0]
+
+        return batch_samples, num_items_in_batch
+
+    def sampler_state(self):
+        """Checkpoint'e yazılan veri pozisyonu: sampler seed'i / epoch'u + epoch içi cursor"""
+        sampler = self.train_batch_sampler or self.train_sampler
+        state = sampler.state_dict() if sampler is not None else {"type": None, "seed": self.args.seed, "size": None}
+        state.update({
+            "epoch": self.data_position["epoch"],
+            "cursor": self.data_position["batches"],
+            "examples": self.data_position["examples"],
+            "global_step": self.state.global_step,
+            "streaming": isinstance(self.train_dataset, IterableDataset) or not hasattr(self.train_dataset, "__len__"),
+            "packing": self.data_position.get("packing", False)
+        })
+        return state
+
+    def _restore_data_position(self, checkpoint):
+        """
+        Resume: sampler seed'ini / epoch'unu ve cursor'ı checkpoint'ten yükle
+
+        Map-style dataset'te Trainer atlanan batch'leri sadece sampler
+        index'leri üzerinden geçer (örnekler okunmaz, collate edilmez);
+        burada sıranın aynı permütasyondan devam ettiği doğrulanır.
+        Streaming'de akış load_and_prepare(skip_examples=...) ile
+        tokenization'dan önce konumlanır.
+        """
+        state = load_sampler_state(checkpoint)
+        if state is None:
+            print(f"⚠️ {checkpoint} içinde {SAMPLER_STATE_FILE} yok - Trainer'ın varsayılan veri atlaması kullanılacak")
+            return
+
+        sampler = self.train_batch_sampler or self.train_sampler
+        if sampler is not None:
+            sampler.load_state_dict(state)
+            if state["cursor"] >= len(sampler):
+                state = dict(state, epoch=state["epoch"] + 1, cursor=0, examples=0)
+
+        self.data_position = {"epoch": state["epoch"], "batches": state["cursor"], "examples": state["examples"],
+                              "packing": state.get("packing", False)}
+        if self.args.ignore_data_skip:
+            skipped = "ham akışta atlandı (tokenize edilmeden)"
+        elif state.get("streaming"):
+            skipped = "akış baştan okunarak atlanıyor"
+        else:
+            skipped = "sampler index'i üzerinden atlanıyor (örnekler okunmadan)"
+        print(f"✓ Resume: {checkpoint} - epoch {state['epoch']}, {state['cursor']} micro-batch / "
+              f"{state['examples']} örnek {skipped}")
+
+    def _get_train_sampler(self, *args, **kwargs):
+        if self.train_sampler is not None:
+            return self.train_sampler
+        return super()._get_train_sampler(*args, **kwargs)
+
+    def get_train_dataloader(self):
+        sampler = self.train_batch_sampler or self.train_sampler
+        rank_sharded = getattr(sampler, "num_replicas", 1) > 1
+        if self.train_batch_sampler is None and not rank_sharded:
+            return super().get_train_dataloader()
+
+        # Değişken boyutlu batch'ler veya rank payını zaten seçen sampler - DataLoader burada kurulur
+        train_dataset = self._remove_unused_columns(self.train_dataset, description="training")
+        num_workers = self.args.dataloader_num_workers
+        if self.train_batch_sampler is not None:
+            batching = {"batch_sampler": self.train_batch_sampler}
+        else:
+            batching = {"sampler": self.train_sampler, "batch_size": self._train_batch_size,
+                        "drop_last": self.args.dataloader_drop_last}
+        dataloader = DataLoader(
+            train_dataset,
+            **batching,
+            collate_fn=self.data_collator,
+            num_workers=num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+            persistent_workers=self.args.dataloader_persistent_workers if num_workers > 0 else False,
+            prefetch_factor=self.args.dataloader_prefetch_factor if num_workers > 0 else None
+        )
+
+        if rank_sharded:
+            return self._prepare_rank_dataloader(dataloader)
+        return self.accelerator.prepare(dataloader)
+
+    def _prepare_rank_dataloader(self, dataloader):
+        """
+        DDP: sampler zaten bu rank'in payını veriyor - accelerate sadece
+        device yerleşimi ve resume'daki batch atlaması için sarar
+
+        accelerator.prepare batch'leri process'ler arasında bir kez daha
+        bölerdi; burada tek process gibi hazırlanıp gradient accumulation
+        takibi için accelerator'a kaydedilir.
+        """
+        dataloader = prepare_data_loader(
+            dataloader,
+            self.accelerator.device,
+            num_processes=1,
+            process_index=0,
+            put_on_device=self.accelerator.device_placement,
+            non_blocking=self.accelerator.non_blocking
+        )
+        self.accelerator._dataloaders.append(dataloader)
+        return dataloader
+
+    def get_eval_dataloader(self, eval_dataset=None):
+        if isinstance(eval_dataset, str):
+            eval_dataset = self.eval_dataset[eval_dataset]
+        eval_dataset = eval_dataset if eval_dataset is not None else self.eval_dataset
+        if self.eval_max_tokens is None or isinstance(eval_dataset, IterableDataset) or not hasattr(eval_dataset, "__len__"):
+            return super().get_eval_dataloader(eval_dataset)
+
+        # Benzer uzunluklar aynı batch'te: dinamik padding ile pad neredeyse sıfır
+        batch_sampler = TokenBudgetBatchSampler(
+            get_lengths(eval_dataset),
+            max_tokens=self.eval_max_tokens,
+            pad_to_multiple_of=self.data_collator.pad_to_multiple_of,
+            shuffle=False
+        )
+        eval_dataset = self._remove_unused_columns(eval_dataset, description="evaluation")
+        num_workers = self.args.dataloader_num_workers
+        dataloader = DataLoader(
+            eval_dataset,
+            batch_sampler=batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+            persistent_workers=False,
+            prefetch_factor=self.args.dataloader_prefetch_factor if num_workers > 0 else None
+        )
+
+        return self.accelerator.prepare(dataloader)
+
+    def _evaluate(self, trial, ignore_keys_for_eval, skip_scheduler=False):
+        metrics = super()._evaluate(trial, ignore_keys_for_eval, skip_scheduler)
+
+        # Epoch sonunda tam eval - subset'in kararlarla uyumu log'lanır
+        # (epoch başına bir kez: eval_steps epoch sonuna denk gelebilir)
+        epoch_end = self.state.epoch is not None and abs(self.state.epoch - round(self.state.epoch)) < 1e-6
+        new_epoch = epoch_end and round(self.state.epoch) != self._full_eval_epoch
+        if self.full_eval_dataset is not None and new_epoch and "eval_loss" in metrics:
+            self._full_eval_epoch = round(self.state.epoch)
+            full_metrics = self.evaluate(self.full_eval_dataset, ignore_keys=ignore_keys_for_eval, metric_key_prefix="eval_full")
+            self.eval_agreement.append((metrics["eval_loss"], full_metrics["eval_full_loss"]))
+            self.log(eval_agreement(self.eval_agreement))
+
+        return metrics
+
+
+def eval_agreement(pairs):
+    """
+    Subset eval'in tam eval ile uyumu
+
+    Args:
+        pairs: Epoch sonu (subset loss, tam loss) listesi
+
+    Returns:
+        eval_subset_gap: Son epoch'ta (subset - tam) / tam
+        eval_decision_agreement: Ardışık epoch'larda "iyileşti mi?" kararının
+            subset ve tam eval'de aynı olduğu oran (ilk epoch'ta yok)
+    """
+    subset_loss, full_loss = pairs[-1]
+    agreement = {"eval_subset_gap": (subset_loss - full_loss) / full_loss}
+
+    if len(pairs) > 1:
+        same = [
+            (current[0] < previous[0]) == (current[1] < previous[1])
+            for previous, current in zip(pairs, pairs[1:])
+        ]
+        agreement["eval_decision_agreement"] = sum(same) / len(same)
+
+    return agreement
+
+
+def stratified_eval_subset(lengths, num_samples, num_strata=8, seed=42):
+    """
+    Uzunluk dağılımını koruyan sabit eval subset'i
+
+    Örnekler uzunluk quantile'larına (strata) bölünür, her stratum'dan
+    boyutuyla orantılı örnek seçilir. Aynı seed ile her eval aynı subset'i görür.
+
+    Returns:
+        Sıralı index listesi
+    """
+    if num_samples >= len(lengths):
+        return list(range(len(lengths)))
+
+    generator = torch.Generator()
+    generator.manual_seed(seed)
+    order = sorted(range(len(lengths)), key=lambda idx: lengths[idx])
+    strata = [order[i * len(order) // num_strata:(i + 1) * len(order) // num_strata] for i in range(num_strata)]
+
+    selected = []
+    for stratum in strata:
+        count = round(num_samples * len(stratum) / len(order))
+        picks = torch.randperm(len(stratum), generator=generator)[:count].tolist()
+        selected.extend(stratum[i] for i in picks)
+
+    return sorted(selected)
+
+
+def load_sampler_state(checkpoint):
+    """Checkpoint'teki sampler_state.json (yoksa None)"""
+    path = os.path.join(checkpoint, SAMPLER_STATE_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_resume_checkpoint(output_dir):
+    """
+    output_dir'deki en son tamamlanmış checkpoint
+
+    trainer_state.json'ı olmayan dizinler (yazımı yarıda kalmış async
+    checkpoint) atlanır.
+
+    Returns:
+        Checkpoint dizini veya None
+    """
+    if not os.path.isdir(output_dir):
+        return None
+    checkpoints = [
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name.startswith(f"{PREFIX_CHECKPOINT_DIR}-") and name.split("-")[-1].isdigit()
+    ]
+    complete = [path for path in checkpoints if os.path.isfile(os.path.join(path, TRAINER_STATE_NAME))]
+    if not complete:
+        return None
+    return max(complete, key=lambda path: int(path.split("-")[-1]))
+
+
+def stream_skip_examples(sampler_state):
+    """
+    Streaming resume'da tokenization'dan önce ham akışta atlanacak örnek sayısı
+
+    Paketlenmemiş akışta her ham örnek tek training örneğidir; ilk
+    geçişte (epoch 0) cursor doğrudan ham örnek sayısına çevrilir.
+    Packing'de pencere sınırları ham örneklerle hizalı olmadığından 0 döner
+    (Trainer'ın varsayılan atlaması kullanılır).
+    """
+    if not sampler_state or not sampler_state.get("streaming"):
+        return 0
+    if sampler_state.get("packing") or sampler_state.get("epoch", 0) > 0:
+        print("⚠️ Packed / ikinci geçişteki streaming akışı ham örnek üzerinden atlanamıyor - "
+              "Trainer'ın varsayılan (yavaş) veri atlaması kullanılacak")
+        return 0
+    return sampler_state["examples"]
+
+
+def supports_packed_attention(model):
+    """
+    Model packed pencerelerde doküman sınırlarını position_ids'ten ayırıyor mu?
+    
+    İki dokümanlık küçük bir pencere (position_ids ikinci dokümanda 0'a döner,
+    attention_mask yok - collator'ın verdiği biçim) forward edilir ve ikinci
+    dokümanın logit'leri tek başına forward'ınkilerle karşılaştırılır. Sınırı
+    aşan attention (eski transformers, desteklemeyen backend) logit'leri değiştirir.
+    """
+    device = model.device
+    first = torch.arange(1, 5, device=device).unsqueeze(0) % model.config.vocab_size
+    second = torch.arange(5, 10, device=device).unsqueeze(0) % model.config.vocab_size
+    first_positions = torch.arange(first.shape[1], device=device).unsqueeze(0)
+    second_positions = torch.arange(second.shape[1], device=device).unsqueeze(0)
+    
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            alone = model(input_ids=second, position_ids=second_positions, use_cache=False).logits.float()
+            packed = model(
+                input_ids=torch.cat([first, second], dim=1),
+                position_ids=torch.cat([first_positions, second_positions], dim=1),
+                use_cache=False
+            ).logits[:, first.shape[1]:].float()
+    finally:
+        model.train(was_training)
+    
+    tolerance = 1e-4 if next(model.parameters()).dtype == torch.float32 else 2e-2
+    return torch.allclose(packed, alone, rtol=tolerance, atol=tolerance)
+
+
+def token_budget_accumulation(lengths, max_tokens, tokens_per_step=None, effective_batch_size=16, processes=1):
+    """
+    Token bütçeli batch'lerde optimizer adımı başına token sayısını sabit tutan
+    gradient accumulation
+
+    Args:
+        lengths: Örnek uzunlukları
+        max_tokens: Micro-batch token bütçesi
+        tokens_per_step: Hedef token/optimizer adımı (None = effective_batch_size * ortalama uzunluk)
+        effective_batch_size: Örnek bazlı effective batch (hedef türetmek için)
+        processes: DDP process sayısı (her micro-step'te processes micro-batch işlenir)
+
+    Returns:
+        (gradient_accumulation_steps, tokens_per_step)
+    """
+    if tokens_per_step is None:
+        tokens_per_step = effective_batch_size * sum(lengths) / len(lengths)
+    return max(1, math.ceil(tokens_per_step / (max_tokens * processes))), int(tokens_per_step)
+
+
+def get_lengths(dataset):
+    """Dataset'teki örneklerin token sayıları"""
+    dataset = dataset.with_format(None)
+    if "length" in dataset.column_names:
+        return list(dataset["length"])
+    return [len(ids) for ids in dataset["input_ids"]]
+
+
+def report_padding(lengths, sampler, batch_size, max_length, pad_to_multiple_of=None):
+    """
+    Pad oranını max_length padding ile dinamik padding arasında karşılaştır
+
+    Returns:
+        (önce, sonra) pad oranları
+    """
+    # Önce: rastgele sıra, her örnek max_length'e pad
+    order = list(range(len(lengths)))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    before = padding_ratio(lengths, batches, fixed_length=max_length)
+
+    # Sonra: sampler sırası, her batch kendi en uzun örneğine pad
+    if isinstance(sampler, TokenBudgetBatchSampler):
+        batches = sampler.batches
+    else:
+        if sampler is not None:
+            order = list(sampler)
+        batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    after = padding_ratio(lengths, batches, pad_to_multiple_of=pad_to_multiple_of)
+
+    print(f"Padding oranı - max_length ({max_length}): {before:.1%}, dinamik: {after:.1%}")
+
+    return before, after
+
+
 def setup_trainer(
     model,
     tokenizer,
     train_dataset,
     eval_dataset,
     output_dir,
-    run_name
+    run_name,
+    max_length=None,
+    rank_allocation=None,
+    stream_examples_skipped=0
 ):
   
     config = TrainingConfig()
     
+    # Streaming (IterableDataset) - uzunluk bilinmez, adım sayısı max_steps ile belirlenir
+    streaming = isinstance(train_dataset, IterableDataset) or not hasattr(train_dataset, "__len__")
+    if streaming and not config.max_steps:
+        raise ValueError("Streaming dataset için TrainingConfig.max_steps ayarlanmalı")
+    
+    # Packing kontrolü
+    if config.packing:
+        if not streaming and "position_ids" not in train_dataset.column_names:
+            raise ValueError("packing=True ama dataset paketlenmemiş: load_and_prepare(packing=True) kullanın")
+        if not supports_packed_attention(model):
+            raise ValueError(
+                "Bu transformers sürümü packed dokümanları ayıramıyor: "
+                "transformers'ı güncelleyin veya flash_attention_2 kullanın"
+            )
+        # Cache açıkken model packed sınırlarını position_ids'ten okumaz
+        model.config.use_cache = False
+    
+    # DDP (torchrun): effective_batch_size process sayısından bağımsız, her rank verinin kendi payını görür
+    processes = world_size()
+    per_device_batch_size = config.per_device_batch_size
+    gradient_accumulation_steps = config.gradient_accumulation_steps
+    effective_batch_size = per_device_batch_size * gradient_accumulation_steps * processes
+    
+    gc_policy = config.gradient_checkpointing_policy if config.gradient_checkpointing else "none"
+    
+    # bf16 autocast sadece donanım destekliyorsa (CPU-only host'ta TrainingArguments bf16'yı reddeder)
+    use_cpu = not torch.cuda.is_available()
+    bf16 = bf16_supported()
+    if not bf16:
+        print("⚠️ Bu host bf16 desteklemiyor - training bf16 autocast olmadan (fp32)")
+    
+    # Otomatik micro-batch: bu host'ta max_length'te en yüksek token/s, effective batch aynı
+    # (probe'lar training'deki checkpointing düzeniyle ölçülür)
+    batch_size_search = None
+    if config.auto_batch_size and config.max_tokens_per_batch and not streaming:
+        print("⚠️ auto_batch_size atlandı: token bütçeli batch'te micro-batch max_tokens_per_batch ile belirlenir")
+    elif config.auto_batch_size:
+        batch_size_search = find_micro_batch_size(
+            model,
+            max_length or config.max_length_solution,
+            config.effective_batch_size,
+            processes=processes,
+            max_batch_size=config.auto_batch_max_size,
+            memory_budget_gb=config.auto_batch_memory_budget_gb,
+            plateau=config.auto_batch_plateau,
+            autocast_dtype=torch.bfloat16 if bf16 else None,  # Training'deki bf16 ayarı ile aynı
+            gradient_checkpointing_policy=gc_policy
+        )
+        per_device_batch_size = batch_size_search["per_device_batch_size"]
+        gradient_accumulation_steps = batch_size_search["gradient_accumulation_steps"]
+        effective_batch_size = batch_size_search["effective_batch_size"]
+    elif processes > 1:
+        gradient_accumulation_steps, effective_batch_size = data_parallel_accumulation(
+            config.effective_batch_size, per_device_batch_size, processes
+        )
+    
+    if processes > 1:
+        batching = "token bütçeli batch" if config.max_tokens_per_batch and not streaming else (
+            f"{per_device_batch_size} x {gradient_accumulation_steps} accumulation x {processes} = "
+            f"{effective_batch_size} örnek/optimizer adımı")
+        print(f"DDP ({ddp_backend()}): {processes} process, rank {rank()} - {batching}")
+    
+    # Sampler (streaming'de sıra shuffle buffer'dan gelir; DDP'de stream shard'larını accelerate böler)
+    train_sampler = None
+    train_batch_sampler = None
+    if not streaming:
+        lengths = get_lengths(train_dataset)
+        if config.max_tokens_per_batch:
+            # Token bütçeli değişken boyutlu batch'ler
+            train_batch_sampler = TokenBudgetBatchSampler(
+                lengths,
+                max_tokens=config.max_tokens_per_batch,
+                pad_to_multiple_of=config.pad_to_multiple_of,
+                seed=config.seed,
+                num_replicas=processes,
+                rank=rank()
+            )
+            gradient_accumulation_steps, tokens_per_step = token_budget_accumulation(
+                lengths,
+                config.max_tokens_per_batch,
+                tokens_per_step=config.tokens_per_optimizer_step,
+                effective_batch_size=config.effective_batch_size,
+                processes=processes
+            )
+            print(
+                f"Token bütçesi: {config.max_tokens_per_batch} token/micro-batch, "
+                f"{len(lengths)} -> {len(train_batch_sampler)} micro-step/epoch{'/rank' if processes > 1 else ''}, "
+                f"accumulation: {gradient_accumulation_steps} (~{tokens_per_step} token/optimizer adımı)"
+            )
+        elif config.group_by_length:
+            train_sampler = LengthGroupedSampler(
+                lengths,
+                batch_size=per_device_batch_size,
+                seed=config.seed,
+                num_replicas=processes,
+                rank=rank()
+            )
+        elif processes > 1:
+            train_sampler = DistributedRandomSampler(train_dataset, num_replicas=processes, rank=rank(), seed=config.seed)
+        
+        # Pad oranı raporu
+        report_padding(
+            lengths,
+            train_batch_sampler or train_sampler,
+            batch_size=per_device_batch_size,
+            max_length=max_length or max(lengths),
+            pad_to_multiple_of=config.pad_to_multiple_of
+        )
+    
+    # Hızlı eval: ara eval'ler sabit subset'te, tam eval sadece epoch sonunda
+    full_eval_dataset = None
+    eval_max_tokens = None
+    eval_has_length = not isinstance(eval_dataset, IterableDataset) and hasattr(eval_dataset, "__len__")
+    if config.fast_eval and eval_has_length:
+        eval_max_tokens = config.eval_max_tokens
+        if config.fast_eval_samples and config.fast_eval_samples < len(eval_dataset):
+            subset = stratified_eval_subset(get_lengths(eval_dataset), config.fast_eval_samples, seed=config.seed)
+            full_eval_dataset = eval_dataset
+            eval_dataset = eval_dataset.select(subset)
+            print(f"Hızlı eval: {len(eval_dataset)}/{len(full_eval_dataset)} örnek (uzunluğa göre stratified), "
+                  f"{eval_max_tokens} token/batch, tam eval epoch sonlarında")
+    
+    # Gradient checkpointing: tüm politikalar micro-batch seçildikten sonra burada bir kez uygulanır
+    # (Trainer'ın gradient_checkpointing=True'su tüm katmanları tekrar açardı, kapalı tutulur)
+    apply_gradient_checkpointing(
+        model,
+        gc_policy,
+        tokens_per_batch=config.max_tokens_per_batch or (max_length or config.max_length_solution) * per_device_batch_size
+    )
+    
     # Training arguments
     training_args = TrainingArguments(
         # Output
@@ -25,8 +847,9 @@ def setup_trainer(
         
         # Training
         num_train_epochs=config.max_epochs,
-        per_device_train_batch_size=config.per_device_batch_size,
-        gradient_accumulation_steps=config.gradient_accumulation_steps,
+        max_steps=config.max_steps or -1,
+        per_device_train_batch_size=per_device_batch_size,
+        gradient_accumulation_steps=gradient_accumulation_steps,
         
         # Optimizer
         learning_rate=config.learning_rate,
@@ -41,7 +864,7 @@ def setup_trainer(
         # Evaluation
         eval_strategy="steps",
         eval_steps=config.eval_steps,
-        per_device_eval_batch_size=config.per_device_batch_size,
+        per_device_eval_batch_size=per_device_batch_size,
         
         # Logging
         logging_strategy="steps",
@@ -53,8 +876,18 @@ def setup_trainer(
         save_total_limit=5,  # Son 5 checkpoint'i sakla
         
         # Memory optimization
-        gradient_checkpointing=config.gradient_checkpointing,
-        bf16=True,  # bfloat16 precision
+        gradient_checkpointing=False,  # Politika yukarıda uygulandı
+        bf16=bf16,  # bfloat16 precision (destekleniyorsa)
+        use_cpu=use_cpu,
+        
+        # torch.compile (TrainingConfig.torch_compile, artifact'lar compile_cache_dir'de)
+        **training_compile_kwargs(model.device),
+        
+        # DataLoader
+        dataloader_num_workers=config.dataloader_num_workers,
+        dataloader_prefetch_factor=config.dataloader_prefetch_factor if config.dataloader_num_workers > 0 else None,
+        dataloader_pin_memory=config.dataloader_pin_memory,
+        dataloader_persistent_workers=config.dataloader_persistent_workers and config.dataloader_num_workers > 0,
         
         # Reproducibility
         seed=config.seed,
@@ -64,26 +897,65 @@ def setup_trainer(
         report_to="none",  # WandB kullanmak isterseniz "wandb" yapın
         load_best_model_at_end=True,
         metric_for_best_model="eval_loss",
-        greater_is_better=False
+        greater_is_better=False,
+        
+        # DDP: donuk base'in buffer'ları rank'lerde aynı, sadece LoRA gradient'leri all-reduce edilir
+        ddp_backend=ddp_backend() if processes > 1 else None,
+        ddp_find_unused_parameters=False,
+        ddp_broadcast_buffers=False,
+        
+        # Resume: streaming akışı load_and_prepare(skip_examples=...) ile zaten konumlandıysa Trainer tekrar atlamasın
+        ignore_data_skip=bool(stream_examples_skipped)
+    )
+    
+    # Data collator - her batch'i en uzun örneğine kadar pad eder
+    data_collator = DataCollatorForCausalLM(
+        tokenizer=tokenizer,
+        pad_to_multiple_of=config.pad_to_multiple_of
     )
     
-    # Data collator
-    data_collator = DataCollatorForCausalLM(tokenizer=tokenizer)
+    # Asenkron checkpoint (TrainingConfig.async_checkpoint)
+    checkpoint_writer = AsyncCheckpointWriter(verbose=rank() == 0) if config.async_checkpoint else None
+    checkpoint_optimizer_dtype = getattr(torch, config.checkpoint_optimizer_dtype) if config.checkpoint_optimizer_dtype else None
+    
+    # Batch düzeni run log'unun başına yazılır (auto_batch_size'ta deneme sonuçlarıyla)
+    run_info = {"per_device_batch_size": per_device_batch_size, "gradient_accumulation_steps": gradient_accumulation_steps,
+                "world_size": processes}
+    if config.max_tokens_per_batch and not streaming:
+        run_info["max_tokens_per_batch"] = config.max_tokens_per_batch
+    else:
+        run_info["effective_batch_size"] = effective_batch_size
+    if batch_size_search is not None:
+        run_info["batch_size_search"] = batch_size_search
     
     # Callbacks
+    telemetry = TelemetryCallback() if config.telemetry else None
     callbacks = [
-        LoggingCallback(log_dir=os.path.join(output_dir, "logs")),
+        LoggingCallback(log_dir=os.path.join(output_dir, "logs"), telemetry=telemetry, run_info=run_info),
         EarlyStoppingCallback(patience=config.early_stopping_patience)
     ]
+    if telemetry is not None:
+        callbacks.append(telemetry)
+    if full_eval_dataset is not None:
+        callbacks.append(EpochEndEvalCallback())
+    if rank_allocation:
+        callbacks.append(RankAllocationCallback(rank_allocation))
     
     # Trainer
-    trainer = Trainer(
+    trainer = CausalLMTrainer(
         model=model,
         args=training_args,
         train_dataset=train_dataset,
         eval_dataset=eval_dataset,
         data_collator=data_collator,
-        callbacks=callbacks
+        callbacks=callbacks,
+        train_sampler=train_sampler,
+        train_batch_sampler=train_batch_sampler,
+        telemetry=telemetry,
+        eval_max_tokens=eval_max_tokens,
+        full_eval_dataset=full_eval_dataset,
+        checkpoint_writer=checkpoint_writer,
+        checkpoint_optimizer_dtype=checkpoint_optimizer_dtype
     )
     
     return trainer
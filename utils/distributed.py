@@ -0,0 +1,137 @@
+"""Process Ortamı: torchrun rank / device / thread yardımcıları (DDP, CPU'da gloo)"""
+
+import os
+import torch
+import torch.distributed as dist
+from contextlib import contextmanager
+from config.training_config import TrainingConfig
+
+
+def world_size():
+    """torchrun'ın başlattığı toplam process sayısı (tek process'te 1)"""
+    return int(os.environ.get("WORLD_SIZE", 1))
+
+
+def rank():
+    """Global process sırası (tüm node'lar)"""
+    return int(os.environ.get("RANK", 0))
+
+
+def local_rank():
+    """Node içindeki process sırası"""
+    return int(os.environ.get("LOCAL_RANK", 0))
+
+
+def is_distributed():
+    return world_size() > 1
+
+
+def is_main_process():
+    """Dosya yazan / özet basan process (rank 0)"""
+    return rank() == 0
+
+
+def rank_device():
+    """Bu process'in device'ı: GPU'da cuda:<local_rank>, yoksa cpu"""
+    if torch.cuda.is_available():
+        return f"cuda:{local_rank()}"
+    return "cpu"
+
+
+def bf16_supported():
+    """bf16 autocast'i donanım destekliyor mu? (GPU: Ampere+, CPU: AVX512-BF16 / AMX)"""
+    if torch.cuda.is_available():
+        return torch.cuda.is_bf16_supported()
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = set(f.read().split())
+    except OSError:
+        return False
+    return bool(flags & {"avx512_bf16", "amx_bf16"})
+
+
+def ddp_backend():
+    """TrainingConfig.ddp_backend, None ise CPU'da gloo / GPU'da nccl"""
+    if TrainingConfig.ddp_backend:
+        return TrainingConfig.ddp_backend
+    return "nccl" if torch.cuda.is_available() else "gloo"
+
+
+def available_cpus():
+    """Process'in çalışabileceği çekirdek sayısı (cgroup / taskset affinity dahil)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def configure_cpu_threads(num_threads=None):
+    """
+    Intra-op thread sayısını ayarla (CPU inference ve CPU DDP training ortak)
+
+    Varsayılan: process'e atanmış CPU'lar node'daki process'ler arasında eşit
+    bölünür (torchrun node başına birden fazla process'te OMP_NUM_THREADS=1
+    ayarlar, bu her rank'i tek çekirdeğe düşürürdü; tek process'te tüm
+    çekirdekler). Inter-op paralelliği kapatılır.
+
+    Returns:
+        Kullanılan thread sayısı
+    """
+    local_world = int(os.environ.get("LOCAL_WORLD_SIZE", world_size()))
+    num_threads = num_threads or max(1, available_cpus() // local_world)
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Paralel iş başladıktan sonra değiştirilemez
+        pass
+
+    return num_threads
+
+
+def data_parallel_accumulation(effective_batch_size, per_device_batch_size, processes=None):
+    """
+    Effective batch'i process sayısından bağımsız tutan gradient accumulation
+
+    Optimizer adımı başına örnek = per_device_batch_size * accumulation * processes.
+
+    Returns:
+        (gradient_accumulation_steps, gerçekleşen effective batch)
+    """
+    processes = processes or world_size()
+    per_micro_step = per_device_batch_size * processes
+    accumulation = max(1, round(effective_batch_size / per_micro_step))
+    effective = accumulation * per_micro_step
+    if effective != effective_batch_size:
+        print(f"⚠️ effective_batch_size={effective_batch_size}, {processes} process x {per_device_batch_size} "
+              f"batch'e tam bölünmüyor - {effective} kullanılıyor")
+    return accumulation, effective
+
+
+def init_process_group():
+    """torchrun altında process group'u (Trainer'dan önce gerekiyorsa) başlat"""
+    if is_distributed() and not dist.is_initialized():
+        dist.init_process_group(backend=ddp_backend())
+
+
+@contextmanager
+def main_process_first():
+    """
+    Node'daki ilk process önce çalışır (dataset cache'i / model snapshot'ı
+    yazar), diğerleri bitince aynı cache'ten okur
+
+    Tek process'te etkisiz.
+    """
+    if not is_distributed():
+        yield
+        return
+
+    init_process_group()
+    first = local_rank() == 0
+    if not first:
+        dist.barrier()
+    try:
+        yield
+    finally:
+        if first:
+            dist.barrier()